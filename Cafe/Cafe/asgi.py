@@ -3,6 +3,10 @@ ASGI config for Cafe project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Live order events (orders/events/, Server-Sent Events) are served by an async view and
+need an ASGI server, e.g. ``uvicorn Cafe.asgi:application --workers 4``. With several
+workers set ORDER_EVENTS to FileBroker in settings so that all of them see every event.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
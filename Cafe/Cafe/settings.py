@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,11 +45,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so that the total time covers the rest of the middleware
+    'modules.Cafe_order.instrumentation.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # after authentication: only staff can switch profiling on
+    'modules.Cafe_order.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +62,8 @@ ROOT_URLCONF = 'Cafe.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to RequestTimingMiddleware
+        'BACKEND': 'modules.Cafe_order.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -141,4 +148,83 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_ROOT = (BASE_DIR / 'media')
 MEDIA_URL = '/media/'
 
+# Dish image variants (thumbnail, detail, WebP) are built by a background thread pool
+# after upload, see modules/Cafe_order/images.py. 0 builds them in the saving thread.
+DISH_IMAGE_WORKERS = 2
 
+# Tests run with a temporary MEDIA_ROOT and DISH_IMAGE_WORKERS = 0, see Cafe/test_runner.py.
+TEST_RUNNER = 'Cafe.test_runner.CafeTestRunner'
+
+# Order events (created / status changed) pushed to kitchen and floor pages over SSE,
+# see modules/Cafe_order/events.py. LocalBroker delivers them inside one process; with
+# several ASGI workers use FileBroker ('OPTIONS': {'path': ...}) or plug in another backend.
+ORDER_EVENTS = {
+    'BACKEND': 'modules.Cafe_order.events.LocalBroker',
+    'OPTIONS': {},
+}
+
+# Per-request timing (modules/Cafe_order/instrumentation.py): DB queries and time, template
+# render time and total time go to the Server-Timing header and to JSON log lines. Requests
+# slower than SLOW_REQUEST_MS are logged as warnings with their SLOW_QUERIES slowest statements.
+REQUEST_TIMING = {
+    'ENABLED': True,
+    'SERVER_TIMING_HEADER': True,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERIES': 5,
+}
+
+# Archiving of paid orders (modules/Cafe_order/archive.py): `manage.py archive_orders`, run daily
+# from cron, moves orders paid more than AFTER_DAYS days ago with their items to archive tables in
+# transactions of BATCH_SIZE orders. History, search and revenue read both through OrderHistory.
+ORDER_ARCHIVE = {
+    'AFTER_DAYS': 90,
+    'BATCH_SIZE': 1000,
+}
+
+# On-demand profiling of a single request by staff (modules/Cafe_order/profiling.py):
+# ?_profile=1 or 'X-Profile: 1' ('cprofile' or 'sample' picks the profiler). Profiles with request
+# metadata are saved to DIR (the last KEEP are kept) and listed on /admin/profiles/. DIR is kept
+# out of the source tree: CAFE_PROFILING_DIR or <system temp>/cafe-profiles.
+PROFILING = {
+    'ENABLED': True,
+    'DIR': os.environ.get('CAFE_PROFILING_DIR', Path(tempfile.gettempdir()) / 'cafe-profiles'),
+    'QUERY_PARAM': '_profile',
+    'HEADER': 'X-Profile',
+    'SAMPLE_INTERVAL': 0.001,
+    'KEEP': 100,
+}
+
+# Prometheus metrics on /metrics (modules/Cafe_order/metrics.py): request latency and SQL
+# histograms per URL name (recorded by RequestTimingMiddleware), orders created/paid counters
+# and occupied tables. Scrapers send 'Authorization: Bearer <TOKEN>'; staff sessions need no token.
+# With several worker processes set MULTIPROCESS_DIR to a directory shared by them (emptied on
+# deploy): each worker writes its values there every FLUSH_INTERVAL seconds and /metrics sums them.
+METRICS = {
+    'ENABLED': True,
+    'TOKEN': None,
+    'MULTIPROCESS_DIR': None,
+    'FLUSH_INTERVAL': 5,
+}
+
+# Only slow requests are shown by default; set the level to INFO to log every request.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'modules.Cafe_order': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
+
+# Cache: menu snapshot (modules/Cafe_order/menu_cache.py) is versioned here.
+# With several workers point this to a shared backend (Redis/Memcached),
+# otherwise a version bump is seen only by the process that made it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cafe-default',
+    }
+}
@@ -0,0 +1,29 @@
+import logging
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class CafeTestRunner(DiscoverRunner):
+    """
+    Тесты не трогают настоящий MEDIA_ROOT: загрузки и варианты картинок пишутся во временный каталог,
+    а варианты строятся в том же потоке (DISH_IMAGE_WORKERS = 0), без фонового пула.
+    Строки замеров запросов (instrumentation) в консоль не выводятся: тесты читают их через assertLogs.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._media_root = tempfile.mkdtemp(prefix='cafe-test-media-')
+        self._settings_override = override_settings(MEDIA_ROOT=self._media_root, DISH_IMAGE_WORKERS=0)
+        self._settings_override.enable()
+        self._timing_logger = logging.getLogger('modules.Cafe_order.instrumentation')
+        self._timing_level = self._timing_logger.level
+        self._timing_logger.setLevel(logging.ERROR)
+
+    def teardown_test_environment(self, **kwargs):
+        self._timing_logger.setLevel(self._timing_level)
+        self._settings_override.disable()
+        shutil.rmtree(self._media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -19,7 +19,15 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from modules.Cafe_order.Views.views_profiling import ProfileDetailView, ProfileDownloadView, ProfileListView
+
 urlpatterns = [
+    # профили запросов (modules/Cafe_order/profiling.py) - страницы админки без модели
+    path('admin/profiles/', admin.site.admin_view(ProfileListView.as_view()), name='admin_profiles'),
+    path('admin/profiles/<str:profile_id>/', admin.site.admin_view(ProfileDetailView.as_view()),
+         name='admin_profile_detail'),
+    path('admin/profiles/<str:profile_id>/download/', admin.site.admin_view(ProfileDownloadView.as_view()),
+         name='admin_profile_download'),
     path('admin/', admin.site.urls),
     path('', include('modules.Cafe_order.urls')),
 ]
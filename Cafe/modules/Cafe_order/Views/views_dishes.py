@@ -1,14 +1,18 @@
-from collections import defaultdict
+import hashlib
 
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.messages.views import SuccessMessageMixin
-from django.shortcuts import render
+from django.shortcuts import render, redirect
+from django.db.models import Count, Max, ProtectedError
 from django.urls import reverse, reverse_lazy
-from django.views.generic import ListView, DetailView, UpdateView, CreateView, DeleteView
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.generic import ListView, DetailView, UpdateView, CreateView, DeleteView, FormView
 from django_filters.rest_framework import DjangoFilterBackend  # Правільны імпарт
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser
 from rest_framework.renderers import JSONRenderer
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
@@ -16,11 +20,17 @@ from rest_framework.viewsets import ModelViewSet
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from modules.Cafe_order.forms import DishUpdateForm, DishCreateForm
+from modules.Cafe_order.dish_import import DishImportError, detect_format, import_dishes
+from modules.Cafe_order.forms import DishUpdateForm, DishCreateForm, DishesImportUploadForm, DishBulkDeleteForm
+from modules.Cafe_order.menu_cache import aget_menu_snapshot, get_menu_snapshot
 from modules.Cafe_order.models import Dish, CategoryDish
+from modules.Cafe_order.pagination import KeysetPagination
+from modules.Cafe_order.query_budget import query_budget
 from modules.Cafe_order.serializers import DishSerializer
+from modules.Cafe_order.views import AsyncLoginRequiredMixin
 
 
+@query_budget(3)
 class DishesList(LoginRequiredMixin, ListView):
     """
     View to list all dishes
@@ -38,38 +48,37 @@ class DishesList(LoginRequiredMixin, ListView):
     template_name = 'dishes/dishes_view.html'
     paginate_by = None  # У гэтым выпадку лепш без пагінацыі
 
+    def get_queryset(self):
+        # Меню бярэцца з кэшаванага здымка, queryset ListView не выкарыстоўваецца
+        return Dish.objects.none()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Нашы блюда'
 
-        # Катэгорыі, якія павінны ісці першымі
-        priority_categories = ["Первые блюда", "Вторые блюда"]
-
-        # Групуем стравы па катэгорыях
-        dishes_by_category = defaultdict(list)
-        all_categories = set()
+        # Здымак меню з кэша: катэгорыі ўжо адсартаваныя, стравы згрупаваныя
+        context['dishes_by_category'] = dict(self.get_menu_snapshot())
+        return context
 
-        for dish in Dish.objects.select_related('category').all():
-            dishes_by_category[dish.category].append(dish)
-            all_categories.add(dish.category)
+    def get_menu_snapshot(self):
+        return get_menu_snapshot()
 
-        # Фільтруем і сартыруем катэгорыі
-        ordered_categories = []
 
-        # Дадаем прыярытэтныя катэгорыі
-        for cat_name in priority_categories:
-            category = CategoryDish.objects.filter(name=cat_name).first()
-            if category and category in dishes_by_category:
-                ordered_categories.append(category)
+class AsyncDishesList(AsyncLoginRequiredMixin, DishesList):
+    """
+    Async-варыянт меню для ASGI: здымак чытаецца праз асінхронныя API кэша і ORM,
+    шаблон і кантэкст тыя ж, што ў DishesList.
+    """
 
-        # Дадаем астатнія катэгорыі ў алфавітным парадку
-        remaining_categories = sorted(all_categories - set(ordered_categories), key=lambda x: x.name)
-        ordered_categories.extend(remaining_categories)
+    async def get(self, request, *args, **kwargs):
+        self.menu_snapshot = await aget_menu_snapshot()
+        self.object_list = self.get_queryset()
+        return self.render_to_response(self.get_context_data())
 
-        # Збіраем выніковыя дадзеныя
-        context['dishes_by_category'] = {category: dishes_by_category[category] for category in ordered_categories}
-        return context
+    def get_menu_snapshot(self):
+        return self.menu_snapshot
 
+@query_budget(4)
 class DishesDetail(LoginRequiredMixin, DetailView):
     """
     View to show a single dish
@@ -142,13 +151,78 @@ class DishesDelete(LoginRequiredMixin, DeleteView):
         context['title'] = f'Удаленне блюда: {self.object.name}'
         return context
 
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except ProtectedError:
+            messages.error(self.request, f'Блюдо "{self.object.name}" есть в заказах, удалить его нельзя.')
+            return redirect('dishes_detail', self.object.pk)
+
 
 
 
 class DishessBulkDelete(LoginRequiredMixin, ListView):
-    pass
+    """
+    Выдаленне некалькіх страў адразу: спіс з checkbox'амі, адзін DELETE на адзначаныя.
+    """
+    model = Dish
+    login_url = '/login/'
+    context_object_name = 'dishes'
+    template_name = 'dishes/dishes_bulk_delete.html'
+    queryset = Dish.objects.select_related('category').only('id', 'name', 'price', 'category__name')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['title'] = 'Удаление нескольких блюд'
+        context.setdefault('form', DishBulkDeleteForm())
+        return context
 
+    def post(self, request, *args, **kwargs):
+        form = DishBulkDeleteForm(request.POST)
+        if not form.is_valid():
+            self.object_list = self.get_queryset()
+            return self.render_to_response(self.get_context_data(form=form))
+        count, in_orders = form.cleaned_data['dishes'].delete_unused()
+        messages.success(request, f'Удалено блюд: {count}')
+        if in_orders:
+            messages.warning(request, 'Есть в заказах, не удалены: ' + ', '.join(dish.name for dish in in_orders))
+        return redirect('dishes')
 
+
+class DishesUpload(LoginRequiredMixin, UserPassesTestMixin, FormView):
+    """
+    Масавы імпарт страў з файла (толькі для персаналу). Тая ж логіка, што і ў каманды import_dishes.
+    """
+    form_class = DishesImportUploadForm
+    template_name = 'dishes/dishes_upload.html'
+    login_url = '/login/'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['title'] = 'Импорт блюд из файла'
+        return context
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        try:
+            result = import_dishes(
+                upload,
+                detect_format(upload.name),
+                create_categories=form.cleaned_data['create_categories'],
+                updater=self.request.user,
+                dry_run=form.cleaned_data['dry_run'],
+            )
+        except DishImportError as error:
+            form.add_error('file', str(error))
+            return self.form_invalid(form)
+        return self.render_to_response(self.get_context_data(
+            form=form, result=result, dry_run=form.cleaned_data['dry_run']))
+
+
+@query_budget(list=4, retrieve=3)
 class DishViewSet(viewsets.ModelViewSet):
     queryset = Dish.objects.all()
     serializer_class = DishSerializer
@@ -156,12 +230,13 @@ class DishViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'price']
     search_fields = ['name', 'description']
-    ordering_fields = ['name', 'category', 'price', 'time_update']
-    pagination_class = PageNumberPagination
+    ordering_fields = ['name', 'price', 'time_update']  # толькі NOT NULL палі - патрабаванне keyset-пагінацыі
+    pagination_class = KeysetPagination
+    keyset_ordering = ('name', 'id')
 
     def get_permissions(self):
         """Настройка доступу: стварэнне/змена/выдаленне толькі для адміністратара"""
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'import_dishes']:
             permission_classes = [IsAdminUser]
         else:
             permission_classes = [IsAuthenticated]
@@ -196,19 +271,101 @@ class DishViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         """Выдаленне стравы"""
         instance = self.get_object()
-        instance.delete()
+        try:
+            instance.delete()
+        except ProtectedError:
+            return Response({'detail': 'Dish is used in orders and cannot be deleted'}, status=status.HTTP_409_CONFLICT)
         return Response({'message': 'Dish deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['delete'])
     def bulk_delete(self, request):
         """Масавае выдаленне"""
         ids = request.data.get('ids', [])
-        deleted_count, _ = Dish.objects.filter(id__in=ids).delete()
-        return Response({'status': 'success', 'message': f'{deleted_count} dishes deleted'}, status=status.HTTP_200_OK)
+        deleted_count, in_orders = Dish.objects.filter(id__in=ids).delete_unused()
+        return Response({'status': 'success', 'message': f'{deleted_count} dishes deleted',
+                         'not_deleted': [dish.pk for dish in in_orders]}, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description="Bulk import of dishes from a CSV / JSON / JSON Lines file (admin only)",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter('format', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=['csv', 'json', 'jsonl']),
+            openapi.Parameter('create_categories', openapi.IN_FORM, type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('dry_run', openapi.IN_FORM, type=openapi.TYPE_BOOLEAN),
+        ],
+    )
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_dishes(self, request):
+        """Масавы імпарт: файл чытаецца патокам, памылкі вяртаюцца па радках"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        flags = {name: str(request.data.get(name, '')).lower() in ('1', 'true', 'on', 'yes')
+                 for name in ('create_categories', 'dry_run')}
+        try:
+            result = import_dishes(
+                upload,
+                detect_format(upload.name, request.data.get('format')),
+                updater=request.user,
+                **flags,
+            )
+        except DishImportError as error:
+            return Response({'file': [str(error)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'created': result.created,
+            'updated': result.updated,
+            'dry_run': flags['dry_run'],
+            'errors': result.errors,
+        }, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
         operation_description="Get a list of dishes",
         responses={200: DishSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
\ No newline at end of file
+        """
+        Спіс страў з падтрымкай If-None-Match. Last-Modified няма: max(time_update) не мяняецца
+        пры выдаленні стравы, а ETag улічвае і колькасць радкоў.
+        """
+        state = Dish.objects.aggregate(last_update=Max('time_update'), count=Count('id'))
+        etag = self._make_etag(request, state['count'], state['last_update'])
+        response = self._not_modified(request, etag, None)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return self._set_validators(response, etag, None)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Адна страва з падтрымкай If-None-Match / If-Modified-Since"""
+        instance = self.get_object()
+        etag = self._make_etag(request, instance.pk, instance.time_update)
+        response = self._not_modified(request, etag, instance.time_update)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return self._set_validators(response, etag, instance.time_update)
+
+    @staticmethod
+    def _make_etag(request, *parts):
+        """
+        Танны валідатар: max(time_update) + колькасць радкоў (або pk + time_update) + query string,
+        бо фільтры і курсор мяняюць змест адказу.
+        """
+        raw = ':'.join(str(part) for part in parts + (request.get_full_path(),))
+        return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+    @staticmethod
+    def _not_modified(request, etag, last_modified):
+        """ 304 без серыялізацыі, калі ў кліента актуальная версія (інакш None). """
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+
+    @staticmethod
+    def _set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Кліент кожны раз правярае актуальнасць, але цела атрымлівае толькі пры зменах
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
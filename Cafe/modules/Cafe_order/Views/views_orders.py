@@ -1,29 +1,52 @@
+import csv
+import logging
+
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.db import transaction
-from django.shortcuts import render, get_object_or_404
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.views import View
 from django.views.generic import ListView, DetailView, UpdateView, CreateView, DeleteView
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.db.models import Sum
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from modules.Cafe_order import events
 from modules.Cafe_order.forms import DishUpdateForm, DishCreateForm, OrderCreateForm, OrderItemFormSet, OrderUpdateForm, \
-    OrderSearchForm
-from modules.Cafe_order.models import Dish, OrderItem, Order
+    OrderSearchForm, RevenueReportForm, OrderBulkActionForm
+from modules.Cafe_order.models import Dish, OrderItem, Order, OrderHistory, Table, TableOccupiedError, \
+    RevenueRollup, local_day_bounds
+from modules.Cafe_order.pagination import AsyncKeysetListMixin, KeysetPagination, KeysetPaginationMixin
+from modules.Cafe_order.query_budget import query_budget
+from modules.Cafe_order.search import OrderSearchQuery
+from modules.Cafe_order.serializers import OrderSerializer, OrderBulkSerializer, OrderBulkStatusSerializer
+from modules.Cafe_order.views import AsyncLoginRequiredMixin
+
+logger = logging.getLogger(__name__)
 
 
-class OrdersList(LoginRequiredMixin, ListView):
+@query_budget(4)
+class OrdersList(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     View to list all orders excluding orders with status 2 = "Оплачено"
+    Paginated by (time_update, id) cursor instead of page numbers.
     """
     model = Order
     login_url = '/login/'
     context_object_name = 'orders'
     template_name = 'orders/orders_view.html'
     paginate_by = 6
-    queryset = Order.objects.prefetch_related('order_items__dish').exclude(status=2)
+    queryset = Order.objects.for_display().exclude(status=2)
     custom_title = 'Заказы'
     custom_title_single = 'Заказ'
     create_url_name = 'order_create'
@@ -38,18 +61,30 @@ class OrdersList(LoginRequiredMixin, ListView):
         context['create_url_name'] = self.create_url_name
         context['detail_url_name'] = self.detail_url_name
         context['delete_multiple_url_name'] = self.delete_multiple_url_name
+        context['status_choices'] = Order.STATUS_CHOICES
+        context['order_events'] = events.sse_available(self.request)
         return context
 
-class OrdersListAll(LoginRequiredMixin, ListView):
+
+class AsyncOrdersList(AsyncLoginRequiredMixin, AsyncKeysetListMixin, OrdersList):
+    """
+    Async-вариант OrdersList для ASGI: страница заказов (со строками, prefetch) читается
+    асинхронным ORM, поток воркера не занят ожиданием БД.
+    """
+
+
+@query_budget(4)
+class OrdersListAll(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
-    View to list all orders
+    View to list all orders, archived ones included (OrderHistory)
+    Paginated by (time_update, id) cursor instead of page numbers.
     """
     model = Order
     login_url = '/login/'
     context_object_name = 'orders'
     template_name = 'orders/orders_view.html'
     paginate_by = 6
-    queryset = Order.objects.prefetch_related('order_items__dish')
+    queryset = OrderHistory.objects.for_display()
     custom_title = 'Заказы'
     custom_title_single = 'Заказ'
     create_url_name = 'order_create'
@@ -64,6 +99,8 @@ class OrdersListAll(LoginRequiredMixin, ListView):
         context['create_url_name'] = self.create_url_name
         context['detail_url_name'] = self.detail_url_name
         context['delete_multiple_url_name'] = self.delete_multiple_url_name
+        context['status_choices'] = Order.STATUS_CHOICES
+        context['order_events'] = events.sse_available(self.request)
         return context
 
 class OrderCreateView(LoginRequiredMixin, CreateView):
@@ -94,24 +131,30 @@ class OrderCreateView(LoginRequiredMixin, CreateView):
         context = self.get_context_data()
         order_items = context["order_items"]
 
-        with transaction.atomic():
-            # Сохраняем заказ
-            form.instance.updater = self.request.user
-            self.object = form.save()
+        try:
+            with transaction.atomic():
+                # Сохраняем заказ, столик захватывается в этой же транзакции
+                form.instance.updater = self.request.user
+                self.object = form.save()
 
-            # Привязываем FormSet к заказу
-            order_items.instance = self.object
+                # Привязываем FormSet к заказу
+                order_items.instance = self.object
 
-            if order_items.is_valid():
-                order_items.save()  # Сохраняем FormSet
-                self.object.calculate_total_price()  # Обновляем общую стоимость
-            else:
-                # Если FormSet не валиден, возвращаем ошибку
-                print(order_items.errors)  # Для отладки
-                return self.form_invalid(form)
+                if order_items.is_valid():
+                    order_items.save()  # Сохраняем FormSet, общая стоимость пересчитывается один раз
+                else:
+                    # Если FormSet не валиден, откатываем заказ и возвращаем ошибку
+                    logger.warning('Order create: invalid items formset: %s', order_items.errors.as_data())
+                    transaction.set_rollback(True)
+                    return self.form_invalid(form)
+        except TableOccupiedError as error:
+            # Столик успели занять параллельно - показываем ошибку в форме
+            form.add_error('table_number', error)
+            return self.form_invalid(form)
 
         return super().form_valid(form)
 
+@query_budget(4)
 class OrderDetailView(LoginRequiredMixin, DetailView):
     """
     View для дэталёвага прагляду заказу
@@ -122,16 +165,35 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
 
     def get_object(self):
         """
-        Атрымаць канкрэтны заказ
+        Атрымаць канкрэтны заказ; калі яго ўжо перанеслі ў архіў - архіўны, толькі для прагляду
         """
-        return get_object_or_404(Order, id=self.kwargs["pk"])
+        order = Order.objects.for_display().filter(id=self.kwargs["pk"]).first()
+        if order is not None:
+            return order
+        return get_object_or_404(OrderHistory.objects.for_display().filter(archived_at__isnull=False),
+                                 id=self.kwargs["pk"])
 
 
+class AsyncOrderDetailView(AsyncLoginRequiredMixin, OrderDetailView):
+    """
+    Async-вариант OrderDetailView: заказ со столиком и строками загружается асинхронным ORM.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await Order.objects.for_display().filter(id=self.kwargs["pk"]).afirst()
+        if self.object is None:
+            self.object = await aget_object_or_404(
+                OrderHistory.objects.for_display().filter(archived_at__isnull=False), id=self.kwargs["pk"])
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+
+@query_budget(7)
 class OrderUpdateView(LoginRequiredMixin, UpdateView):
     """
        View для рэдагавання заказу
        """
     model = Order
+    queryset = Order.objects.for_display(with_items=False)
     form_class = OrderUpdateForm
     template_name = "orders/order_update.html"
     success_url = reverse_lazy("orders_list")
@@ -154,17 +216,22 @@ class OrderUpdateView(LoginRequiredMixin, UpdateView):
         context = self.get_context_data()
         order_items = context["order_items"]
 
-        with transaction.atomic():
-            form.instance.updater = self.request.user
-            self.object = form.save()
-
-            if order_items.is_valid():
-                order_items.instance = self.object
-                order_items.save()
-                self.object.calculate_total_price()  # Абнаўляем кошт заказу
-            else:
-                print(order_items.errors)  # Для адладкі
-                return self.form_invalid(form)
+        try:
+            with transaction.atomic():
+                form.instance.updater = self.request.user
+                self.object = form.save()
+
+                if order_items.is_valid():
+                    order_items.instance = self.object
+                    order_items.save()  # Кошт заказу пералічваецца адзін раз у formset
+                else:
+                    logger.warning('Order #%s update: invalid items formset: %s', self.object.pk,
+                                   order_items.errors.as_data())
+                    transaction.set_rollback(True)
+                    return self.form_invalid(form)
+        except TableOccupiedError as error:
+            form.add_error('table_number', error)
+            return self.form_invalid(form)
 
         return super().form_valid(form)
 
@@ -174,6 +241,7 @@ class OrderDeleteView(LoginRequiredMixin, DeleteView):
     View для выдалення заказу
     """
     model = Order
+    queryset = Order.objects.for_display(with_items=False)
     success_url = reverse_lazy("orders_list")
     template_name = "orders/order_delete.html"
 
@@ -182,110 +250,321 @@ class OrderDeleteView(LoginRequiredMixin, DeleteView):
         Добавляем дополнительный контекст в шаблон.
         """
         context = super().get_context_data(**kwargs)
-        context["order"] = self.get_object()  # Передаем заказ в шаблон
+        context["order"] = self.object  # Передаем заказ в шаблон (уже загружен в get())
         return context
 
-    def get(self, request, *args, **kwargs):
-        print("Метод GET вызван")
-        return super().get(request, *args, **kwargs)
-
     def post(self, request, *args, **kwargs):
         """
         Переопределяем метод post, чтобы вызвать delete.
         """
-        print("Метод POST вызван")
         return self.delete(request, *args, **kwargs)
 
     def delete(self, request, *args, **kwargs):
         """
-        Переопределяем метод delete для освобождения столика, если заказ активный.
+        Удаление через delete_orders(): столик освобождается только у активного заказа
+        (условным UPDATE, без записи всей строки), выручка оплаченного вычитается из свёрток.
         """
-        try:
-            print("Метод DELETE вызван")
-            self.object = self.get_object()  # Получаем объект заказа
+        self.object = self.get_object()
+        Order.objects.filter(pk=self.object.pk).delete_orders()
+        logger.info('Deleted order #%s: status=%s, table #%s', self.object.id, self.object.status,
+                    self.object.table_number.number)
+        return redirect(self.get_success_url())
 
-            print(
-                f"Заказ #{self.object.id}: статус = {self.object.status}, столик = {self.object.table_number.number}, занят = {self.object.table_number.is_occupied}")
 
-            if self.object.status != 2 or self.object.status != 'Оплачено':  # 2 — это статус "Оплачено"
-                print(f"Заказ #{self.object.id} активный. Освобождаем столик #{self.object.table_number.number}.")
-                # Освобождаем столик
-                table = self.object.table_number
-                table.is_occupied = False
-                table.save()
-                print(f"Столик #{table.number} освобожден.")
-            else:
-                print(f"Заказ #{self.object.id} оплачен. Столик не освобождается при удалении заказа.")
+class OrdersBulkActionView(LoginRequiredMixin, View):
+    """
+    Масавыя аперацыі над адзначанымі ў спісе заказамі: змена статусу або выдаленне
+    некалькімі запытамі на ўвесь набор, а не захаваннем кожнага заказу.
+    """
+    http_method_names = ['post']
 
-            # Удаляем заказ
-            response = super().delete(request, *args, **kwargs)
-            print(f"Заказ #{self.object.id} удален.")
+    def post(self, request, *args, **kwargs):
+        redirect_to = request.POST.get('next')
+        if not url_has_allowed_host_and_scheme(redirect_to, allowed_hosts={request.get_host()},
+                                               require_https=request.is_secure()):
+            redirect_to = reverse('orders_list')
+
+        form = OrderBulkActionForm(request.POST)
+        if not form.is_valid():
+            for errors in form.errors.values():
+                for error in errors:
+                    messages.warning(request, error)
+            return redirect(redirect_to)
+
+        orders = Order.objects.filter(pk__in=form.cleaned_data['orders'])
+        if form.cleaned_data['action'] == 'delete':
+            deleted = orders.delete_orders()
+            messages.success(request, f'Выдалена заказаў: {deleted}')
+            return redirect(redirect_to)
 
-            return response
-        except Exception as e:
-            print(f"Ошибка при удалении заказа: {e}")
-            raise  # Повторно выбрасываем исключение
+        try:
+            changed = orders.set_status(form.cleaned_data['status'], updater=request.user)
+        except TableOccupiedError as error:
+            messages.warning(request, error.messages[0])
+        else:
+            label = dict(Order.STATUS_CHOICES)[form.cleaned_data['status']]
+            messages.success(request, f'Статус "{label}" ўстаноўлены для заказаў: {changed}')
+        return redirect(redirect_to)
 
 
+class OrderEventsView(View):
+    """
+    Server-Sent Events для кухни и зала: новые заказы и смена статуса приходят сразу,
+    без перезагрузки страницы. Асинхронное представление - под ASGI (Cafe/asgi.py) открытое
+    соединение не занимает поток воркера. Под WSGI поток не отдаётся: 204 (EventSource больше не переподключается).
+    """
+    http_method_names = ['get']
+    heartbeat = 15
+    retry_ms = 3000
+
+    async def get(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        if not events.sse_available(request):
+            return HttpResponse(status=204)
+        response = StreamingHttpResponse(self._stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx не должен буферизовать поток
+        return response
+
+    async def _stream(self):
+        yield f'retry: {self.retry_ms}\n\n'
+        async for event in events.get_broker().subscribe(heartbeat=self.heartbeat):
+            yield events.format_sse(event)
+
+
+@query_budget(6)
 class DailyRevenueView(View):
+    """
+    Выручка за текущие сутки: суммы считает БД по свёрткам RevenueRollup, заказы - по paid_at.
+    Сегодняшние оплаты не архивируются (archive.archive_cutoff), поэтому хватает живой таблицы Order.
+    """
     template_name = 'orders/daily_revenue.html'
 
-    def get(self, request, *args, **kwargs):
+    def get_querysets(self):
+        """ Ленивые запросы отчёта: начало суток, оплаченные заказы и свёртки за сегодня. """
         now = timezone.now()
-        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        orders = Order.objects.filter(time_update__gte=start_of_day, status=2)
-        total_revenue = sum(order.total_price for order in orders)
+        start_of_day = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        orders = (Order.objects.for_display(with_items=False)
+                  .filter(status=2, paid_at__gte=start_of_day).order_by('paid_at'))
+        rollups = RevenueRollup.objects.filter(day=start_of_day.date())
+        return now, start_of_day, orders, rollups
+
+    @staticmethod
+    def by_hour(rollups):
+        return rollups.values('hour').annotate(revenue=Sum('revenue')).order_by('hour')
+
+    @staticmethod
+    def by_category(rollups):
+        return (rollups.values('category__name')
+                .annotate(revenue=Sum('revenue'), quantity=Sum('quantity'))
+                .order_by('-revenue'))
 
+    def get(self, request, *args, **kwargs):
+        now, start_of_day, orders, rollups = self.get_querysets()
         context = {
             'orders': orders,
-            'total_revenue': total_revenue,
+            'total_revenue': rollups.aggregate(total=Sum('revenue'))['total'] or 0,
+            'revenue_by_hour': self.by_hour(rollups),
+            'revenue_by_category': self.by_category(rollups),
             'start_of_day': start_of_day,
             'now': now,
         }
         return render(request, self.template_name, context)
 
 
-class OrderSearchView(View):
-    template_name = 'orders/order_search.html'
+class AsyncDailyRevenueView(DailyRevenueView):
+    """
+    Async-вариант DailyRevenueView: все запросы отчёта выполняются асинхронным ORM до рендеринга.
+    """
 
-    def get(self, request, *args, **kwargs):
-        form = OrderSearchForm(request.GET)
-        orders = Order.objects.all()
+    async def get(self, request, *args, **kwargs):
+        # страница без входа, но шапка читает request.user - загружаем его асинхронно
+        request.user = await request.auser()
+        now, start_of_day, orders, rollups = self.get_querysets()
+        total = await rollups.aaggregate(total=Sum('revenue'))
+        context = {
+            'orders': [order async for order in orders],
+            'total_revenue': total['total'] or 0,
+            'revenue_by_hour': [row async for row in self.by_hour(rollups)],
+            'revenue_by_category': [row async for row in self.by_category(rollups)],
+            'start_of_day': start_of_day,
+            'now': now,
+        }
+        return render(request, self.template_name, context)
+
+
+@query_budget(7)
+class RevenueReportView(LoginRequiredMixin, View):
+    """
+    Справаздача па выручцы за адвольны перыяд: усе сумы лічыць БД па згортках RevenueRollup.
+    """
+    template_name = 'orders/revenue_report.html'
 
-        query = request.GET.get('query')  # Получаем поисковый запрос из формы в хедере
+    def get_form(self):
+        today = timezone.localdate()
+        initial = {'date_from': today.replace(day=1), 'date_to': today}
+        return RevenueReportForm(self.request.GET or initial)
 
-        if query:
-            # Фильтрация по номеру стола или статусу
-            orders = orders.filter(
-                Q(table_number__number__icontains=query) |  # Поиск по номеру стола
-                Q(status__icontains=query)  # Поиск по статусу
-            )
+    def get(self, request, *args, **kwargs):
+        form = self.get_form()
+        context = {'form': form}
 
         if form.is_valid():
-            table_number = form.cleaned_data.get('table_number')
-            status = form.cleaned_data.get('status')
+            date_from, date_to = form.cleaned_data['date_from'], form.cleaned_data['date_to']
+            start, end = local_day_bounds(date_from, date_to)
+            rollups = RevenueRollup.objects.filter(day__gte=date_from, day__lte=date_to)
+
+            context.update({
+                'date_from': date_from,
+                'date_to': date_to,
+                'summary': rollups.aggregate(revenue=Sum('revenue'), quantity=Sum('quantity')),
+                'orders_count': OrderHistory.objects.filter(status=2, paid_at__gte=start, paid_at__lt=end).count(),
+                'revenue_by_day': rollups.values('day').annotate(revenue=Sum('revenue')).order_by('day'),
+                'revenue_by_category': (rollups.values('category__name')
+                                        .annotate(revenue=Sum('revenue'), quantity=Sum('quantity'))
+                                        .order_by('-revenue')),
+                'top_dishes': (rollups.values('dish__name')
+                               .annotate(revenue=Sum('revenue'), quantity=Sum('quantity'))
+                               .order_by('-revenue')[:10]),
+            })
+        return render(request, self.template_name, context)
+
+
+class _Echo:
+    """
+    Псеўда-буфер для csv.writer: радок вяртаецца адразу, нічога не назапашваецца.
+    """
+
+    def write(self, value):
+        return value
+
+
+class RevenueExportView(LoginRequiredMixin, View):
+    """
+    Экспарт аплачаных заказаў за перыяд (разам з архіўнымі) у CSV патокам:
+    радкі чытаюцца з БД кавалкамі праз iterator(chunk_size) і адразу аддаюцца кліенту.
+    """
+    chunk_size = 2000
+    header = ('order_id', 'paid_at', 'table', 'status', 'total_price')
+
+    def get(self, request, *args, **kwargs):
+        form = RevenueReportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+
+        date_from, date_to = form.cleaned_data['date_from'], form.cleaned_data['date_to']
+        start, end = local_day_bounds(date_from, date_to)
+        rows = (OrderHistory.objects.filter(status=2, paid_at__gte=start, paid_at__lt=end)
+                .order_by('paid_at', 'id')
+                .values_list('id', 'paid_at', 'table_number__number', 'status', 'total_price')
+                .iterator(chunk_size=self.chunk_size))
+
+        response = StreamingHttpResponse(self._stream(rows), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="revenue_{date_from}_{date_to}.csv"'
+        return response
+
+    def _stream(self, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.header)
+        for order_id, paid_at, table, order_status, total_price in rows:
+            yield writer.writerow((order_id, timezone.localtime(paid_at).isoformat(), table, order_status,
+                                   total_price))
+
+
+@query_budget(3)
+class OrderSearchView(KeysetPaginationMixin, ListView):
+    """
+    Поиск заказов, включая архивные: строка запроса разбирается в точные/диапазонные условия
+    по индексированным столбцам, результаты постранично (keyset).
+    """
+    template_name = 'orders/order_search.html'
+    context_object_name = 'orders'
+    paginate_by = 20
+
+    def get_queryset(self):
+        orders = OrderHistory.objects.for_display(with_items=False)
+
+        # Получаем поисковый запрос из формы в хедере
+        self.search_query = OrderSearchQuery(self.request.GET.get('query'))
+        orders = self.search_query.filter(orders)
+
+        self.form = OrderSearchForm(self.request.GET)
+        if self.form.is_valid():
+            table_number = self.form.cleaned_data.get('table_number')
+            status = self.form.cleaned_data.get('status')
 
             # Фильтрация по номеру стола
             if table_number:
                 orders = orders.filter(table_number__number=table_number)
 
             # Фильтрация по статусу
-            if status:
+            if status != '':
                 orders = orders.filter(status=status)
 
-        context = {
-            'form': form,
-            'orders': orders,
-            'query': query,  # Передаем поисковый запрос в шаблон
-        }
-        return render(request, self.template_name, context)
-
+        return orders
 
-class OrderSerializer:
-    pass
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['form'] = self.form
+        context['query'] = self.search_query.query  # Передаем поисковый запрос в шаблон
+        context['unparsed'] = self.search_query.unparsed
+        return context
 
 
+@query_budget(list=4, retrieve=4)
 class OrderViewSet(ModelViewSet):
-    queryset = Order.objects.all()
-    serializer_class = OrderSerializer
\ No newline at end of file
+    """
+    REST API заказаў: адзін POST стварае заказ разам з радкамі,
+    спіс чытаецца пастаянным лікам запытаў.
+    """
+    queryset = Order.objects.for_display()
+    serializer_class = OrderSerializer
+    renderer_classes = [JSONRenderer]
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'table_number']
+    ordering_fields = ['id', 'status', 'time_update', 'total_price']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-time_update', '-id')
+
+    def _reload(self, serializer):
+        # Перачытваем заказ з select_related/prefetch_related, каб адказ не рабіў N+1
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    def perform_create(self, serializer):
+        serializer.save(updater=self.request.user)
+        self._reload(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save(updater=self.request.user)
+        self._reload(serializer)
+
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        """Масавая змена статусу: {"ids": [...], "status": 2}"""
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            updated = Order.objects.filter(pk__in=data['ids']).set_status(data['status'], updater=request.user)
+        except TableOccupiedError as error:
+            return Response({'table_number': error.messages}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'status': 'success', 'updated': updated}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['delete'])
+    def bulk_delete(self, request):
+        """Масавае выдаленне: {"ids": [...]}, столікі актыўных заказаў вызваляюцца"""
+        serializer = OrderBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        deleted = Order.objects.filter(pk__in=data['ids']).delete_orders()
+        return Response({'status': 'success', 'deleted': deleted}, status=status.HTTP_200_OK)
+
+    def perform_destroy(self, instance):
+        """ Пры выдаленні актыўнага заказу вызваляем столік. """
+        with transaction.atomic():
+            if instance.status != 2:
+                Table.objects.release(instance.table_number_id)
+            instance.delete()
\ No newline at end of file
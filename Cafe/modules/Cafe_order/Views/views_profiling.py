@@ -0,0 +1,58 @@
+import os
+
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.views import View
+from django.views.generic import TemplateView
+
+from modules.Cafe_order.profiling import CPROFILE, cprofile_report, get_store, summarize_collapsed
+
+
+class ProfileAdminMixin:
+    """ Старонкі профіляў у афармленні адмінкі; доступ правярае admin.site.admin_view у Cafe/urls.py. """
+
+    def get_profile(self):
+        store = get_store()
+        meta = store.get(self.kwargs['profile_id'])
+        if meta is None or not os.path.exists(store.data_path(meta)):
+            raise Http404('Профиль не найден')
+        return store, meta
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(admin.site.each_context(self.request))
+        return context
+
+
+class ProfileListView(ProfileAdminMixin, TemplateView):
+    template_name = 'admin/profiles/profile_list.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['title'] = 'Профили запросов'
+        context['profiles'] = get_store().list()
+        return context
+
+
+class ProfileDetailView(ProfileAdminMixin, TemplateView):
+    """ cProfile - отчёт pstats по накопленному времени, сэмплы - частые стеки и функции. """
+    template_name = 'admin/profiles/profile_detail.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        store, meta = self.get_profile()
+        context['title'] = f"Профиль {meta['method']} {meta['path']}"
+        context['profile'] = meta
+        if meta['mode'] == CPROFILE:
+            context['report'] = cprofile_report(store.data_path(meta))
+        else:
+            with open(store.data_path(meta), encoding='utf-8') as file:
+                context['summary'] = summarize_collapsed(file.read())
+        return context
+
+
+class ProfileDownloadView(ProfileAdminMixin, View):
+    def get(self, request, profile_id):
+        store, meta = self.get_profile()
+        path = store.data_path(meta)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
@@ -1,26 +1,50 @@
 from django.contrib import admin
+
 from .models import Dish, Order, OrderItem, CategoryDish, Table
+from .pagination import EstimatedCountPaginator
 
 
 @admin.register(Dish)
 class DishAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'price', 'updater', 'time_update')
+    list_select_related = ('category', 'updater')
     search_fields = ('name',)
     list_filter = ('time_update', 'category')
+    autocomplete_fields = ('category',)
 
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('table_number', 'get_dishes', 'status', 'total_price', 'updater', 'time_update', )
+    """
+    Заказы: названия блюд приходят одной аннотацией, столик и автор - JOIN,
+    количество строк на больших таблицах - оценкой из плана запроса.
+    """
+    list_display = ('id', 'table_number', 'get_dishes', 'status', 'total_price', 'updater', 'time_update', )
     list_filter = ('status', 'time_update')
-    search_fields = ('table_number',)
+    search_fields = ('=id', '=table_number__number')
+    ordering = ('-time_update', '-id')
+    autocomplete_fields = ('table_number', 'updater')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('table_number', 'updater').with_dish_names()
 
     def get_dishes(self, obj):
-        return ", ".join([dish.name for dish in obj.dishes.all()])
+        return obj.dish_names or '-'
     get_dishes.short_description = 'Блюда'
 
 
-admin.site.register(OrderItem)
+@admin.register(OrderItem)
+class OrderItemAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'dish', 'quantity')
+    list_select_related = ('order__table_number', 'dish')
+    search_fields = ('=order__id', 'dish__name')
+    autocomplete_fields = ('order', 'dish')
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 @admin.register(CategoryDish)
 class CategoryDish(admin.ModelAdmin):
@@ -31,4 +55,4 @@ class CategoryDish(admin.ModelAdmin):
 class TableAdmin(admin.ModelAdmin):
     list_display = ('number', 'is_occupied', )
     search_fields = ('number',)
-    list_filter = ('is_occupied',)
\ No newline at end of file
+    list_filter = ('is_occupied',)
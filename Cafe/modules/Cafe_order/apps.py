@@ -5,3 +5,8 @@ class CafeOrderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'modules.Cafe_order'
     verbose_name = 'Cafe_Order'
+
+    def ready(self):
+        from modules.Cafe_order import signals  # noqa: F401
+        # замер SQL вешаецца на кожнае новае злучэнне з БД (сігнал connection_created)
+        from modules.Cafe_order import instrumentation  # noqa: F401
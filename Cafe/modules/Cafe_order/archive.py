@@ -0,0 +1,83 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from modules.Cafe_order.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, local_day_bounds
+
+DEFAULTS = {
+    'AFTER_DAYS': 90,
+    'BATCH_SIZE': 1000,
+}
+ORDER_FIELDS = ('id', 'table_number_id', 'status', 'updater_id', 'time_update', 'total_price', 'paid_at')
+ITEM_FIELDS = ('id', 'order_id', 'dish_id', 'quantity', 'price')
+
+
+def archive_settings():
+    return {**DEFAULTS, **getattr(settings, 'ORDER_ARCHIVE', {})}
+
+
+def archive_cutoff(after_days):
+    """
+    Начало местного дня after_days дней назад: архивируются заказы, оплаченные раньше.
+    Сегодняшние оплаты остаются в Order, поэтому DailyRevenueView читает только живую таблицу.
+    """
+    if after_days < 1:
+        raise ValueError('after_days must be at least 1')
+    cutoff_day = timezone.localdate() - datetime.timedelta(days=after_days)
+    return local_day_bounds(cutoff_day, cutoff_day)[0]
+
+
+def archivable_orders(cutoff):
+    return Order.objects.filter(status=2, paid_at__lt=cutoff)
+
+
+class OrderArchiver:
+    """
+    Перенос оплаченных заказов старше cutoff со строками в ArchivedOrder / ArchivedOrderItem.
+    Каждая пачка из batch_size заказов - отдельная транзакция: строки блокируются (FOR UPDATE SKIP LOCKED,
+    заказ, который сейчас переоткрывают, дождётся следующего запуска), копируются с прежними id
+    и удаляются из живых таблиц. Свёртки выручки и занятость столиков не меняются:
+    оплаченный заказ столик не занимает, а его выручка уже в RevenueRollup.
+    """
+
+    def __init__(self, cutoff, batch_size=1000):
+        self.cutoff = cutoff
+        self.batch_size = batch_size
+        self.orders = 0
+        self.items = 0
+
+    def run(self, on_batch=None):
+        """ Архивирует пачки, пока есть что переносить; on_batch(orders, items) - после каждой пачки. """
+        while True:
+            orders, items = self.archive_batch()
+            if not orders:
+                return self.orders, self.items
+            self.orders += orders
+            self.items += items
+            if on_batch is not None:
+                on_batch(orders, items)
+
+    def archive_batch(self):
+        archived_at = timezone.now()
+        with transaction.atomic():
+            order_ids = list(
+                archivable_orders(self.cutoff).select_for_update(skip_locked=True)
+                .order_by('pk').values_list('pk', flat=True)[:self.batch_size]
+            )
+            if not order_ids:
+                return 0, 0
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(archived_at=archived_at, **values)
+                for values in Order.objects.filter(pk__in=order_ids).values(*ORDER_FIELDS)
+            )
+            items = ArchivedOrderItem.objects.bulk_create(
+                (ArchivedOrderItem(**values)
+                 for values in OrderItem.objects.filter(order_id__in=order_ids).values(*ITEM_FIELDS).iterator()),
+                batch_size=self.batch_size,
+            )
+            # delete() queryset'а не вызывает Order.save()/OrderItem.delete(): без пересчёта сумм и событий
+            OrderItem.objects.filter(order_id__in=order_ids).delete()
+            Order.objects.filter(pk__in=order_ids).delete()
+        return len(order_ids), len(items)
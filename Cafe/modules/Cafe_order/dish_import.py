@@ -0,0 +1,243 @@
+import codecs
+import csv
+import json
+import posixpath
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from modules.Cafe_order.forms import DishImportForm
+from modules.Cafe_order.images import schedule_dish_variants
+from modules.Cafe_order.menu_cache import bump_menu_version
+from modules.Cafe_order.models import CategoryDish, Dish
+
+SUPPORTED_FORMATS = ('csv', 'json', 'jsonl')
+IMPORT_FIELDS = ('name', 'category', 'price', 'description', 'image')
+REQUIRED_COLUMNS = ('name', 'category', 'price', 'description')
+UPDATE_FIELDS = ('description', 'category', 'price', 'image', 'updater', 'time_update')
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+class DishImportError(ValueError):
+    """
+    Файл нельга імпартаваць цалкам: невядомы фармат, няма абавязковых слупкоў, сапсаваны JSON.
+    Памылкі асобных радкоў сюды не трапляюць - яны збіраюцца ў DishImporter.errors.
+    """
+
+
+def detect_format(filename, explicit=None):
+    """ Фармат па яўным значэнні або па пашырэнні файла (.ndjson лічыцца jsonl). """
+    file_format = (explicit or posixpath.splitext(filename or '')[1].lstrip('.')).lower()
+    file_format = 'jsonl' if file_format == 'ndjson' else file_format
+    if file_format not in SUPPORTED_FORMATS:
+        raise DishImportError(f'Unsupported format "{file_format}", expected one of: {", ".join(SUPPORTED_FORMATS)}')
+    return file_format
+
+
+def _iter_csv(text, delimiter):
+    reader = csv.DictReader(text, delimiter=delimiter)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise DishImportError(f'Missing CSV columns: {", ".join(missing)}')
+    for row in reader:
+        # нумар радка ў файле (з загалоўкам), каб памылку можна было знайсці ў рэдактары
+        yield reader.line_num, row
+
+
+def _iter_json_lines(text):
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def _iter_json_array(text):
+    """
+    Масіў JSON-аб'ектаў чытаецца кавалкамі: у памяці толькі бягучы кавалак, а не ўвесь файл.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, number, eof = '', 0, 0, False
+    started = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise DishImportError('JSON file must contain an array of objects')
+            started, position = True, position + 1
+            continue
+        if started and position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            if position >= len(buffer):
+                raise ValueError('need more data')
+            record, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                raise DishImportError(f'Invalid JSON after record {number}')
+            chunk = text.read(JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        number += 1
+        position = end
+        yield number, record
+
+
+def iter_records(file, file_format, delimiter=','):
+    """
+    Запісы з бінарнага файла па адным: (нумар радка/запісу, слоўнік або None для несапраўднага радка).
+    Кадоўка - UTF-8 (BOM, які дадае Excel, прапускаецца).
+    """
+    text = codecs.getreader('utf-8-sig')(file)
+    if file_format == 'csv':
+        return _iter_csv(text, delimiter)
+    if file_format == 'jsonl':
+        return _iter_json_lines(text)
+    return _iter_json_array(text)
+
+
+class DishImporter:
+    """
+    Потоковый импорт блюд. Строка проверяется правилами DishCreateForm (DishImportForm),
+    категория ищется по имени в словаре, загруженном одним запросом, блюдо с таким же именем
+    обновляется. Запись пачками: bulk_create/bulk_update по batch_size строк в одной транзакции,
+    в ней же создаются новые категории (create_categories) принятых строк.
+
+    После run(): created, updated и errors - [{'row': N, 'name': ..., 'errors': {поле: [сообщения]}}].
+    """
+
+    def __init__(self, batch_size=500, create_categories=False, updater=None, dry_run=False):
+        self.batch_size = batch_size
+        self.create_categories = create_categories
+        self.updater = updater
+        self.dry_run = dry_run
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self._categories = {category.name.casefold(): category for category in CategoryDish.objects.all()}
+        self._image_field = Dish._meta.get_field('image')
+        self._pending = []
+        self._seen_names = set()
+        self._new_images = []
+
+    def run(self, records):
+        for number, record in records:
+            self.add(number, record)
+        self.flush()
+        if not self.dry_run and (self.created or self.updated):
+            # bulk-аперацыі не дасылаюць сігналы - меню і варыянты выяў абнаўляюцца тут
+            transaction.on_commit(bump_menu_version)
+            for dish_id in self._new_images:
+                transaction.on_commit(lambda dish_id=dish_id: schedule_dish_variants(dish_id))
+        return self
+
+    def add(self, number, record):
+        if not isinstance(record, dict):
+            self._error(number, None, {'__all__': ['Запіс не з\'яўляецца аб\'ектам з палямі страў.']})
+            return
+        data = {key: '' if value is None else str(value).strip()
+                for key, value in record.items() if key in IMPORT_FIELDS}
+        form = DishImportForm(data=data)
+        errors = {field: list(messages) for field, messages in form.errors.items()} if not form.is_valid() else {}
+
+        category = self._resolve_category(data.get('category', ''), errors)
+        image = data.get('image', '')
+        if image:
+            self._check_image(image, errors)
+        name = form.cleaned_data.get('name')
+        if name in self._seen_names:
+            errors.setdefault('name', []).append('Страва з такой назвай ужо ёсць вышэй у файле.')
+
+        if errors:
+            self._error(number, data.get('name'), errors)
+            return
+        self._seen_names.add(name)
+        dish = form.save(commit=False)
+        dish.category = category
+        dish.updater = self.updater
+        if image:
+            dish.image = image
+        self._pending.append((number, dish, bool(image)))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        existing = {}
+        for dish in Dish.objects.filter(name__in=[dish.name for _, dish, _ in self._pending]):
+            existing.setdefault(dish.name, []).append(dish)
+        now = timezone.now()
+        to_create, to_update, new_images, new_categories = [], [], [], {}
+        for number, dish, has_image in self._pending:
+            current = existing.get(dish.name, [])
+            if len(current) > 1:
+                # назва ў базе не ўнікальная - невядома, якую са страў абнаўляць
+                self._error(number, dish.name, {'name': [
+                    f'У базе {len(current)} страў з такой назвай, незразумела, якую абнавіць.']})
+                continue
+            if dish.category.pk is None:
+                new_categories[dish.category.name.casefold()] = dish.category
+            if not current:
+                to_create.append(dish)
+                if has_image:
+                    new_images.append(dish)
+                continue
+            current = current[0]
+            current.description, current.category, current.price = dish.description, dish.category, dish.price
+            current.updater, current.time_update = dish.updater, now
+            if has_image and current.image.name != dish.image.name:
+                current.image = dish.image
+                new_images.append(current)
+            to_update.append(current)
+        self._pending = []
+
+        if not self.dry_run:
+            with transaction.atomic():
+                # новыя катэгорыі - толькі для прынятых радкоў і ў той жа транзакцыі, што і стравы
+                for category in new_categories.values():
+                    category.save()
+                Dish.objects.bulk_create(to_create, batch_size=self.batch_size)
+                Dish.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=self.batch_size)
+            self._new_images.extend(dish.pk for dish in new_images if dish.pk is not None)
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+    def _resolve_category(self, name, errors):
+        if not name:
+            errors.setdefault('category', []).append('Абавязковае поле.')
+            return None
+        category = self._categories.get(name.casefold())
+        if category is not None:
+            return category
+        if not self.create_categories:
+            errors.setdefault('category', []).append(f'Катэгорыя "{name}" не знойдзена.')
+            return None
+        # захоўваецца ў flush(), калі радок з ёй будзе прыняты
+        category = CategoryDish(name=name)
+        self._categories[name.casefold()] = category
+        return category
+
+    def _check_image(self, path, errors):
+        """ Выява - шлях да ўжо загружанага файла ў MEDIA_ROOT, тыя ж пашырэнні, што і ў Dish.image. """
+        try:
+            self._image_field.run_validators(Dish(image=path).image)
+        except ValidationError as error:
+            errors.setdefault('image', []).extend(error.messages)
+            return
+        if not default_storage.exists(path):
+            errors.setdefault('image', []).append(f'Файл "{path}" не знойдзены.')
+
+    def _error(self, number, name, errors):
+        self.errors.append({'row': number, 'name': name, 'errors': errors})
+
+
+def import_dishes(file, file_format, delimiter=',', **options):
+    """ Імпарт з бінарнага файла; options перадаюцца ў DishImporter. """
+    return DishImporter(**options).run(iter_records(file, file_format, delimiter=delimiter))
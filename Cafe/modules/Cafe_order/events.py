@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+
+DEFAULT_BACKEND = 'modules.Cafe_order.events.LocalBroker'
+
+
+class _Subscription:
+    """
+    Чарга аднаго падпісчыка (аднаго SSE-злучэння) у яго цыкле падзей.
+    Павольны кліент не трымае астатніх: пры перапаўненні выкідваецца самая старая падзея.
+    """
+
+    def __init__(self, loop, max_queue):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # цыкл ужо закрыты - злучэнне завяршаецца, падпіска хутка знікне
+            pass
+
+
+class LocalBroker:
+    """
+    Pub/sub у межах аднаго працэсу: publish() можна выклікаць з любога патоку (сінхронны код
+    захавання заказу), subscribe() - асінхронны ітэратар для SSE. Падзеі не захоўваюцца:
+    хто не падпісаны ў момант публікацыі, іх не атрымае.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        self._fan_out(event)
+
+    def _fan_out(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    async def subscribe(self, heartbeat=15):
+        """
+        Падзеі па меры з'яўлення; калі heartbeat секунд падзей няма - None (для ping-каментара SSE,
+        каб проксі не закрывалі злучэнне).
+        """
+        subscription = _Subscription(asyncio.get_running_loop(), self.max_queue)
+        self._add(subscription)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+        finally:
+            self._remove(subscription)
+
+
+class FileBroker(LocalBroker):
+    """
+    Замена знешняга брокера для некалькіх воркераў на адной машыне: publish() дапісвае падзею
+    радком JSON у агульны файл (O_APPEND, радок меншы за PIPE_BUF запісваецца цэлым),
+    а ў кожным воркеры адна фонавая задача чытае новыя радкі і раздае іх сваім падпісчыкам.
+    Пры перавышэнні max_bytes файл ротацыйна пераносіцца ў path + '.1'.
+    """
+
+    def __init__(self, path, poll_interval=0.5, max_bytes=5 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._reader = None
+
+    def publish(self, event):
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(line)
+            size = file.tell()
+        if size > self.max_bytes:
+            os.replace(self.path, self.path + '.1')
+
+    def _add(self, subscription):
+        super()._add(subscription)
+        with self._lock:
+            if self._reader is None or self._reader.done():
+                self._reader = subscription.loop.create_task(self._tail())
+
+    def _remove(self, subscription):
+        super()._remove(subscription)
+        with self._lock:
+            if not self._subscribers and self._reader is not None:
+                self._reader.cancel()
+                self._reader = None
+
+    def _open_at_end(self):
+        try:
+            file = open(self.path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return None, None
+        file.seek(0, os.SEEK_END)
+        return file, os.fstat(file.fileno()).st_ino
+
+    def _read_lines(self, state):
+        """ Новыя цэлыя радкі файла; пры ротацыі дачытвае стары файл і пераходзіць на новы. """
+        file, inode, pending = state
+        if file is None:
+            try:
+                file, inode = open(self.path, 'r', encoding='utf-8'), os.stat(self.path).st_ino
+            except FileNotFoundError:
+                return [], (None, None, '')
+        lines = []
+        chunk = pending + file.read()
+        *complete, pending = chunk.split('\n')
+        lines.extend(complete)
+        try:
+            rotated = os.stat(self.path).st_ino != inode
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            file.close()
+            file, inode, pending = None, None, ''
+        return lines, (file, inode, pending)
+
+    async def _tail(self):
+        file, inode = await asyncio.to_thread(self._open_at_end)
+        state = (file, inode, '')
+        try:
+            while True:
+                lines, state = await asyncio.to_thread(self._read_lines, state)
+                for line in lines:
+                    if not line:
+                        continue
+                    try:
+                        self._fan_out(json.loads(line))
+                    except ValueError:
+                        logger.warning('Skipping malformed order event line: %r', line[:200])
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            if state[0] is not None:
+                state[0].close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """ Брокер з settings.ORDER_EVENTS (BACKEND + OPTIONS), адзін на працэс. """
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            config = getattr(settings, 'ORDER_EVENTS', {})
+            backend = import_string(config.get('BACKEND', DEFAULT_BACKEND))
+            _broker = backend(**config.get('OPTIONS', {}))
+        return _broker
+
+
+@receiver(setting_changed)
+def _reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'ORDER_EVENTS':
+        with _broker_lock:
+            _broker = None
+
+
+def publish(event_type, **payload):
+    """
+    Публікуе падзею; памылка брокера не павінна ламаць захаванне заказу - толькі лог.
+    Выклікаць пасля каміта (transaction.on_commit), каб кліенты не ўбачылі адкачаныя змены.
+    """
+    event = {'id': uuid.uuid4().hex, 'type': event_type, 'time': timezone.now().isoformat(), **payload}
+    try:
+        get_broker().publish(event)
+    except Exception:
+        logger.exception('Cannot publish order event %s', event_type)
+    return event
+
+
+def sse_available(request):
+    """
+    SSE працуе толькі пад ASGI: WSGI-апрацоўшчык чытае асінхронны генератар StreamingHttpResponse
+    цалкам да адпраўкі, і бясконцы паток займаў бы паток воркера назаўжды.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def format_sse(event):
+    """ Падзея ў фармаце text/event-stream; None - ping-каментар. """
+    if event is None:
+        return ': ping\n\n'
+    data = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
@@ -2,7 +2,7 @@ import re
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django import forms
-from django.forms import inlineformset_factory
+from django.forms import BaseInlineFormSet, inlineformset_factory
 
 from .models import *
 
@@ -39,6 +39,31 @@ class DishCreateForm(forms.ModelForm):
 
 
 
+class DishImportForm(DishCreateForm):
+    """
+    Строка массового импорта: правила DishCreateForm, но категория и картинка
+    приходят строками и разбираются импортёром (modules/Cafe_order/dish_import.py) без запросов к БД.
+    """
+
+    class Meta(DishCreateForm.Meta):
+        fields = ('name', 'price', 'description')
+
+
+class DishesImportUploadForm(forms.Form):
+    """
+    Загрузка файла для импорта блюд на сайте
+    """
+    file = forms.FileField(label="Файл (CSV, JSON, JSON Lines)")
+    create_categories = forms.BooleanField(label="Создавать недостающие категории", required=False)
+    dry_run = forms.BooleanField(label="Только проверить, не сохранять", required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['file'].widget.attrs.update({'class': 'form-control'})
+        for name in ('create_categories', 'dry_run'):
+            self.fields[name].widget.attrs.update({'class': 'form-check-input'})
+
+
 class DishUpdateForm(DishCreateForm):
     """
     Форма обновления региона на сайте
@@ -110,7 +135,52 @@ class OrderItemForm(forms.ModelForm):
         fields = ["dish", "quantity"]
 
 
-OrderItemFormSet = inlineformset_factory(Order, OrderItem, form=OrderItemForm, extra=1, can_delete=True)
+class BaseOrderItemFormSet(BaseInlineFormSet):
+    """
+    Formset элементаў заказу: радкі захоўваюцца без паасобнага абнаўлення total_price,
+    агульны кошт (і выручка аплачанага заказа ў згортках) пералічваецца адзін раз пасля захавання ўсяго formset'а.
+    Спіс страў для выбару чытаецца з БД адзін раз на formset, а не ў кожным радку.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._dish_choices = None
+        super().__init__(*args, **kwargs)
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        if self._dish_choices is None:
+            self._dish_choices = list(form.fields["dish"].choices)
+        form.fields["dish"].choices = self._dish_choices
+        return form
+
+    def save_new(self, form, commit=True):
+        obj = super().save_new(form, commit=False)
+        if commit:
+            obj.save(update_order_total=False)
+        return obj
+
+    def save_existing(self, form, obj, commit=True):
+        obj = super().save_existing(form, obj, commit=False)
+        if commit:
+            obj.save(update_order_total=False)
+        return obj
+
+    def delete_existing(self, obj, commit=True):
+        if commit:
+            obj.delete(update_order_total=False)
+
+    def save(self, commit=True):
+        if not commit:
+            return super().save(commit=False)
+        with RevenueRollup.objects.reapplying([self.instance.pk]):
+            saved = super().save(commit=True)
+            self.instance.calculate_total_price()
+        return saved
+
+
+OrderItemFormSet = inlineformset_factory(
+    Order, OrderItem, form=OrderItemForm, formset=BaseOrderItemFormSet, extra=1, can_delete=True
+)
 
 class OrderUpdateForm(forms.ModelForm):
     """
@@ -123,4 +193,66 @@ class OrderUpdateForm(forms.ModelForm):
 
 class OrderSearchForm(forms.Form):
     table_number = forms.IntegerField(required=False, label="Номер стола")
-    status = forms.ChoiceField(choices=Order.STATUS_CHOICES, required=False, label="Статус заказа")
+    status = forms.TypedChoiceField(choices=(('', '---------'),) + Order.STATUS_CHOICES, coerce=int, empty_value='',
+                                    required=False, label="Статус заказа")
+
+
+
+class RevenueReportForm(forms.Form):
+    """
+    Форма перыяду для справаздачы па выручцы
+    """
+    date_from = forms.DateField(label="З", widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    date_to = forms.DateField(label="Па", widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError("Пачатак перыяду не можа быць пазней за канец.")
+        return cleaned_data
+
+
+class IdListField(forms.Field):
+    """
+    Спіс ідэнтыфікатараў з некалькіх checkbox'аў з аднолькавым name. Па БД не правяраецца:
+    неіснуючыя id проста не трапяць у UPDATE/DELETE.
+    """
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return sorted({int(item) for item in value})
+        except (TypeError, ValueError):
+            raise ValidationError("Некарэктны спіс ідэнтыфікатараў.", code='invalid')
+
+
+class OrderBulkActionForm(forms.Form):
+    """
+    Масавая аперацыя над адзначанымі заказамі: змена статусу або выдаленне
+    """
+    ACTION_CHOICES = (
+        ('status', 'Змяніць статус'),
+        ('delete', 'Выдаліць'),
+    )
+
+    orders = IdListField(label="Заказы", error_messages={'required': "Адзначце хаця б адзін заказ."})
+    action = forms.ChoiceField(choices=ACTION_CHOICES, label="Дзеянне")
+    status = forms.TypedChoiceField(choices=(('', '---------'),) + Order.STATUS_CHOICES, coerce=int, empty_value=None,
+                                    required=False, label="Новы статус")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') == 'status' and cleaned_data.get('status') is None:
+            self.add_error('status', "Выберыце новы статус.")
+        return cleaned_data
+
+
+class DishBulkDeleteForm(forms.Form):
+    """
+    Выдаленне некалькіх страў адразу
+    """
+    dishes = forms.ModelMultipleChoiceField(queryset=Dish.objects.all(), label="Стравы",
+                                            error_messages={'required': "Адзначце хаця б адну страву."})
@@ -0,0 +1,145 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from modules.Cafe_order.menu_cache import bump_menu_version
+from modules.Cafe_order.models import Dish
+
+logger = logging.getLogger(__name__)
+
+# Варыянты выявы стравы: назва -> максімальны памер (шырыня, вышыня). Прапорцыі захоўваюцца,
+# малыя выявы не павялічваюцца.
+IMAGE_VARIANTS = {
+    'thumb': (400, 300),
+    'detail': (1200, 900),
+}
+VARIANTS_DIR = 'images/variants'
+DEFAULT_IMAGE = Dish._meta.get_field('image').default
+JPEG_QUALITY = 82
+WEBP_QUALITY = 78
+
+_executor = None
+
+
+def get_executor():
+    """ Агульны пул патокаў для фонавай апрацоўкі выяў (DISH_IMAGE_WORKERS, па змаўчанні 2). """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.DISH_IMAGE_WORKERS,
+            thread_name_prefix='dish-images',
+        )
+    return _executor
+
+
+def variant_name(source_name, variant, extension):
+    """
+    Шлях варыянта выводзіцца з шляху арыгінала: images/2025/01/29/Img.png ->
+    images/variants/2025/01/29/Img_thumb.webp. Новая загрузка атрымлівае новае імя ад сховішча,
+    таму варыянты розных арыгіналаў не перасякаюцца, а агульны default.png апрацоўваецца адзін раз.
+    """
+    stem = posixpath.splitext(source_name)[0]
+    if stem.startswith('images/'):
+        stem = stem[len('images/'):]
+    return f'{VARIANTS_DIR}/{stem}_{variant}.{extension}'
+
+
+def _encode(image, image_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _render_variants(source, storage, source_name, force=False):
+    """
+    Усе варыянты аднаго арыгінала: для кожнага памеру - файл у зыходным фармаце (JPEG/PNG) і WebP.
+    Ужо існуючыя файлы не перагенераваюцца (калі не force).
+    """
+    keep_png = posixpath.splitext(source_name)[1].lower() == '.png'
+    fallback_ext, fallback_format = ('png', 'PNG') if keep_png else ('jpg', 'JPEG')
+    variants = {'source': source_name}
+    for variant, size in IMAGE_VARIANTS.items():
+        names = {
+            variant: variant_name(source_name, variant, fallback_ext),
+            f'{variant}_webp': variant_name(source_name, variant, 'webp'),
+        }
+        if not force and all(storage.exists(name) for name in names.values()):
+            variants.update(names)
+            continue
+
+        resized = source.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+        if keep_png:
+            fallback = _encode(resized, fallback_format, optimize=True)
+        else:
+            fallback = _encode(resized.convert('RGB'), fallback_format, quality=JPEG_QUALITY, optimize=True,
+                               progressive=True)
+        webp = _encode(resized, 'WEBP', quality=WEBP_QUALITY, method=4)
+
+        for key, content in ((variant, fallback), (f'{variant}_webp', webp)):
+            if storage.exists(names[key]):
+                storage.delete(names[key])
+            variants[key] = storage.save(names[key], content)
+    return variants
+
+
+def build_dish_variants(dish, force=False):
+    """
+    Генеруе варыянты выявы стравы і запісвае іх у Dish.image_variants.
+    Запіс умоўны (image не змяніўся за час апрацоўкі), каб не перацерці вынік больш новай загрузкі.
+    Вяртае слоўнік варыянтаў або None, калі выявы няма ці яе не ўдалося прачытаць.
+    """
+    if not dish.image:
+        return None
+    source_name = dish.image.name
+    storage = dish.image.storage
+    try:
+        with storage.open(source_name, 'rb') as file, Image.open(file) as source:
+            source = ImageOps.exif_transpose(source)
+            if source.mode not in ('RGB', 'RGBA'):
+                source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+            variants = _render_variants(source, storage, source_name, force=force)
+    except (OSError, ValueError):
+        logger.exception('Cannot build image variants for dish %s (%s)', dish.pk, source_name)
+        return None
+
+    # time_update змяняецца, каб ETag API стравы ўлічыў новыя спасылкі
+    updated = Dish.objects.filter(pk=dish.pk, image=source_name).update(
+        image_variants=variants, time_update=timezone.now(),
+    )
+    if updated:
+        dish.image_variants = variants
+        # queryset.update() не дасылае сігналы - здымак меню інвалідуецца тут
+        bump_menu_version()
+    return variants
+
+
+def _build_in_background(dish_id):
+    close_old_connections()
+    try:
+        dish = Dish.objects.filter(pk=dish_id).first()
+        if dish is not None:
+            build_dish_variants(dish)
+    except Exception:
+        logger.exception('Image variants job failed for dish %s', dish_id)
+    finally:
+        # кожны паток мае сваё злучэнне з БД - не пакідаем яго адкрытым
+        connection.close()
+
+
+def schedule_dish_variants(dish_id):
+    """
+    Ставіць генерацыю варыянтаў у фонавы пул; запыт, які загрузіў выяву, не чакае.
+    DISH_IMAGE_WORKERS = 0 - генерацыя ў бягучым патоку (тэсты, каманды).
+    """
+    if not settings.DISH_IMAGE_WORKERS:
+        dish = Dish.objects.filter(pk=dish_id).first()
+        return build_dish_variants(dish) if dish is not None else None
+    return get_executor().submit(_build_in_background, dish_id)
@@ -0,0 +1,202 @@
+import heapq
+import itertools
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+from modules.Cafe_order.metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING_HEADER': True,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERIES': 5,
+}
+
+# Метрыкі запыту, які зараз апрацоўваецца; sync_to_async капіюе кантэкст, таму
+# запыты ORM з async-прадстаўленняў трапляюць у метрыкі свайго HTTP-запыту
+_current = ContextVar('request_metrics', default=None)
+
+
+def timing_settings():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_TIMING', {})}
+
+
+class RequestMetrics:
+    """ Лічыльнікі аднаго HTTP-запыту: SQL (колькасць, час, самыя павольныя), рэндэр шаблонаў, агульны час. """
+
+    def __init__(self, keep_queries=5):
+        self.started = time.perf_counter()
+        self.keep_queries = keep_queries
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._slowest = []
+        self._order = itertools.count()
+
+    def add_query(self, sql, duration, alias):
+        self.db_queries += 1
+        self.db_time += duration
+        if self.keep_queries:
+            # мін-куча на keep_queries элементаў: памяць не расце разам з колькасцю запытаў
+            entry = (duration, next(self._order), sql, alias)
+            if len(self._slowest) < self.keep_queries:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest_queries(self):
+        """ Толькі тэкст SQL з плэйсхолдэрамі: параметры (ключы сесій, даныя кліентаў) у лог не трапляюць. """
+        return [
+            {'ms': round(duration * 1000, 2), 'db': alias, 'sql': sql}
+            for duration, _, sql, alias in sorted(self._slowest, reverse=True)
+        ]
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_request_metrics():
+    """ RequestMetrics запыту, які зараз апрацоўваецца, або None (па-за RequestTimingMiddleware). """
+    return _current.get()
+
+
+def _timed_execute(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started, context['connection'].alias)
+
+
+def _install_wrapper(connection):
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+@receiver(connection_created)
+def _instrument_connection(sender, connection, **kwargs):
+    _install_wrapper(connection)
+
+
+class TimedTemplate:
+    """ Шаблон бэкенда з замерам render(); {% include %} рэндэрацца ўнутры і асобна не лічацца. """
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """ DjangoTemplates, шаблоны якога ўлічваюць час рэндэру ў RequestTimingMiddleware. """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class RequestTimingMiddleware:
+    """
+    Час запыту па частках: колькасць і час SQL, рэндэр шаблонаў, агульны час.
+    Вынік - загаловак Server-Timing (відаць у DevTools браўзера) і JSON-радок у лог modules.Cafe_order.instrumentation:
+    INFO на кожны запыт, WARNING з самымі павольнымі SQL, калі запыт даўжэйшы за SLOW_REQUEST_MS.
+    Гэтыя ж замеры трапляюць у гістаграмы /metrics (modules/Cafe_order/metrics.py).
+    Налады - settings.REQUEST_TIMING. Для струменевых адказаў (SSE, CSV) улічваецца час да першага байта.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = timing_settings()
+        if not config['ENABLED']:
+            return self.get_response(request)
+        metrics, token = self._start(config)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, metrics, config)
+        return response
+
+    async def __acall__(self, request):
+        config = timing_settings()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+        metrics, token = self._start(config)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, metrics, config)
+        return response
+
+    @staticmethod
+    def _start(config):
+        # злучэнні, адкрытыя да імпарту модуля (да сігналу connection_created), таксама ўлічваюцца
+        for connection in connections.all(initialized_only=True):
+            _install_wrapper(connection)
+        metrics = RequestMetrics(keep_queries=config['SLOW_QUERIES'])
+        return metrics, _current.set(metrics)
+
+    def _finish(self, request, response, metrics, config):
+        total = metrics.elapsed()
+        if config['SERVER_TIMING_HEADER']:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+                f'tpl;dur={metrics.template_time * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ))
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_queries': metrics.db_queries,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'template_ms': round(metrics.template_time * 1000, 1),
+        }
+        observe_request(record['view'], request.method, response.status_code, total, metrics.db_queries,
+                        metrics.db_time)
+        slow = config['SLOW_REQUEST_MS'] is not None and record['total_ms'] >= config['SLOW_REQUEST_MS']
+        if slow:
+            record['slow'] = True
+            record['slowest_queries'] = metrics.slowest_queries()
+            logger.warning(json.dumps(record, ensure_ascii=False), extra={'request_timing': record})
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, ensure_ascii=False), extra={'request_timing': record})
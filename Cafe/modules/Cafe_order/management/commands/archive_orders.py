@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from modules.Cafe_order.archive import OrderArchiver, archivable_orders, archive_cutoff, archive_settings
+
+
+class Command(BaseCommand):
+    """
+    Перенос старых оплаченных заказов в архивные таблицы. Запускается по расписанию, например из cron раз в сутки:
+        python manage.py archive_orders
+    """
+    help = 'Пераносіць аплачаныя заказы старэйшыя за ORDER_ARCHIVE["AFTER_DAYS"] дзён у архіўныя табліцы'
+
+    def add_arguments(self, parser):
+        config = archive_settings()
+        parser.add_argument('--days', type=int, default=config['AFTER_DAYS'],
+                            help='Архіваваць заказы, аплачаныя раней за столькі дзён таму (не менш за 1)')
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'],
+                            help='Колькі заказаў пераносіць у адной транзакцыі')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Толькі палічыць заказы, нічога не пераносіць')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days павінна быць не менш за 1: сённяшнія аплаты застаюцца ў Order')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size павінна быць не менш за 1')
+        cutoff = archive_cutoff(options['days'])
+
+        if options['dry_run']:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f'Заказаў да архівацыі (аплачаны да {cutoff:%Y-%m-%d %H:%M}): {count}')
+            return
+
+        archiver = OrderArchiver(cutoff, batch_size=options['batch_size'])
+        orders, items = archiver.run(
+            on_batch=lambda orders, items: self.stdout.write(f'Заказаў: {orders}, радкоў: {items}'))
+        self.stdout.write(self.style.SUCCESS(f'Перанесена ў архіў заказаў: {orders}, радкоў: {items}'))
@@ -0,0 +1,46 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from modules.Cafe_order.models import OrderHistory, RevenueRollup
+
+
+class Command(BaseCommand):
+    """
+    Пересборка свёрток выручки (день × час × блюдо) по истории оплаченных заказов.
+    """
+    help = 'Пераразлічвае RevenueRollup за перыяд па аплачаных заказах, уключна з архіўнымі (па змаўчанні - за ўсю гісторыю)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat,
+                            help='Першы дзень (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=datetime.date.fromisoformat,
+                            help='Апошні дзень уключна (YYYY-MM-DD)')
+        parser.add_argument('--days-per-batch', type=int, default=31,
+                            help='Колькі дзён пералічваць у адной транзакцыі')
+
+    def handle(self, *args, **options):
+        date_from, date_to = options['date_from'], options['date_to']
+        if date_from is None or date_to is None:
+            bounds = OrderHistory.objects.filter(status=2).aggregate(first=Min('paid_at'), last=Max('paid_at'))
+            if bounds['first'] is None:
+                self.stdout.write('Аплачаных заказаў няма.')
+                return
+            date_from = date_from or timezone.localdate(bounds['first'])
+            date_to = date_to or timezone.localdate(bounds['last'])
+        if date_from > date_to:
+            raise CommandError('--from не можа быць пазней за --to')
+
+        step = datetime.timedelta(days=options['days_per_batch'])
+        total = 0
+        batch_start = date_from
+        while batch_start <= date_to:
+            batch_end = min(batch_start + step - datetime.timedelta(days=1), date_to)
+            created = RevenueRollup.objects.rebuild(batch_start, batch_end)
+            total += created
+            self.stdout.write(f'{batch_start} - {batch_end}: {created}')
+            batch_start = batch_end + datetime.timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Радкоў згортак створана: {total}'))
@@ -0,0 +1,189 @@
+import asyncio
+import itertools
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from modules.Cafe_order.models import Order
+
+HOST = 'localhost'
+
+# Гарачыя старонкі: (sync-маршрут, async-варыянт)
+ROUTES = (
+    ('dishes', 'dishes_async'),
+    ('orders_list', 'orders_list_async'),
+    ('order_detail', 'order_detail_async'),
+    ('daily_revenue', 'daily_revenue_async'),
+)
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _asgi_request(application, path, cookie):
+    """ Адзін GET праз ASGI-прыкладанне без сеткі; вяртае HTTP-статус. """
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+    }
+    finished = asyncio.Event()
+    request_sent = False
+    status = None
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            finished.set()
+
+    await application(scope, receive, send)
+    finished.set()
+    return status
+
+
+def _wsgi_request(application, path, cookie):
+    """ Адзін GET праз WSGI-прыкладанне без сеткі; вяртае HTTP-статус. """
+    environ = {
+        'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST, 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    result = application(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        # close() дасылае request_finished - Django закрывае злучэнне з БД, як пад сапраўдным серверам
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0]
+
+
+class Command(BaseCommand):
+    """
+    Сравнение Cafe/asgi.py и Cafe/wsgi.py на горячих страницах: запросы в секунду и p50/p99 задержки
+    при N одновременных клиентах. Приложения вызываются в процессе, без HTTP-сервера и сети:
+    WSGI - пул из --wsgi-threads потоков (как threaded-сервер, остальные клиенты ждут в очереди),
+    ASGI - один event loop; на ASGI меряются и sync-представления, и их async-варианты.
+
+    Пример: python manage.py benchmark_asgi_wsgi --clients 200 --requests 4000 --json bench_asgi.json
+    Замер имеет смысл на PostgreSQL с DEBUG = False и наполненной БД (seed_data).
+    """
+    help = 'RPS і p99 гарачых старонак пад ASGI і WSGI пры N адначасовых кліентах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200, help='Колькасць адначасовых кліентаў')
+        parser.add_argument('--requests', type=int, default=2000, help='Колькасць запытаў на кожны рэжым')
+        parser.add_argument('--wsgi-threads', type=int, default=16, help='Патокі WSGI-сервера')
+        parser.add_argument('--username', help='Карыстальнік для сесіі (па змаўчанні першы суперкарыстальнік)')
+        parser.add_argument('--json', dest='json_path', help='Захаваць вынікі ў JSON-файл')
+
+    def handle(self, *args, **options):
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self._session_key(options["username"])}'
+        order = Order.objects.order_by('-pk').first()
+        if order is None:
+            raise CommandError('Няма заказаў для старонкі заказа - запоўніце БД (seed_data)')
+
+        sync_paths = [self._path(name, order) for name, _ in ROUTES]
+        async_paths = [self._path(name, order) for _, name in ROUTES]
+
+        from Cafe.asgi import application as asgi_application
+        from Cafe.wsgi import application as wsgi_application
+
+        clients, total = options['clients'], options['requests']
+        with ThreadPoolExecutor(max_workers=options['wsgi_threads']) as pool:
+            async def wsgi_call(path):
+                return await asyncio.get_running_loop().run_in_executor(
+                    pool, _wsgi_request, wsgi_application, path, cookie)
+
+            modes = {
+                'wsgi_sync_views': (wsgi_call, sync_paths),
+                'asgi_sync_views': (lambda path: _asgi_request(asgi_application, path, cookie), sync_paths),
+                'asgi_async_views': (lambda path: _asgi_request(asgi_application, path, cookie), async_paths),
+            }
+            results = {}
+            for mode, (call, paths) in modes.items():
+                asyncio.run(self._load(call, paths, clients, len(paths) * 2))  # разагрэў кэшаў і злучэнняў
+                results[mode] = asyncio.run(self._load(call, paths, clients, total))
+                self._report(mode, results[mode])
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump({'clients': clients, 'requests': total, 'wsgi_threads': options['wsgi_threads'],
+                           'results': results}, file, ensure_ascii=False, indent=2)
+
+    def _session_key(self, username):
+        """ Сесія ўваходу, як пасля login(): старонкі закрытыя LoginRequiredMixin. """
+        users = get_user_model().objects.order_by('-is_superuser', 'pk')
+        user = users.filter(username=username).first() if username else users.first()
+        if user is None:
+            raise CommandError('Карыстальнік не знойдзены')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    @staticmethod
+    def _path(name, order):
+        return reverse(name, args=[order.pk]) if 'detail' in name else reverse(name)
+
+    @staticmethod
+    async def _load(call, paths, clients, total):
+        """ clients карутын бяруць запыты з агульнага лічыльніка, пакуль не выканаецца total. """
+        counter = itertools.count()
+        latencies, statuses = [], {}
+
+        async def client():
+            while (number := next(counter)) < total:
+                started = time.perf_counter()
+                status = await call(paths[number % len(paths)])
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        duration = time.perf_counter() - started
+        return {
+            'rps': round(total / duration, 1),
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p99_ms': round(_percentile(latencies, 99), 2),
+            'max_ms': round(max(latencies), 2),
+            'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        }
+
+    def _report(self, mode, result):
+        line = f"{mode:18} {result['rps']:>9} req/s  p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms"
+        self.stdout.write(self.style.SUCCESS(line) if set(result['statuses']) == {'200'} else
+                          self.style.WARNING(f"{line}  статусы: {result['statuses']}"))
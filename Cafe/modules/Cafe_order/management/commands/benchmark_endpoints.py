@@ -0,0 +1,231 @@
+import datetime
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from io import StringIO
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from django.urls import reverse
+from django.utils import timezone
+
+from modules.Cafe_order.models import Dish, Order
+from modules.Cafe_order.seeding import DatasetGenerator
+
+# Маршруты, которые нельзя мерить обычным GET
+SKIPPED_ROUTES = {
+    'order_events': 'бясконцы SSE-паток',
+    'page_logout': 'завяршае сесію',
+}
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def endpoint_routes():
+    """ Все именованные маршруты modules/Cafe_order/urls.py, включая маршруты DRF-роутера. """
+    from modules.Cafe_order import urls
+    return [(pattern.name, pattern) for pattern in urls.urlpatterns if getattr(pattern, 'name', None)]
+
+
+def route_url(name, pattern):
+    """ URL маршрута; параметр pk - последняя страва или последний заказ. None - объекта нет. """
+    params = list(pattern.pattern.regex.groupindex)
+    if not params:
+        return reverse(name)
+    model = Dish if 'dish' in name else Order
+    pk = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return None if pk is None else reverse(name, kwargs={param: pk for param in params})
+
+
+def route_query(name):
+    """ GET-параметры страниц, которым без них нечего считать. """
+    today = timezone.localdate()
+    period = {'date_from': (today - datetime.timedelta(days=6)).isoformat(), 'date_to': today.isoformat()}
+    return {
+        'order_search': {'query': 'оплачено'},
+        'revenue_report': period,
+        'revenue_export': period,
+    }.get(name, {})
+
+
+def _fetch(client, url, query):
+    response = client.get(url, query)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure_endpoint(client, url, query, repeat):
+    """
+    Метрики одного маршрута: задержки (без трассировки памяти), число запросов к БД
+    и пик памяти Python на запрос (tracemalloc, отдельным прогоном). None - GET не поддерживается.
+    """
+    response = _fetch(client, url, query)  # прогрев кэшей и шаблонов
+    if response.status_code == 405:
+        return None
+    # журнал запросов ограничен (deque), заполненный журнал дал бы пустой срез
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        _fetch(client, url, query)
+    # считаем сразу: следующие запросы очищают журнал, и срез CaptureQueriesContext опустеет
+    query_count = len(queries)
+    tracemalloc.start()
+    try:
+        _fetch(client, url, query)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _fetch(client, url, query)
+        timings.append((time.perf_counter() - started) * 1000)
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'status': response.status_code,
+        'queries': query_count,
+        'peak_kb': round(peak / 1024, 1),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+def compare_results(results, baseline, metric='p50_ms', max_slowdown=0.2, min_delta_ms=1.0, max_extra_queries=0):
+    """
+    Регрессии относительно прошлого прогона: маршрут стал медленнее больше чем на max_slowdown
+    (и больше чем на min_delta_ms - шум на быстрых страницах не считается) или делает больше запросов к БД.
+    Сравниваются только размеры и маршруты, которые есть в обоих прогонах.
+    """
+    regressions = []
+    for size, routes in results.items():
+        for name, current in routes.items():
+            previous = baseline.get(size, {}).get(name)
+            if not current or not previous:
+                continue
+            if current['queries'] > previous['queries'] + max_extra_queries:
+                regressions.append(f"{size}/{name}: запытаў {previous['queries']} -> {current['queries']}")
+            delta = current[metric] - previous[metric]
+            if delta > min_delta_ms and current[metric] > previous[metric] * (1 + max_slowdown):
+                regressions.append(f'{size}/{name}: {metric} {previous[metric]} -> {current[metric]}')
+    return regressions
+
+
+class Command(BaseCommand):
+    """
+    Сквозной бенчмарк всех маршрутов modules/Cafe_order/urls.py на наборах данных растущего размера.
+    По умолчанию создаётся отдельная тестовая БД, которая наполняется seed_data-генератором до каждого
+    размера (--sizes) и удаляется после прогона; рабочие данные не трогаются. --in-place - замер на текущей БД.
+
+    Для каждого маршрута: p50/p95/p99 задержки, число запросов к БД, пик памяти. Результаты - в JSON (--json),
+    с --baseline прошлый JSON сравнивается с текущим, и при регрессии команда завершается с ошибкой.
+
+    Пример: python manage.py benchmark_endpoints --sizes 1000,100000 --json bench.json --baseline bench_main.json
+    """
+    help = 'Бенчмарк усіх маршрутаў: затрымкі, запыты да БД, памяць; параўнанне з папярэднім прагонам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000', help='Колькасці заказаў праз коску')
+        parser.add_argument('--repeat', type=int, default=20, help='Колькі разоў запытваць кожны маршрут')
+        parser.add_argument('--seed', type=int, default=42, help='Seed генератара дадзеных')
+        parser.add_argument('--in-place', action='store_true', help='Мерыць на бягучай БД без генерацыі')
+        parser.add_argument('--keepdb', action='store_true', help='Не выдаляць тэставую БД пасля прагону')
+        parser.add_argument('--username', help='Карыстальнік для --in-place (па змаўчанні першы суперкарыстальнік)')
+        parser.add_argument('--json', dest='json_path', help='Захаваць вынікі ў JSON-файл')
+        parser.add_argument('--baseline', help='JSON папярэдняга прагону для параўнання')
+        parser.add_argument('--metric', choices=METRICS, default='p50_ms', help='Па якой затрымцы шукаць рэгрэсіі')
+        parser.add_argument('--max-slowdown', type=float, default=0.2, help='Дапушчальнае запаволенне (0.2 = 20%%)')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Меншыя змены затрымкі - шум')
+        parser.add_argument('--max-extra-queries', type=int, default=0, help='Дапушчальны рост колькасці запытаў')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError('--repeat павінен быць не менш за 2')
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',')})
+        except ValueError:
+            raise CommandError('--sizes: колькасці заказаў праз коску, напрыклад 1000,10000')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+
+        if options['in_place']:
+            results = {str(Order.objects.count()): self._run(self._user(options['username']), options['repeat'])}
+        else:
+            results = self._run_on_test_database(sizes, options)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump({'meta': self._meta(options), 'results': results}, file, ensure_ascii=False, indent=2)
+
+        if baseline is not None:
+            regressions = compare_results(results, baseline, metric=options['metric'],
+                                          max_slowdown=options['max_slowdown'],
+                                          min_delta_ms=options['min_delta_ms'],
+                                          max_extra_queries=options['max_extra_queries'])
+            if regressions:
+                raise CommandError('Рэгрэсіі адносна ' + options['baseline'] + ':\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Рэгрэсій няма'))
+
+    def _run_on_test_database(self, sizes, options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+            results = {}
+            for index, size in enumerate(sizes):
+                missing = size - Order.objects.count()
+                if missing > 0:
+                    self.stdout.write(f'Генерацыя заказаў да {size}...')
+                    DatasetGenerator(orders=missing, seed=options['seed'] + index).run()
+                    call_command('backfill_revenue_rollups', stdout=StringIO())
+                results[str(size)] = self._run(user, options['repeat'])
+            return results
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def _user(self, username):
+        users = get_user_model().objects.order_by('-is_superuser', 'pk')
+        user = users.filter(username=username).first() if username else users.first()
+        if user is None:
+            raise CommandError('Карыстальнік не знойдзены')
+        return user
+
+    def _run(self, user, repeat):
+        client = Client()
+        client.force_login(user)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Заказаў: {Order.objects.count()}'))
+        measured = {}
+        for name, pattern in endpoint_routes():
+            url = None if name in SKIPPED_ROUTES else route_url(name, pattern)
+            metrics = measure_endpoint(client, url, route_query(name), repeat) if url else None
+            measured[name] = metrics
+            if metrics is None:
+                self.stdout.write(f'  {name:32} прапушчаны ({SKIPPED_ROUTES.get(name, "GET не падтрымліваецца")})')
+                continue
+            line = (f"  {name:32} {metrics['status']}  p50 {metrics['p50_ms']:>9} ms  p95 {metrics['p95_ms']:>9} ms"
+                    f"  p99 {metrics['p99_ms']:>9} ms  запытаў {metrics['queries']:>3}  {metrics['peak_kb']:>8} KB")
+            self.stdout.write(line if metrics['status'] < 400 else self.style.WARNING(line))
+        return measured
+
+    @staticmethod
+    def _meta(options):
+        return {
+            'created': timezone.now().isoformat(),
+            'vendor': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'repeat': options['repeat'],
+            'in_place': options['in_place'],
+        }
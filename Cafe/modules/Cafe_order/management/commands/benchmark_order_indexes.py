@@ -0,0 +1,133 @@
+import datetime
+import json
+import statistics
+import time
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, migrations, transaction
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from modules.Cafe_order.models import Order, Table
+from modules.Cafe_order.seeding import DatasetGenerator
+
+# Сравниваются только частичные индексы активных заказов; остальные индексы Order есть в обоих замерах
+ACTIVE_ORDER_MIGRATION = 'modules.Cafe_order.migrations.0006_order_active_partial_indexes'
+
+
+def active_order_indexes():
+    """ Имена индексов, добавленных миграцией 0006. """
+    operations = import_module(ACTIVE_ORDER_MIGRATION).Migration.operations
+    return [operation.index.name for operation in operations if isinstance(operation, migrations.AddIndex)]
+
+
+class _Rollback(Exception):
+    """ Адкат транзакцыі, у якой часова выдалены індэксы. """
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк частичных индексов активных заказов (миграция 0006): EXPLAIN и время горячих запросов
+    с ними ("после") и без них ("до", индексы удаляются в транзакции, которая затем откатывается).
+
+    По умолчанию создаётся отдельная тестовая БД, которая наполняется seed_data-генератором (--seed заказов,
+    у каждого активного заказа свой занятый столик) и удаляется после замера. --in-place - замер на текущей БД
+    без генерации; на PostgreSQL удаление индекса в транзакции блокирует таблицу до отката.
+
+    Пример: python manage.py benchmark_order_indexes --seed 1000000 --json bench_indexes.json
+    """
+    help = 'EXPLAIN і час гарачых запытаў да Order з частковымі індэксамі актыўных заказаў і без іх'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=100000,
+                            help='Колькі заказаў згенераваць у тэставай БД (амаль усе аплачаныя)')
+        parser.add_argument('--tables', type=int, default=40, help='Колькасць столікаў для генерацыі')
+        parser.add_argument('--batch-size', type=int, default=20000, help='Памер пачкі генератара')
+        parser.add_argument('--in-place', action='store_true', help='Мерыць на бягучай БД без генерацыі')
+        parser.add_argument('--keepdb', action='store_true', help='Не выдаляць тэставую БД пасля замеру')
+        parser.add_argument('--repeat', type=int, default=5, help='Колькі разоў выконваць кожны запыт')
+        parser.add_argument('--json', dest='json_path', help='Захаваць вынікі ў JSON-файл')
+
+    def handle(self, *args, **options):
+        if options['in_place']:
+            results, orders = self._benchmark(options['repeat'])
+        else:
+            results, orders = self._run_on_test_database(options)
+
+        self._report(results)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump({'vendor': connection.vendor, 'orders': orders, 'indexes': active_order_indexes(),
+                           'results': results}, file, ensure_ascii=False, indent=2)
+
+    def _run_on_test_database(self, options):
+        if options['seed'] < 1:
+            raise CommandError('--seed павінен быць не менш за 1 (або --in-place)')
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            missing = options['seed'] - Order.objects.count()
+            if missing > 0:
+                self.stdout.write(f'Генерацыя заказаў: {missing}...')
+                DatasetGenerator(orders=missing, tables=options['tables'], batch_size=options['batch_size'],
+                                 progress=lambda created, total: self.stdout.write(f'{created}/{total}')).run()
+            return self._benchmark(options['repeat'])
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def _benchmark(self, repeat):
+        connection.cursor().execute('ANALYZE')
+        orders = Order.objects.count()
+        self.stdout.write(f"Заказаў у табліцы: {orders}, БД: {connection.vendor}")
+        results = {'after': self._measure(repeat)}
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                for name in active_order_indexes():
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+                cursor.execute('ANALYZE')
+                results['before'] = self._measure(repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+        return results, orders
+
+    def _queries(self):
+        """ Гарачыя запыты: спіс актыўных заказаў, выручка за суткі, фільтры адмінкі і пошуку. """
+        now = timezone.now()
+        start_of_day = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        table_id = Table.objects.values_list('pk', flat=True).first()
+        return {
+            'orders_list_active_page': Order.objects.exclude(status=2).order_by('-time_update', '-id')[:6],
+            'active_orders_for_table': Order.objects.exclude(status=2).filter(table_number_id=table_id),
+            'daily_revenue': Order.objects.filter(status=2, paid_at__gte=start_of_day).values_list('total_price'),
+            'admin_status_last_week': (Order.objects.filter(status=1, time_update__gte=now - datetime.timedelta(days=7))
+                                       .order_by('-time_update')[:100]),
+            'search_table_and_status': Order.objects.filter(table_number_id=table_id, status=0),
+            'search_total_range': Order.objects.filter(total_price__gte=100, total_price__lte=101)[:20],
+        }
+
+    def _measure(self, repeat):
+        measured = {}
+        for name, queryset in self._queries().items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            measured[name] = {
+                'median_ms': round(statistics.median(timings), 3),
+                'max_ms': round(max(timings), 3),
+                'plan': queryset.explain(),
+            }
+        return measured
+
+    def _report(self, results):
+        for name, after in results['after'].items():
+            before = results['before'][name]
+            speedup = before['median_ms'] / after['median_ms'] if after['median_ms'] else float('inf')
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{name}: {before['median_ms']} ms -> {after['median_ms']} ms (x{speedup:.1f})"))
+            self.stdout.write(f"  да:\n    {before['plan'].replace(chr(10), chr(10) + '    ')}")
+            self.stdout.write(f"  пасля:\n    {after['plan'].replace(chr(10), chr(10) + '    ')}")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from modules.Cafe_order.images import build_dish_variants
+from modules.Cafe_order.models import Dish
+
+
+class Command(BaseCommand):
+    """
+    Построение вариантов картинок блюд (миниатюра, детальная, WebP) для уже загруженных файлов.
+    Новые загрузки обрабатываются в фоне автоматически, общая картинка по умолчанию - только здесь:
+    команду стоит запускать при развёртывании.
+    """
+    help = 'Пабудова памяншэнных копій і WebP для выяў страў'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dish', type=int, nargs='*', help='Толькі гэтыя стравы (id)')
+        parser.add_argument('--force', action='store_true', help='Перагенераваць і ўжо існуючыя файлы')
+
+    def handle(self, *args, **options):
+        dishes = Dish.objects.exclude(image='').order_by('pk')
+        if options['dish']:
+            dishes = dishes.filter(pk__in=options['dish'])
+
+        built = failed = 0
+        for dish in dishes.iterator():
+            if build_dish_variants(dish, force=options['force']) is None:
+                failed += 1
+                self.stderr.write(f'Не ўдалося апрацаваць выяву стравы {dish.pk}: {dish.image.name}')
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f'Апрацавана страў: {built}, з памылкамі: {failed}'))
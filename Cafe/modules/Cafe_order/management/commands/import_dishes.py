@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from modules.Cafe_order.dish_import import DishImportError, detect_format, import_dishes
+
+
+class Command(BaseCommand):
+    """
+    Массовый импорт блюд из CSV / JSON / JSON Lines. Файл читается потоком,
+    блюда с уже существующим именем обновляются.
+
+    CSV: name,category,price,description[,image]; image - путь к файлу внутри MEDIA_ROOT.
+    Пример: python manage.py import_dishes menu.csv --create-categories --user admin
+    """
+    help = 'Імпарт страў з CSV/JSON/JSONL пачкамі з праверкай кожнага радка'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Шлях да файла')
+        parser.add_argument('--format', choices=('csv', 'json', 'jsonl'), help='Фармат (па змаўчанні - па пашырэнні)')
+        parser.add_argument('--delimiter', default=',', help='Раздзяляльнік CSV')
+        parser.add_argument('--batch-size', type=int, default=500, help='Колькі страў запісваць адной пачкай')
+        parser.add_argument('--create-categories', action='store_true', help='Ствараць адсутныя катэгорыі')
+        parser.add_argument('--user', help='Імя карыстальніка, які запісваецца ў updater')
+        parser.add_argument('--dry-run', action='store_true', help='Толькі праверыць файл, нічога не захоўваць')
+
+    def handle(self, *args, **options):
+        updater = None
+        if options['user']:
+            updater = get_user_model().objects.filter(username=options['user']).first()
+            if updater is None:
+                raise CommandError(f"Карыстальнік {options['user']} не знойдзены")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_dishes(
+                    file,
+                    detect_format(options['path'], options['format']),
+                    delimiter=options['delimiter'],
+                    batch_size=options['batch_size'],
+                    create_categories=options['create_categories'],
+                    updater=updater,
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, DishImportError) as error:
+            raise CommandError(str(error))
+
+        for error in result.errors:
+            messages = '; '.join(f'{field}: {" ".join(texts)}' for field, texts in error['errors'].items())
+            self.stderr.write(f"Радок {error['row']} ({error['name'] or '-'}): {messages}")
+
+        prefix = 'Праверка (нічога не захавана). ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Створана: {result.created}, абноўлена: {result.updated}, з памылкамі: {len(result.errors)}'))
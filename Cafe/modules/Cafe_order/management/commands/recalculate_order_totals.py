@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from modules.Cafe_order.models import Order
+
+
+class Command(BaseCommand):
+    """
+    Починка Order.total_price: пересчёт всех итогов одним агрегатным UPDATE.
+    """
+    help = 'Пераразлічвае total_price усіх заказаў па іх элементах адным запытам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order', type=int, nargs='*', dest='order_ids',
+                            help='Пераразлічыць толькі зададзеныя заказы (id)')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        if options['order_ids']:
+            orders = orders.filter(pk__in=options['order_ids'])
+
+        with transaction.atomic():
+            updated = orders.recalculate_totals()
+
+        self.stdout.write(self.style.SUCCESS(f'Пераразлічана заказаў: {updated}'))
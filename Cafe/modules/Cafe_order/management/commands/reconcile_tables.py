@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from modules.Cafe_order.models import Table
+
+
+class Command(BaseCommand):
+    """
+    Сверка занятости столиков с активными заказами одним set-based UPDATE.
+    """
+    help = 'Пераразлічвае Table.is_occupied па актыўных (неаплачаных) заказах'
+
+    def handle(self, *args, **options):
+        updated = Table.objects.reconcile_occupancy()
+        occupied = Table.objects.filter(is_occupied=True).count()
+        self.stdout.write(self.style.SUCCESS(f'Праверана столікаў: {updated}, занята: {occupied}'))
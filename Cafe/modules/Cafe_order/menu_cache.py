@@ -0,0 +1,122 @@
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from modules.Cafe_order.models import Dish
+
+# Катэгорыі, якія павінны ісці першымі
+PRIORITY_CATEGORIES = ("Первые блюда", "Вторые блюда")
+
+MENU_VERSION_KEY = 'menu:version'
+MENU_SNAPSHOT_KEY = 'menu:snapshot:{version}'
+MENU_LATEST_KEY = 'menu:snapshot:latest'
+MENU_REBUILD_LOCK_KEY = 'menu:rebuild:{version}'
+
+SNAPSHOT_TIMEOUT = 24 * 60 * 60
+REBUILD_LOCK_TIMEOUT = 30
+
+
+def _new_version():
+    # Версія з часу: пасля выцяснення ключа з кэша старыя здымкі не могуць "ажыць"
+    return int(time.time() * 1000)
+
+
+def get_menu_version():
+    """ Бягучая версія меню ў кэшы. """
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        cache.add(MENU_VERSION_KEY, _new_version(), timeout=None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+def bump_menu_version():
+    """
+    Інвалідацыя меню: новая версія - новы ключ здымка. Старыя здымкі проста больш не чытаюцца.
+    """
+    try:
+        return cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        cache.set(MENU_VERSION_KEY, _new_version(), timeout=None)
+        return cache.get(MENU_VERSION_KEY)
+
+
+def _group_menu(dishes):
+    """ Спіс пар (катэгорыя, [стравы]): прыярытэтныя катэгорыі першымі, астатнія па алфавіце. """
+    dishes_by_category = defaultdict(list)
+    for dish in dishes:
+        dishes_by_category[dish.category].append(dish)
+
+    def sort_key(category):
+        if category is None:
+            return (2, 0, '')
+        if category.name in PRIORITY_CATEGORIES:
+            return (0, PRIORITY_CATEGORIES.index(category.name), category.name)
+        return (1, 0, category.name)
+
+    return [(category, dishes_by_category[category]) for category in sorted(dishes_by_category, key=sort_key)]
+
+
+def build_menu_snapshot():
+    """
+    Меню з БД: спіс пар (катэгорыя, [стравы]), прыярытэтныя катэгорыі першымі, астатнія па алфавіце.
+    Адзін запыт.
+    """
+    return _group_menu(Dish.objects.select_related('category').all())
+
+
+async def abuild_menu_snapshot():
+    """ Асінхронны варыянт build_menu_snapshot(). """
+    return _group_menu([dish async for dish in Dish.objects.select_related('category').all()])
+
+
+def get_menu_snapshot():
+    """
+    Меню з кэша па бягучай версіі. Пры прамаху перабудоўвае толькі адзін воркер (блакіроўка cache.add),
+    астатнія пакуль аддаюць папярэдні здымак.
+    """
+    version = get_menu_version()
+    snapshot_key = MENU_SNAPSHOT_KEY.format(version=version)
+    snapshot = cache.get(snapshot_key)
+    if snapshot is not None:
+        return snapshot
+
+    if cache.add(MENU_REBUILD_LOCK_KEY.format(version=version), True, timeout=REBUILD_LOCK_TIMEOUT):
+        snapshot = build_menu_snapshot()
+        cache.set_many({snapshot_key: snapshot, MENU_LATEST_KEY: snapshot}, timeout=SNAPSHOT_TIMEOUT)
+        return snapshot
+
+    # Меню ўжо перабудоўвае іншы воркер - аддаём апошні вядомы здымак
+    latest = cache.get(MENU_LATEST_KEY)
+    if latest is not None:
+        return latest
+    return build_menu_snapshot()
+
+
+async def aget_menu_version():
+    """ Асінхронны варыянт get_menu_version(). """
+    version = await cache.aget(MENU_VERSION_KEY)
+    if version is None:
+        await cache.aadd(MENU_VERSION_KEY, _new_version(), timeout=None)
+        version = await cache.aget(MENU_VERSION_KEY)
+    return version
+
+
+async def aget_menu_snapshot():
+    """ Тое ж, што get_menu_snapshot(), праз асінхронныя API кэша і ORM (async-прадстаўленні). """
+    version = await aget_menu_version()
+    snapshot_key = MENU_SNAPSHOT_KEY.format(version=version)
+    snapshot = await cache.aget(snapshot_key)
+    if snapshot is not None:
+        return snapshot
+
+    if await cache.aadd(MENU_REBUILD_LOCK_KEY.format(version=version), True, timeout=REBUILD_LOCK_TIMEOUT):
+        snapshot = await abuild_menu_snapshot()
+        await cache.aset_many({snapshot_key: snapshot, MENU_LATEST_KEY: snapshot}, timeout=SNAPSHOT_TIMEOUT)
+        return snapshot
+
+    latest = await cache.aget(MENU_LATEST_KEY)
+    if latest is not None:
+        return latest
+    return await abuild_menu_snapshot()
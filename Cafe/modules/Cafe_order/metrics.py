@@ -0,0 +1,307 @@
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'TOKEN': None,
+    'MULTIPROCESS_DIR': None,
+    'FLUSH_INTERVAL': 5,
+}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233)
+UNMATCHED_VIEW = '<unmatched>'
+
+_config = None
+
+
+def metrics_settings():
+    global _config
+    if _config is None:
+        _config = {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+    return _config
+
+
+@receiver(setting_changed)
+def _reset_settings(setting, **kwargs):
+    global _config
+    if setting == 'METRICS':
+        _config = None
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    """
+    Метрыка з асобнымі значэннямі ў кожным патоку: inc()/observe() пішуць у слоўнік свайго патоку
+    без блакіровак, collect() сумуе патокі. Значэнні патокаў, якія завяршыліся, пераносяцца ў агульны рэшту.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _values(self):
+        values = getattr(self._local, 'values', None)
+        if values is None:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+        return values
+
+    def _merge(self, target, labels, value):
+        raise NotImplementedError
+
+    def collect(self):
+        """ {значэнні меткаў: значэнне} па ўсіх патоках працэсу. """
+        with self._lock:
+            alive = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, values))
+                else:
+                    for labels, value in list(values.items()):
+                        self._merge(self._retired, labels, value)
+            self._shards = alive
+            result = {}
+            for labels, value in self._retired.items():
+                self._merge(result, labels, value)
+        for _, values in alive:
+            for labels, value in list(values.items()):
+                self._merge(result, labels, value)
+        return result
+
+    def expose(self, values):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        values = self._values()
+        values[labels] = values.get(labels, 0) + amount
+
+    def _merge(self, target, labels, value):
+        target[labels] = target.get(labels, 0) + value
+
+    def expose(self, values):
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}'
+
+
+class Histogram(_Metric):
+    """ Гістаграма ў фармаце Prometheus: лічыльнікі па межах buckets (уключна), сума і колькасць. """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        values = self._values()
+        state = values.get(labels)
+        if state is None:
+            # лічыльнікі па кожнай мяжы (не накопленыя), затым сума і колькасць
+            state = values[labels] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[index] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def _merge(self, target, labels, value):
+        state = target.get(labels)
+        if state is None:
+            target[labels] = list(value)
+        else:
+            for index, item in enumerate(value):
+                state[index] += item
+
+    def expose(self, values):
+        for labels, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), state[:len(self.buckets)] + [state[-1]]):
+                cumulative = count if bound == math.inf else cumulative + count
+                le = _format_labels(self.labelnames, labels, [('le', _format_number(bound))])
+                yield f'{self.name}_bucket{le} {_format_number(cumulative)}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(state[-2])}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {_format_number(state[-1])}'
+
+
+class CallbackGauge:
+    """ Gauge, значэнне якога чытаецца ў момант скрэйпу (напрыклад, з БД) і не сумуецца па працэсах. """
+    type = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def expose(self):
+        yield f'{self.name} {_format_number(self.callback())}'
+
+
+class Registry:
+    """
+    Метрыкі працэсу. З MULTIPROCESS_DIR кожны воркер раз у FLUSH_INTERVAL секунд (і пры скрэйпе, і на выхадзе)
+    запісвае свае значэнні ў асобны файл каталога, а /metrics любога воркера сумуе ўсе файлы.
+    Файлы завершаных воркераў застаюцца, каб лічыльнікі не падалі; каталог чысціцца пры дэплоі.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.gauges = []
+        self._file_name = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+        self._flushed_at = time.monotonic()
+        self._flush_lock = threading.Lock()
+        self._atexit_registered = False
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, callback):
+        gauge = CallbackGauge(name, documentation, callback)
+        self.gauges.append(gauge)
+        return gauge
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collect(self):
+        """ {імя метрыкі: {меткі: значэнне}} - гэтага працэсу або, з MULTIPROCESS_DIR, усіх воркераў. """
+        directory = metrics_settings()['MULTIPROCESS_DIR']
+        if not directory:
+            return {metric.name: metric.collect() for metric in self.metrics}
+        self.flush(directory)
+        return self._read_directory(directory)
+
+    def maybe_flush(self):
+        config = metrics_settings()
+        directory = config['MULTIPROCESS_DIR']
+        if directory and time.monotonic() - self._flushed_at >= config['FLUSH_INTERVAL']:
+            self.flush(directory, blocking=False)
+
+    def flush(self, directory, blocking=True):
+        if not self._flush_lock.acquire(blocking=blocking):
+            return
+        try:
+            self._flushed_at = time.monotonic()
+            snapshot = {metric.name: [[list(labels), value] for labels, value in metric.collect().items()]
+                        for metric in self.metrics}
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, self._file_name)
+            with open(path + '.tmp', 'w', encoding='utf-8') as file:
+                json.dump(snapshot, file, separators=(',', ':'))
+            os.replace(path + '.tmp', path)
+            if not self._atexit_registered:
+                atexit.register(self.flush, directory)
+                self._atexit_registered = True
+        except OSError:
+            logger.exception('Cannot write metrics to %s', directory)
+        finally:
+            self._flush_lock.release()
+
+    def _read_directory(self, directory):
+        by_name = {metric.name: metric for metric in self.metrics}
+        result = {name: {} for name in by_name}
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, file_name), encoding='utf-8') as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                logger.warning('Skipping unreadable metrics file %s', file_name)
+                continue
+            for name, rows in snapshot.items():
+                if name in by_name:
+                    for labels, value in rows:
+                        by_name[name]._merge(result[name], tuple(labels), value)
+        return result
+
+    def render(self):
+        """ Тэкставы фармат Prometheus (text/plain; version=0.0.4). """
+        values = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.expose(values.get(metric.name, {})))
+        for gauge in self.gauges:
+            try:
+                samples = list(gauge.expose())
+            except Exception:
+                logger.exception('Cannot collect gauge %s', gauge.name)
+                continue
+            lines.append(f'# HELP {gauge.name} {gauge.documentation}')
+            lines.append(f'# TYPE {gauge.name} gauge')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _occupied_tables():
+    from modules.Cafe_order.models import Table
+    return Table.objects.filter(is_occupied=True).count()
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'cafe_http_request_duration_seconds', 'Request latency by URL name', ('view', 'method'))
+RESPONSES = REGISTRY.counter('cafe_http_responses_total', 'Responses by URL name and status', ('view', 'status'))
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    'cafe_db_queries_per_request', 'SQL queries per request by URL name', ('view',), buckets=QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = REGISTRY.histogram('cafe_db_time_per_request_seconds', 'SQL time per request by URL name', ('view',))
+ORDERS_CREATED = REGISTRY.counter('cafe_orders_created_total', 'Orders created')
+ORDERS_PAID = REGISTRY.counter('cafe_orders_paid_total', 'Orders paid')
+REGISTRY.gauge('cafe_tables_occupied', 'Currently occupied tables', _occupied_tables)
+
+
+def observe_request(view, method, status, duration, db_queries, db_time):
+    """ Вызывается RequestTimingMiddleware в конце каждого запроса. """
+    if not metrics_settings()['ENABLED']:
+        return
+    view = view or UNMATCHED_VIEW
+    REQUEST_LATENCY.observe(duration, view, method)
+    RESPONSES.inc(view, str(status))
+    REQUEST_DB_QUERIES.observe(db_queries, view)
+    REQUEST_DB_TIME.observe(db_time, view)
+    REGISTRY.maybe_flush()
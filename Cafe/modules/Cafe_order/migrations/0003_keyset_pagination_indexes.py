@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cafe_order', '0002_alter_table_is_occupied'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['name', 'id'], name='dish_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['time_update', 'id'], name='order_time_update_id_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_paid_at(apps, schema_editor):
+    """
+    Для уже оплаченных заказов лучшая оценка времени оплаты - time_update.
+    Свёртки выручки по истории собираются командой backfill_revenue_rollups.
+    """
+    Order = apps.get_model('Cafe_order', 'Order')
+    Order.objects.filter(status=2, paid_at__isnull=True).update(paid_at=models.F('time_update'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cafe_order', '0003_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('hour', models.PositiveSmallIntegerField(verbose_name='Час')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Количество')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+            ],
+            options={
+                'verbose_name': 'Свёртка выручки',
+                'verbose_name_plural': 'Свёртки выручки',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата/время оплаты'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['paid_at'], name='order_paid_at_idx'),
+        ),
+        migrations.RunPython(fill_paid_at, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='revenuerollup',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='revenue_rollups', to='Cafe_order.categorydish', verbose_name='Категория блюда'),
+        ),
+        migrations.AddField(
+            model_name='revenuerollup',
+            name='dish',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='revenue_rollups', to='Cafe_order.dish', verbose_name='Блюдо'),
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('day', 'hour', 'dish'), name='revenue_rollup_day_hour_dish_uniq'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cafe_order', '0005_order_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 2), _negated=True), fields=['time_update', 'id'], name='order_active_time_update_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 2), _negated=True), fields=['table_number'], name='order_active_table_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cafe_order', '0006_order_active_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Уменьшенные копии и WebP, заполняются в фоне (modules/Cafe_order/images.py).', verbose_name='Варианты картинки'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:41
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cafe_order', '0007_dish_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dish',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=7, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Цена'),
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Живые и архивные заказы одним запросом: OrderHistory и OrderItemHistory (managed=False) читают эти представления
+CREATE_HISTORY_VIEWS = [
+    """
+    CREATE VIEW "Cafe_order_orderhistory" AS
+    SELECT "id", "table_number_id", "status", "updater_id", "time_update", "total_price", "paid_at",
+           NULL AS "archived_at"
+    FROM "Cafe_order_order"
+    UNION ALL
+    SELECT "id", "table_number_id", "status", "updater_id", "time_update", "total_price", "paid_at", "archived_at"
+    FROM "Cafe_order_archivedorder"
+    """,
+    """
+    CREATE VIEW "Cafe_order_orderitemhistory" AS
+    SELECT "id", "order_id", "dish_id", "quantity" FROM "Cafe_order_orderitem"
+    UNION ALL
+    SELECT "id", "order_id", "dish_id", "quantity" FROM "Cafe_order_archivedorderitem"
+    """,
+]
+DROP_HISTORY_VIEWS = [
+    'DROP VIEW "Cafe_order_orderitemhistory"',
+    'DROP VIEW "Cafe_order_orderhistory"',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cafe_order', '0008_dish_price_min_value'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.SmallIntegerField(choices=[(0, 'В ожидании'), (1, 'Готово'), (2, 'Оплачено')], verbose_name='Статус заказа')),
+                ('time_update', models.DateTimeField(verbose_name='Дата/время обновления')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Общая стоимость')),
+                ('paid_at', models.DateTimeField(null=True, verbose_name='Дата/время оплаты')),
+                ('archived_at', models.DateTimeField(null=True, verbose_name='Дата/время архивации')),
+            ],
+            options={
+                'verbose_name': 'Заказ (с архивом)',
+                'verbose_name_plural': 'Заказы (с архивом)',
+                'db_table': 'Cafe_order_orderhistory',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderItemHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Элемент заказа (с архивом)',
+                'verbose_name_plural': 'Элементы заказов (с архивом)',
+                'db_table': 'Cafe_order_orderitemhistory',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.SmallIntegerField(choices=[(0, 'В ожидании'), (1, 'Готово'), (2, 'Оплачено')], verbose_name='Статус заказа')),
+                ('time_update', models.DateTimeField(verbose_name='Дата/время обновления')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Общая стоимость')),
+                ('paid_at', models.DateTimeField(verbose_name='Дата/время оплаты')),
+                ('archived_at', models.DateTimeField(verbose_name='Дата/время архивации')),
+                ('table_number', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to='Cafe_order.table', verbose_name='Номер столика')),
+                ('updater', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Создал/обновил')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архивные заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField(verbose_name='Количество')),
+                ('dish', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_order_items', to='Cafe_order.dish', verbose_name='Блюдо')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='Cafe_order.archivedorder', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Элемент архивного заказа',
+                'verbose_name_plural': 'Элементы архивных заказов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['time_update', 'id'], name='archived_order_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['paid_at'], name='archived_order_paid_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['table_number', 'status'], name='archived_order_table_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['total_price'], name='archived_order_total_idx'),
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEWS, reverse_sql=DROP_HISTORY_VIEWS),
+    ]
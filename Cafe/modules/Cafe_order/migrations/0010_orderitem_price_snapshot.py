@@ -0,0 +1,55 @@
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# SQLite пересобирает таблицу при добавлении NOT NULL столбца, а представления из 0009 на неё ссылаются
+history_views = import_module('modules.Cafe_order.migrations.0009_order_archive')
+
+CREATE_HISTORY_VIEWS = [
+    history_views.CREATE_HISTORY_VIEWS[0],
+    """
+    CREATE VIEW "Cafe_order_orderitemhistory" AS
+    SELECT "id", "order_id", "dish_id", "quantity", "price" FROM "Cafe_order_orderitem"
+    UNION ALL
+    SELECT "id", "order_id", "dish_id", "quantity", "price" FROM "Cafe_order_archivedorderitem"
+    """,
+]
+
+
+def snapshot_dish_prices(apps, schema_editor):
+    """ У существующих строк цены на момент заказа нет - берём текущую цену блюда. """
+    Dish = apps.get_model('Cafe_order', 'Dish')
+    for model_name in ('OrderItem', 'ArchivedOrderItem'):
+        apps.get_model('Cafe_order', model_name).objects.update(
+            price=Subquery(Dish.objects.filter(pk=OuterRef('dish_id')).values('price')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cafe_order', '0009_order_archive'),
+    ]
+
+    operations = [
+        migrations.RunSQL(history_views.DROP_HISTORY_VIEWS, reverse_sql=history_views.CREATE_HISTORY_VIEWS),
+        migrations.AddField(
+            model_name='orderitem',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=7, verbose_name='Цена'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=7, verbose_name='Цена'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderitemhistory',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=7, verbose_name='Цена'),
+        ),
+        migrations.RunPython(snapshot_dish_prices, migrations.RunPython.noop),
+        migrations.RunSQL(CREATE_HISTORY_VIEWS, reverse_sql=history_views.DROP_HISTORY_VIEWS),
+    ]
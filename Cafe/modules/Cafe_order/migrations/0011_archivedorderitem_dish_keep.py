@@ -0,0 +1,27 @@
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# SQLite пересобирает таблицу при смене внешнего ключа, а представления истории на неё ссылаются
+history_views = import_module('modules.Cafe_order.migrations.0009_order_archive')
+price_snapshot = import_module('modules.Cafe_order.migrations.0010_orderitem_price_snapshot')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Cafe_order', '0010_orderitem_price_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunSQL(history_views.DROP_HISTORY_VIEWS, reverse_sql=price_snapshot.CREATE_HISTORY_VIEWS),
+        migrations.AlterField(
+            model_name='archivedorderitem',
+            name='dish',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING,
+                                    related_name='archived_order_items', to='Cafe_order.dish',
+                                    verbose_name='Блюдо'),
+        ),
+        migrations.RunSQL(price_snapshot.CREATE_HISTORY_VIEWS, reverse_sql=history_views.DROP_HISTORY_VIEWS),
+    ]
@@ -1,9 +1,251 @@
+import datetime
+from contextlib import contextmanager
+from itertools import chain
+
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.core.validators import FileExtensionValidator
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import (Aggregate, CharField, DecimalField, Exists, ExpressionWrapper, F, OuterRef, Prefetch,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+from django.core.validators import FileExtensionValidator, MinValueValidator
+from django.utils import timezone
+
+from modules.Cafe_order import events, metrics
 
 User = get_user_model()
 
+
+def line_total_expression(prefix=''):
+    """
+    SQL-выражение стоимости строки заказа (цена блюда на момент добавления в заказ × количество).
+    prefix - путь к OrderItem из запроса, например 'order_items__'.
+    """
+    return ExpressionWrapper(
+        F(f'{prefix}price') * F(f'{prefix}quantity'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def local_day_bounds(start_day, end_day):
+    """
+    Полуинтервал [начало start_day, начало дня после end_day) в локальном часовом поясе.
+    """
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(start_day, datetime.time.min), tz)
+    end = timezone.make_aware(datetime.datetime.combine(end_day + datetime.timedelta(days=1), datetime.time.min), tz)
+    return start, end
+
+
+class GroupConcat(Aggregate):
+    """
+    Значения группы одной строкой через разделитель: STRING_AGG на PostgreSQL, GROUP_CONCAT на SQLite.
+    """
+    function = 'STRING_AGG'
+    output_field = CharField()
+
+    def __init__(self, expression, separator=', ', **extra):
+        super().__init__(expression, Value(separator), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='GROUP_CONCAT', **extra_context)
+
+
+def publish_order_events(event_type, rows, status):
+    """
+    Рассылка событий заказов и счётчики метрик (создано / оплачено) после коммита текущей транзакции.
+    rows - [(id заказа, id столика, прежний статус)], status - новый статус.
+    """
+    status_display = dict(Order.STATUS_CHOICES)[status]
+    payloads = [
+        {'order_id': pk, 'table_id': table_id, 'status': status, 'status_display': status_display,
+         'previous_status': previous_status}
+        for pk, table_id, previous_status in rows
+    ]
+
+    def send():
+        if event_type == events.ORDER_CREATED:
+            metrics.ORDERS_CREATED.inc(amount=len(payloads))
+        if status == 2:
+            metrics.ORDERS_PAID.inc(amount=sum(1 for _, _, previous_status in rows if previous_status != 2))
+        for payload in payloads:
+            events.publish(event_type, **payload)
+
+    transaction.on_commit(send)
+
+
+class OrderQuerySet(models.QuerySet):
+
+    def for_display(self, with_items=True):
+        """
+        Общий queryset страниц и API заказов: столик и автор - JOIN, строки заказа -
+        один prefetch-запрос с блюдом и стоимостью строки (line_total), посчитанной в SQL.
+        Число запросов не зависит ни от количества заказов, ни от количества строк в них.
+        """
+        queryset = self.select_related('table_number', 'updater')
+        if with_items:
+            queryset = queryset.prefetch_related(
+                Prefetch('order_items', queryset=OrderItem.objects.with_line_total().order_by('pk'))
+            )
+        return queryset
+
+    def with_items_total(self):
+        """
+        Стоимость заказа по его строкам (items_total), посчитанная в SQL - для сверки с total_price.
+        """
+        items_total = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum(line_total_expression()))
+            .values('total')
+        )
+        return self.annotate(items_total=Coalesce(
+            Subquery(items_total, output_field=DecimalField(max_digits=10, decimal_places=2)),
+            Value(0, output_field=DecimalField(max_digits=10, decimal_places=2)),
+        ))
+
+    def with_dish_names(self):
+        """
+        Названия блюд заказа одной строкой (dish_names) - коррелированный подзапрос,
+        без GROUP BY по самим заказам и без запроса на каждую строку списка.
+        """
+        names = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(names=GroupConcat('dish__name'))
+            .values('names')
+        )
+        return self.annotate(dish_names=Subquery(names, output_field=CharField()))
+
+    def recalculate_totals(self):
+        """
+        Пераразлічвае total_price для ўсіх заказаў querysetа адным UPDATE з агрэгатным падзапытам.
+        Вяртае колькасць абноўленых заказаў.
+        """
+        items_total = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum(line_total_expression()))
+            .values('total')
+        )
+        return self.update(
+            total_price=Coalesce(
+                Subquery(items_total, output_field=DecimalField(max_digits=10, decimal_places=2)),
+                Value(0, output_field=DecimalField(max_digits=10, decimal_places=2)),
+            )
+        )
+
+    def set_status(self, status, updater=None):
+        """
+        Массовая смена статуса по тем же правилам, что и Order.save(), но набором запросов
+        вместо сохранения каждого заказа: один UPDATE заказов, один UPDATE столиков, свёртки выручки.
+        При возврате оплаченных заказов в работу их столики занимаются, занятый столик - TableOccupiedError.
+        Возвращает количество изменённых заказов.
+        """
+        with transaction.atomic():
+            rows = list(self.order_by().exclude(status=status).select_for_update()
+                        .values_list('pk', 'status', 'table_number'))
+            if not rows:
+                return 0
+            order_ids = [pk for pk, _, _ in rows]
+            reopened_ids = [pk for pk, previous, _ in rows if previous == 2]
+            if reopened_ids:
+                Table.objects.claim_many([table_id for _, previous, table_id in rows if previous == 2])
+                # Выручку вычитаем, пока в БД ещё старый paid_at
+                RevenueRollup.objects.apply_orders(reopened_ids, sign=-1)
+
+            now = timezone.now()
+            changes = {'status': status, 'time_update': now, 'paid_at': now if status == 2 else None}
+            if updater is not None:
+                changes['updater'] = updater
+            Order.objects.filter(pk__in=order_ids).update(**changes)
+
+            if status == 2:
+                # У активного заказа столик занят только им - освобождаем все столики одним UPDATE
+                Table.objects.filter(pk__in={table_id for _, _, table_id in rows}, is_occupied=True) \
+                    .update(is_occupied=False)
+                RevenueRollup.objects.apply_orders(order_ids)
+            publish_order_events(events.ORDER_STATUS_CHANGED,
+                                 [(pk, table_id, previous) for pk, previous, table_id in rows], status)
+        return len(rows)
+
+    def delete_orders(self):
+        """
+        Массовое удаление: столики активных заказов освобождаются одним UPDATE, выручка оплаченных
+        вычитается из свёрток, элементы заказов удаляются каскадом. Возвращает количество удалённых заказов.
+        """
+        with transaction.atomic():
+            active_tables = set(self.order_by().exclude(status=2).values_list('table_number', flat=True))
+            if active_tables:
+                Table.objects.filter(pk__in=active_tables, is_occupied=True).update(is_occupied=False)
+            paid_ids = list(self.order_by().filter(paid_at__isnull=False).values_list('pk', flat=True))
+            if paid_ids:
+                RevenueRollup.objects.apply_orders(paid_ids, sign=-1)
+            _, deleted = self.order_by().delete()
+        return deleted.get(Order._meta.label, 0)
+
+
+class TrackedFieldsMixin(models.Model):
+    """
+    Отслеживание изменённых полей: значения запоминаются при загрузке из БД,
+    а save() без update_fields записывает только изменившиеся поля.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_loaded_values()
+        return instance
+
+    def _snapshot_loaded_values(self, fields=None):
+        """ Запамінае бягучыя значэнні палёў як захаваныя ў БД. """
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        for field in self._meta.concrete_fields:
+            if field.primary_key or (fields is not None and field.name not in fields and field.attname not in fields):
+                continue
+            if field.attname in self.__dict__:  # адкладзеныя (deferred) палі не чапаем
+                self._loaded_values[field.name] = self.__dict__[field.attname]
+
+    def is_tracked(self):
+        """ True, калі для аб'екта ёсць здымак значэнняў з БД. """
+        return hasattr(self, '_loaded_values')
+
+    def get_loaded_value(self, field_name, default=None):
+        """ Значэнне поля ў тым выглядзе, у якім яно было ў БД. """
+        return getattr(self, '_loaded_values', {}).get(field_name, default)
+
+    def get_dirty_fields(self):
+        """ Вяртае {імя_поля: старое_значэнне} для змененых палёў. """
+        dirty = {}
+        for name, old_value in getattr(self, '_loaded_values', {}).items():
+            field = self._meta.get_field(name)
+            if getattr(self, field.attname) != old_value:
+                dirty[name] = old_value
+        return dirty
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_loaded_values(fields)
+
+    def save(self, *args, **kwargs):
+        if self.is_tracked() and not self._state.adding and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert') and len(args) < 4:
+            update_fields = list(self.get_dirty_fields())
+            if update_fields:
+                # auto_now палі абнаўляюцца толькі разам з рэальнымі зменамі
+                update_fields += [
+                    field.name for field in self._meta.concrete_fields
+                    if getattr(field, 'auto_now', False) and field.name not in update_fields
+                ]
+            kwargs['update_fields'] = update_fields  # пусты спіс - Django не робіць запыт
+        super().save(*args, **kwargs)
+        self._snapshot_loaded_values(kwargs.get('update_fields'))
+
+
 class CategoryDish(models.Model):
     """
     Модель для категорий блюд.
@@ -17,6 +259,20 @@ class CategoryDish(models.Model):
     def __str__(self):
         return self.name
 
+class DishQuerySet(models.QuerySet):
+
+    def delete_unused(self):
+        """
+        Удаляет блюда, которых нет в строках живых заказов (OrderItem.dish - PROTECT): такие блюда
+        остаются. Архивные строки хранят свою цену и удалению не мешают.
+        Возвращает (количество удалённых, список оставленных блюд).
+        """
+        with transaction.atomic():
+            in_orders = list(self.filter(pk__in=OrderItem.objects.values('dish')))
+            _, deleted = self.exclude(pk__in=[dish.pk for dish in in_orders]).delete()
+        return deleted.get(Dish._meta.label, 0), in_orders
+
+
 class Dish(models.Model):
     """
     Модель для блюд.
@@ -26,7 +282,9 @@ class Dish(models.Model):
     category = models.ForeignKey(
         to=CategoryDish, verbose_name="Категория блюда", on_delete=models.SET_NULL, null=True
     )
-    price = models.DecimalField(max_digits=7, decimal_places=2, verbose_name="Цена")
+    price = models.DecimalField(
+        max_digits=7, decimal_places=2, verbose_name="Цена", validators=[MinValueValidator(0)]
+    )
     image = models.ImageField(
         verbose_name="Картинка",
         upload_to='images/%Y/%m/%d/',
@@ -35,27 +293,106 @@ class Dish(models.Model):
         help_text="Загрузите изображение блюда (PNG, JPG, JPEG).",
         default='images/default.png'
     )
+    image_variants = models.JSONField(
+        verbose_name="Варианты картинки", default=dict, blank=True, editable=False,
+        help_text="Уменьшенные копии и WebP, заполняются в фоне (modules/Cafe_order/images.py)."
+    )
     updater = models.ForeignKey(
         to=User, verbose_name="Создал/обновил", on_delete=models.SET_NULL, null=True, blank=True
     )
     time_update = models.DateTimeField(auto_now=True, verbose_name="Дата/время обновления")
 
+    objects = DishQuerySet.as_manager()
+
+    @property
+    def image_urls(self):
+        """
+        URL картинки и её вариантов. Пока варианты не построены (или картинка сменилась),
+        thumb/detail указывают на оригинал, а WebP-варианты - None.
+        """
+        if not self.image:
+            return {'original': None, 'thumb': None, 'detail': None, 'thumb_webp': None, 'detail_webp': None}
+        storage = self.image.storage
+        original = self.image.url
+        variants = self.image_variants if self.image_variants.get('source') == self.image.name else {}
+        urls = {'original': original}
+        for name in ('thumb', 'detail'):
+            urls[name] = storage.url(variants[name]) if name in variants else original
+            webp = variants.get(f'{name}_webp')
+            urls[f'{name}_webp'] = storage.url(webp) if webp else None
+        return urls
+
     class Meta:
         ordering = ['name']
         verbose_name = "Блюдо"
         verbose_name_plural = "Блюда"
+        indexes = [
+            # keyset-пагинация меню в API
+            models.Index(fields=['name', 'id'], name='dish_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+class TableOccupiedError(ValidationError):
+    """
+    Столик уже занят: условный UPDATE не захватил ни одной строки.
+    """
+
+    def __init__(self, table_id):
+        super().__init__("Гэты столік ужо заняты, выберыце іншы.", code='table_occupied')
+        self.table_id = table_id
+
+
+class TableQuerySet(models.QuerySet):
+
+    def claim(self, table_id):
+        """
+        Займае столік адным умоўным UPDATE (толькі калі ён яшчэ вольны).
+        Пры страце гонкі выклікае TableOccupiedError.
+        """
+        if not self.filter(pk=table_id, is_occupied=False).update(is_occupied=True):
+            raise TableOccupiedError(table_id)
+
+    def claim_many(self, table_ids):
+        """
+        Займае некалькі столікаў адным умоўным UPDATE. Калі хоць адзін ужо заняты
+        (або паўтараецца ў спісе) - TableOccupiedError, выклікаць унутры транзакцыі.
+        """
+        unique_ids = set(table_ids)
+        if len(unique_ids) != len(table_ids):
+            raise TableOccupiedError(next(pk for pk in unique_ids if table_ids.count(pk) > 1))
+        try:
+            with transaction.atomic():
+                if self.filter(pk__in=unique_ids, is_occupied=False).update(is_occupied=True) != len(unique_ids):
+                    raise TableOccupiedError(None)
+        except TableOccupiedError as error:
+            # частичный захват откатан точкой сохранения - теперь видно, какой столик был занят
+            error.table_id = self.filter(pk__in=unique_ids, is_occupied=True).values_list('pk', flat=True).first()
+            raise
+
+    def release(self, table_id):
+        """ Вызваляе столік вузкім UPDATE аднаго слупка. """
+        return self.filter(pk=table_id, is_occupied=True).update(is_occupied=False)
+
+    def reconcile_occupancy(self):
+        """
+        Пераразлічвае is_occupied па актыўных (неаплачаных) заказах адным UPDATE.
+        """
+        active_orders = Order.objects.filter(table_number=OuterRef('pk')).exclude(status=2)
+        return self.update(is_occupied=Exists(active_orders))
+
+
 class Table(models.Model):
     number = models.PositiveIntegerField(unique=True, verbose_name="Номер столика")
     is_occupied = models.BooleanField(default=False, verbose_name="Занят")
 
+    objects = TableQuerySet.as_manager()
+
     def __str__(self):
         return f"Столик {self.number} ({'Занят' if self.is_occupied else 'Свободен'})"
 
-class Order(models.Model):
+class Order(TrackedFieldsMixin, models.Model):
     """
     Модель для заказов.
     """
@@ -77,62 +414,195 @@ class Order(models.Model):
     )
     time_update = models.DateTimeField(auto_now=True, verbose_name="Дата/время обновления")
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Общая стоимость")
+    paid_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Дата/время оплаты")
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         ordering = ['table_number']
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        indexes = [
+            # keyset-пагинация списков заказов по (time_update, id)
+            models.Index(fields=['time_update', 'id'], name='order_time_update_id_idx'),
+            # выручка за период по времени оплаты
+            models.Index(fields=['paid_at'], name='order_paid_at_idx'),
+            # поиск заказов: столик (+статус), статус за период, сумма
+            models.Index(fields=['table_number', 'status'], name='order_table_status_idx'),
+            models.Index(fields=['status', 'time_update'], name='order_status_time_update_idx'),
+            models.Index(fields=['total_price'], name='order_total_price_idx'),
+            # частичные индексы только по активным (неоплаченным) заказам: их единицы, оплаченных - миллионы
+            models.Index(fields=['time_update', 'id'], condition=~models.Q(status=2),
+                         name='order_active_time_update_idx'),
+            models.Index(fields=['table_number'], condition=~models.Q(status=2), name='order_active_table_idx'),
+        ]
 
     def __str__(self):
         return f"Заказ {self.id} для столика {self.table_number} - {self.get_status_display()}"
 
     def calculate_total_price(self):
-        # Вычисляем общую стоимость заказа на основе блюд
-        total = sum(item.dish.price * item.quantity for item in self.order_items.all())
+        """
+        Полный пересчёт стоимости заказа одним агрегатным запросом.
+        Нужен один раз после сохранения formset'а или для починки рассинхрона.
+        """
+        total = self.order_items.aggregate(total=Sum(line_total_expression()))['total'] or 0
         self.total_price = total
-        self.save(update_fields=['total_price'])  # Абнаўляем ТОЛЬКІ total_price
+        Order.objects.filter(pk=self.pk).update(total_price=total)  # Абнаўляем ТОЛЬКІ total_price
+        self._snapshot_loaded_values(['total_price'])
+
+    def _sync_cached_table(self, table_id, is_occupied):
+        """ Синхронизирует уже загруженный объект столика с БД. """
+        if Order.table_number.is_cached(self) and self.table_number.pk == table_id:
+            self.table_number.is_occupied = is_occupied
 
     def save(self, *args, **kwargs):
         # Автоматически обновляем статус столика при создании заказа, оплате заказа
-        is_new = self.pk is None  # Калі заказ ствараецца ўпершыню
-        previous_status = None
-        if self.pk:
-            previous_status = Order.objects.get(pk=self.pk).status
+        is_new = self._state.adding  # Калі заказ ствараецца ўпершыню
+        previous_status = previous_table_id = None
+        if not is_new:
+            if self.is_tracked():
+                previous_status = self.get_loaded_value('status')
+                previous_table_id = self.get_loaded_value('table_number')
+            else:
+                previous_status, previous_table_id = Order.objects.filter(pk=self.pk).values_list(
+                    'status', 'table_number').first() or (None, None)
 
-        super().save(*args, **kwargs)
+        was_active = not is_new and previous_status != 2
+        is_active = self.status != 2
+        table_changed = previous_table_id != self.table_number_id
+        claim_table = is_active and (not was_active or table_changed)
+        release_table = was_active and (not is_active or table_changed)
+        becomes_paid = self.status == 2 and previous_status != 2
+        leaves_paid = previous_status == 2 and self.status != 2
+
+        if not (claim_table or release_table or becomes_paid or leaves_paid):
+            super().save(*args, **kwargs)
+            self._broadcast_change(is_new, previous_status)
+            return
+
+        if (becomes_paid or leaves_paid) and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = list(kwargs['update_fields']) + ['paid_at']
+
+        # Столик, статус оплаты и свёртки выручки меняются в одной транзакции с записью заказа
+        with transaction.atomic():
+            if claim_table:
+                Table.objects.claim(self.table_number_id)
+            if leaves_paid:
+                # Выручку вычитаем, пока в БД ещё старый paid_at
+                RevenueRollup.objects.apply_orders([self.pk], sign=-1)
+                self.paid_at = None
+            if becomes_paid:
+                self.paid_at = timezone.now()
 
-        # Освобождение столика при изменении статуса на "Оплачено"
-        if self.status == 2 and previous_status != 2:
-            self.table_number.is_occupied = False
-            self.table_number.save()
+            super().save(*args, **kwargs)
 
+            if release_table:
+                # Освобождение столика при изменении статуса на "Оплачено" или переносе заказа
+                Table.objects.release(previous_table_id)
+            if becomes_paid:
+                # у нового заказа строк ещё нет - их выручку добавят OrderItem.save() или formset
+                RevenueRollup.objects.apply_orders([self.pk])
+
+        if claim_table:
+            self._sync_cached_table(self.table_number_id, True)
+        if release_table:
+            self._sync_cached_table(previous_table_id, False)
+        self._broadcast_change(is_new, previous_status)
+
+    def delete(self, *args, **kwargs):
+        """ Выручка оплаченного заказа вычитается из свёрток в одной транзакции с удалением. """
+        with transaction.atomic():
+            RevenueRollup.objects.apply_orders([self.pk], sign=-1)
+            return super().delete(*args, **kwargs)
+
+    def _broadcast_change(self, is_new, previous_status):
+        """ Событие для кухни/зала (SSE) - только после коммита, откаченные изменения не рассылаются. """
         if is_new:
-            self.table_number.is_occupied = True
-            self.table_number.save()
+            event_type = events.ORDER_CREATED
+        elif previous_status != self.status:
+            event_type = events.ORDER_STATUS_CHANGED
+        else:
+            return
+        publish_order_events(event_type, [(self.pk, self.table_number_id, previous_status)], self.status)
+
 
+class OrderItemQuerySet(models.QuerySet):
 
-class OrderItem(models.Model):
+    def with_line_total(self):
+        """ Строки с блюдом (JOIN) и стоимостью строки line_total, посчитанной в SQL. """
+        return self.select_related('dish').annotate(line_total=line_total_expression())
+
+
+class OrderItem(TrackedFieldsMixin, models.Model):
     """
     Промежуточная модель для связи блюд и заказов.
     """
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items', verbose_name="Заказ")
-    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='order_items', verbose_name="Блюдо")
+    # блюдо из заказа не удаляется: иначе строки пропали бы, а total_price и свёртки выручки - нет
+    dish = models.ForeignKey(Dish, on_delete=models.PROTECT, related_name='order_items', verbose_name="Блюдо")
     quantity = models.PositiveIntegerField(default=1, verbose_name="Количество")
+    # цена блюда на момент добавления в заказ: смена цены в меню не меняет ни заказы, ни выручку за прошлое
+    price = models.DecimalField(max_digits=7, decimal_places=2, editable=False, verbose_name="Цена")
+
+    objects = OrderItemQuerySet.as_manager()
 
     @property
     def total_price(self):
-        """ Вяртае агульны кошт пэўнага элемента заказу (колькасць × цана). """
-        return self.dish.price * self.quantity
+        """
+        Вяртае агульны кошт пэўнага элемента заказу (колькасць × цана).
+        Калі радок загружаны праз with_line_total() і не змяняўся - бярэцца кошт з SQL.
+        """
+        line_total = getattr(self, 'line_total', None)
+        if line_total is not None and self.get_loaded_value('quantity') == self.quantity \
+                and self.get_loaded_value('dish') == self.dish_id:
+            return line_total
+        return self.price * self.quantity
 
-    def save(self, *args, **kwargs):
-        """ Пасля захавання OrderItem абнаўляем total_price у Order. """
-        super().save(*args, **kwargs)
-        self.order.calculate_total_price()
+    def _snapshot_price(self):
+        """ Новы радок або іншая страва - цана бярэцца з меню (з ужо загружанай стравы без запыту). """
+        if self.price is not None and self.is_tracked() and self.get_loaded_value('dish') == self.dish_id:
+            return
+        if OrderItem.dish.is_cached(self) and self.dish.pk == self.dish_id:
+            self.price = self.dish.price
+        else:
+            self.price = Dish.objects.values_list('price', flat=True).get(pk=self.dish_id)
 
-    def delete(self, *args, **kwargs):
-        """ Пасля выдалення OrderItem абнаўляем total_price у Order. """
-        super().delete(*args, **kwargs)
-        self.order.calculate_total_price()
+    def _apply_total_delta(self, added=None, removed=None):
+        """
+        Прымяняе да Order.total_price розніцу адным атамарным UPDATE.
+        added / removed - пары (price, quantity) для новага і старога стану радка.
+        """
+        delta = (added[0] * added[1] if added else 0) - (removed[0] * removed[1] if removed else 0)
+        if delta:
+            Order.objects.filter(pk=self.order_id).update(total_price=F('total_price') + delta)
+
+    def save(self, *args, update_order_total=True, **kwargs):
+        """
+        Пасля захавання OrderItem абнаўляем total_price у Order на розніцу, а ў аплачанага заказа - і згорткі выручкі.
+        update_order_total=False - калі агульны кошт і згорткі пералічваюцца потым адзін раз (formset).
+        """
+        removed = None
+        if self.is_tracked():
+            removed = (self.get_loaded_value('price'), self.get_loaded_value('quantity'))
+        self._snapshot_price()
+        if not update_order_total:
+            super().save(*args, **kwargs)
+            return
+        with RevenueRollup.objects.reapplying([self.order_id]):
+            super().save(*args, **kwargs)
+            self._apply_total_delta(added=(self.price, self.quantity), removed=removed)
+
+    def delete(self, *args, update_order_total=True, **kwargs):
+        """ Пасля выдалення OrderItem адымаем яго кошт з total_price у Order (і з выручкі аплачанага заказа). """
+        removed = (self.price, self.quantity)
+        if self.is_tracked():
+            removed = (self.get_loaded_value('price'), self.get_loaded_value('quantity'))
+        if not update_order_total:
+            return super().delete(*args, **kwargs)
+        with RevenueRollup.objects.reapplying([self.order_id]):
+            result = super().delete(*args, **kwargs)
+            self._apply_total_delta(removed=removed)
+        return result
 
 
     class Meta:
@@ -140,4 +610,239 @@ class OrderItem(models.Model):
         verbose_name_plural = "Элементы заказов"
 
     def __str__(self):
-        return f"{self.dish.name} x {self.quantity} для заказа {self.order.id}"
+        return f"{self.dish.name} x {self.quantity} для заказа {self.order_id}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Оплаченный заказ, перенесённый из Order командой archive_orders (modules/Cafe_order/archive.py).
+    id остаётся прежним, строки заказа - в ArchivedOrderItem. Архив только читается: через OrderHistory.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    table_number = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='archived_orders',
+                                     verbose_name="Номер столика")
+    status = models.SmallIntegerField(choices=Order.STATUS_CHOICES, verbose_name="Статус заказа")
+    updater = models.ForeignKey(
+        to=User, verbose_name="Создал/обновил", on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    time_update = models.DateTimeField(verbose_name="Дата/время обновления")
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Общая стоимость")
+    paid_at = models.DateTimeField(verbose_name="Дата/время оплаты")
+    archived_at = models.DateTimeField(verbose_name="Дата/время архивации")
+
+    class Meta:
+        verbose_name = "Архивный заказ"
+        verbose_name_plural = "Архивные заказы"
+        indexes = [
+            # те же запросы, что и по Order: история по (time_update, id), выручка по paid_at, поиск
+            models.Index(fields=['time_update', 'id'], name='archived_order_time_id_idx'),
+            models.Index(fields=['paid_at'], name='archived_order_paid_at_idx'),
+            models.Index(fields=['table_number', 'status'], name='archived_order_table_idx'),
+            models.Index(fields=['total_price'], name='archived_order_total_idx'),
+        ]
+
+    def __str__(self):
+        return f"Архивный заказ {self.id} для столика {self.table_number_id}"
+
+
+class ArchivedOrderItem(models.Model):
+    """
+    Строка архивного заказа с прежним id.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='order_items',
+                              verbose_name="Заказ")
+    # архив не должен исчезать вместе с блюдом: строка хранит цену, а блюдо может быть уже удалено
+    dish = models.ForeignKey(Dish, on_delete=models.DO_NOTHING, db_constraint=False,
+                             related_name='archived_order_items', verbose_name="Блюдо")
+    quantity = models.PositiveIntegerField(verbose_name="Количество")
+    price = models.DecimalField(max_digits=7, decimal_places=2, verbose_name="Цена")
+
+    class Meta:
+        verbose_name = "Элемент архивного заказа"
+        verbose_name_plural = "Элементы архивных заказов"
+
+    def __str__(self):
+        return f"{self.dish_id} x {self.quantity} для архивного заказа {self.order_id}"
+
+
+class OrderHistoryQuerySet(models.QuerySet):
+
+    def for_display(self, with_items=True):
+        """ То же, что OrderQuerySet.for_display(), для живых и архивных заказов вместе. """
+        queryset = self.select_related('table_number', 'updater')
+        if with_items:
+            queryset = queryset.prefetch_related(
+                Prefetch('order_items', queryset=OrderItemHistory.objects.with_line_total().order_by('pk'))
+            )
+        return queryset
+
+
+class OrderHistory(models.Model):
+    """
+    Все заказы - живые (Order) и архивные (ArchivedOrder): SQL-представление UNION ALL двух таблиц,
+    созданное миграцией 0009. Только для чтения. Через него история, поиск и выручка видят
+    архив, а страницы зала работают с маленькой таблицей Order. Условия WHERE PostgreSQL
+    передаёт в обе половины UNION ALL, поэтому запросы идут по индексам обеих таблиц.
+    archived_at равно NULL у живых заказов.
+    Миграция, меняющая столбцы Order/OrderItem или архивных таблиц (на SQLite - любая, что пересобирает
+    таблицу), должна удалить представления до изменения и создать заново после: SQL - в миграции 0009.
+    """
+    table_number = models.ForeignKey(Table, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+                                     verbose_name="Номер столика")
+    status = models.SmallIntegerField(choices=Order.STATUS_CHOICES, verbose_name="Статус заказа")
+    updater = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+',
+                                verbose_name="Создал/обновил")
+    time_update = models.DateTimeField(verbose_name="Дата/время обновления")
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Общая стоимость")
+    paid_at = models.DateTimeField(null=True, verbose_name="Дата/время оплаты")
+    archived_at = models.DateTimeField(null=True, verbose_name="Дата/время архивации")
+
+    objects = OrderHistoryQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = 'Cafe_order_orderhistory'
+        verbose_name = "Заказ (с архивом)"
+        verbose_name_plural = "Заказы (с архивом)"
+
+    @property
+    def archived(self):
+        return self.archived_at is not None
+
+    def __str__(self):
+        return f"Заказ {self.id} для столика {self.table_number} - {self.get_status_display()}"
+
+
+class OrderItemHistory(models.Model):
+    """
+    Строки живых и архивных заказов: представление UNION ALL над OrderItem и ArchivedOrderItem.
+    """
+    order = models.ForeignKey(OrderHistory, on_delete=models.DO_NOTHING, db_constraint=False,
+                              related_name='order_items', verbose_name="Заказ")
+    # блюдо архивной строки может быть уже удалено: null=True даёт LEFT JOIN, строка не теряется
+    dish = models.ForeignKey(Dish, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+',
+                             verbose_name="Блюдо")
+    quantity = models.PositiveIntegerField(verbose_name="Количество")
+    price = models.DecimalField(max_digits=7, decimal_places=2, verbose_name="Цена")
+
+    objects = OrderItemQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = 'Cafe_order_orderitemhistory'
+        verbose_name = "Элемент заказа (с архивом)"
+        verbose_name_plural = "Элементы заказов (с архивом)"
+
+    @property
+    def total_price(self):
+        line_total = getattr(self, 'line_total', None)
+        return line_total if line_total is not None else self.price * self.quantity
+
+    def __str__(self):
+        return f"{self.dish.name if self.dish else self.dish_id} x {self.quantity} для заказа {self.order_id}"
+
+
+class RevenueRollupQuerySet(models.QuerySet):
+
+    @staticmethod
+    def _grouped_items(items, by_dish=True):
+        """
+        Элементы оплаченных заказов, сгруппированные по (день, час оплаты, блюдо) в локальном времени.
+        by_dish=False - только по дню и часу (строки удалённых блюд).
+        """
+        tz = timezone.get_current_timezone()
+        return (
+            items.annotate(
+                day=TruncDate('order__paid_at', tzinfo=tz),
+                hour=ExtractHour('order__paid_at', tzinfo=tz),
+            )
+            .values(*(('day', 'hour', 'dish', 'dish__category') if by_dish else ('day', 'hour')))
+            .annotate(items_quantity=Sum('quantity'), items_revenue=Sum(line_total_expression()))
+            .order_by()
+        )
+
+    def apply_orders(self, order_ids, sign=1):
+        """
+        Добавляет (sign=1) или вычитает (sign=-1) выручку заказов из свёрток.
+        Один GROUP BY по элементам заказов и по одному UPDATE на строку свёртки.
+        """
+        rows = list(self._grouped_items(OrderItem.objects.filter(order_id__in=order_ids, order__paid_at__isnull=False)))
+        if not rows:
+            return
+        with transaction.atomic():
+            self.bulk_create(
+                [RevenueRollup(day=row['day'], hour=row['hour'], dish_id=row['dish'], category_id=row['dish__category'])
+                 for row in rows],
+                ignore_conflicts=True,
+            )
+            for row in rows:
+                self.filter(day=row['day'], hour=row['hour'], dish_id=row['dish']).update(
+                    quantity=F('quantity') + sign * row['items_quantity'],
+                    revenue=F('revenue') + sign * row['items_revenue'],
+                )
+
+    @contextmanager
+    def reapplying(self, order_ids):
+        """
+        Изменение строк заказов: выручка оплаченных из них вычитается из свёрток до изменения
+        и добавляется по новым строкам после, в одной транзакции. Для неоплаченных - один запрос.
+        """
+        paid_ids = list(Order.objects.filter(pk__in=order_ids, paid_at__isnull=False).values_list('pk', flat=True))
+        if not paid_ids:
+            yield
+            return
+        with transaction.atomic():
+            self.apply_orders(paid_ids, sign=-1)
+            yield
+            self.apply_orders(paid_ids)
+
+    def rebuild(self, start_day, end_day, batch_size=1000):
+        """
+        Пересобирает свёртки за дни [start_day, end_day] из оплаченных заказов (вместе с архивом)
+        одним агрегатным запросом. Возвращает количество созданных строк.
+        """
+        start, end = local_day_bounds(start_day, end_day)
+        items = OrderItemHistory.objects.filter(order__status=2, order__paid_at__gte=start, order__paid_at__lt=end)
+        # архивные строки удалённых блюд: их выручка остаётся в свёртке без блюда, как после SET_NULL
+        dishes = Dish.objects.values('pk')
+        rows = chain(self._grouped_items(items.filter(dish__in=dishes)).iterator(),
+                     self._grouped_items(items.exclude(dish__in=dishes), by_dish=False).iterator())
+
+        with transaction.atomic():
+            self.filter(day__gte=start_day, day__lte=end_day).delete()
+            created = self.bulk_create(
+                (RevenueRollup(day=row['day'], hour=row['hour'], dish_id=row.get('dish'),
+                               category_id=row.get('dish__category'), quantity=row['items_quantity'],
+                               revenue=row['items_revenue'])
+                 for row in rows),
+                batch_size=batch_size,
+            )
+        return len(created)
+
+
+class RevenueRollup(models.Model):
+    """
+    Предагрегированная выручка: день × час оплаты × блюдо (с категорией блюда).
+    Выручка за любой период, по часам, категориям и блюдам считается по этой небольшой таблице.
+    """
+    day = models.DateField(verbose_name="День")
+    hour = models.PositiveSmallIntegerField(verbose_name="Час")
+    dish = models.ForeignKey(Dish, on_delete=models.SET_NULL, null=True, related_name='revenue_rollups',
+                             verbose_name="Блюдо")
+    category = models.ForeignKey(CategoryDish, on_delete=models.SET_NULL, null=True, related_name='revenue_rollups',
+                                 verbose_name="Категория блюда")
+    quantity = models.IntegerField(default=0, verbose_name="Количество")
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Выручка")
+
+    objects = RevenueRollupQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Свёртка выручки"
+        verbose_name_plural = "Свёртки выручки"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'hour', 'dish'], name='revenue_rollup_day_hour_dish_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.hour:02d}:00 {self.dish_id}: {self.revenue}"
@@ -0,0 +1,297 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from functools import reduce
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.db.models import Q
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(ValueError):
+    """
+    Курсор пагинации не удалось разобрать.
+    """
+
+
+def estimated_count(queryset):
+    """
+    Оценка количества строк без COUNT(*): на PostgreSQL берётся из плана запроса (EXPLAIN),
+    на остальных БД оценки нет - возвращается None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+def requested_count(queryset, mode):
+    """
+    Колькасць радкоў па запыце кліента: 'exact' - COUNT(*), 'estimate' - ацэнка, інакш None.
+    """
+    if mode == 'exact':
+        return queryset.count()
+    if mode == 'estimate':
+        return estimated_count(queryset)
+    return None
+
+
+async def arequested_count(queryset, mode):
+    """ Асінхронны варыянт requested_count(). """
+    if mode == 'exact':
+        return await queryset.acount()
+    if mode == 'estimate':
+        return await sync_to_async(estimated_count)(queryset)
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для больших таблиц (админка): если по плану запроса строк больше порога,
+    берётся оценка вместо COUNT(*). Номера последних страниц при этом приблизительные.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate > self.estimate_threshold:
+            return estimate
+        return super().count
+
+
+class KeysetPage:
+    """
+    Старонка keyset-пагінацыі. Нумароў старонак няма - толькі курсоры на суседнія.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Пагинация по ключу (keyset/cursor): следующая страница выбирается условием
+    "после последней строки" по индексированному упорядочиванию, без OFFSET и COUNT(*).
+    Поля упорядочивания должны быть NOT NULL, последнее поле - уникальное (обычно id).
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+    def _encode(self, obj, direction):
+        values = [field.value_to_string(obj) for field in self.fields]
+        payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            values = [field.to_python(value) for field, value in zip(self.fields, payload['v'], strict=True)]
+            direction = payload['d']
+        except (binascii.Error, ValueError, KeyError, TypeError) as error:
+            raise InvalidCursor(cursor) from error
+        if direction not in ('next', 'prev'):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _after(self, values, reverse):
+        """
+        Условие "строго после values" для составного ключа:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        conditions = []
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith('-') != reverse
+            lookup = {field.attname: value for field, value in zip(self.fields[:index], values)}
+            lookup[f'{self.fields[index].attname}__{"lt" if descending else "gt"}'] = values[index]
+            conditions.append(Q(**lookup))
+        return reduce(lambda left, right: left | right, conditions)
+
+    def _query(self, cursor):
+        direction, values = ('next', None) if not cursor else self._decode(cursor)
+        reverse = direction == 'prev'
+        ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering] \
+            if reverse else list(self.ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        return queryset[:self.per_page + 1], values, reverse
+
+    def _make_page(self, rows, values, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows, None, None)
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else values is not None
+        return KeysetPage(
+            rows,
+            self._encode(rows[-1], 'next') if has_next else None,
+            self._encode(rows[0], 'prev') if has_previous else None,
+        )
+
+    def page(self, cursor=None):
+        queryset, values, reverse = self._query(cursor)
+        return self._make_page(list(queryset), values, reverse)
+
+    async def apage(self, cursor=None):
+        """ То же, что page(), для async-представлений: строки читаются асинхронным ORM. """
+        queryset, values, reverse = self._query(cursor)
+        return self._make_page([row async for row in queryset], values, reverse)
+
+
+class KeysetPaginationMixin:
+    """
+    Keyset-пагинация для ListView: ?cursor=... вместо ?page=N,
+    ?count=exact|estimate - по желанию общее количество.
+    """
+    keyset_ordering = ('-time_update', '-id')
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_total_count(self):
+        return requested_count(self.get_queryset(), self.request.GET.get('count'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['total_count'] = self.get_total_count()
+        return context
+
+
+class AsyncKeysetListMixin:
+    """
+    Async-вариант ListView с KeysetPaginationMixin: страница и количество читаются асинхронным ORM
+    до построения контекста, остальная логика (get_queryset, get_context_data) - от sync-представления.
+    Ставится в MRO перед ним.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, self.get_paginate_by(queryset))
+        try:
+            page = await paginator.apage(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        self._async_page = paginator, page
+        self._async_total_count = await arequested_count(queryset, request.GET.get('count'))
+        self.object_list = queryset
+        return self.render_to_response(self.get_context_data())
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page = self._async_page
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_total_count(self):
+        return self._async_total_count
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация для DRF. Упорядочивание берётся из view.keyset_ordering.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-time_update', '-id')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset, view):
+        """
+        Явное упорядочивание (например из OrderingFilter) дополняется id для уникальности ключа.
+        """
+        explicit = [name for name in queryset.query.order_by if isinstance(name, str)]
+        if not explicit:
+            return getattr(view, 'keyset_ordering', self.ordering)
+        if not any(name.lstrip('-') in ('id', 'pk') for name in explicit):
+            explicit.append('-id' if explicit[-1].startswith('-') else 'id')
+        return [name.replace('pk', 'id') if name.lstrip('-') == 'pk' else name for name in explicit]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(queryset, view)
+        paginator = KeysetPaginator(queryset, ordering, self.get_page_size(request))
+        try:
+            self.page = paginator.page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        self.count = requested_count(queryset, request.query_params.get(self.count_query_param))
+        return list(self.page.object_list)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self._link(self.page.next_cursor)),
+            ('previous', self._link(self.page.previous_cursor)),
+            ('count', self.count),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,309 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from modules.Cafe_order.instrumentation import current_request_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'DIR': None,
+    'QUERY_PARAM': '_profile',
+    'HEADER': 'X-Profile',
+    'SAMPLE_INTERVAL': 0.001,
+    'KEEP': 100,
+}
+CPROFILE = 'cprofile'
+SAMPLE = 'sample'
+EXTENSIONS = {CPROFILE: '.prof', SAMPLE: '.collapsed'}
+PROFILE_ID_RE = re.compile(r'^\d{8}-\d{12}-[0-9a-f]{8}$')
+# Патокі, што стаяць у гэтых модулях, чакаюць працы - у рэжыме "усе патокі" такія сэмплы не лічацца
+IDLE_MODULES = ('threading.py', 'queue.py', 'selectors.py')
+
+
+def profiling_settings():
+    config = {**DEFAULTS, **getattr(settings, 'PROFILING', {})}
+    # па змаўчанні - па-за дрэвам зыходнікаў, каб дампы не трапілі ў git
+    config['DIR'] = str(config['DIR'] or os.path.join(tempfile.gettempdir(), 'cafe-profiles'))
+    return config
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename):
+    """ Шлях файла адносна sys.path, каб кадры чыталіся як modules/Cafe_order/models.py. """
+    best = ''
+    for entry in sys.path:
+        if entry and filename.startswith(entry.rstrip(os.sep) + os.sep) and len(entry) > len(best):
+            best = entry.rstrip(os.sep) + os.sep
+    return filename[len(best):].replace(';', ':')
+
+
+def _frame_name(code):
+    return f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    """
+    Сэмплуючы прафайлер: фонавы паток раз у interval секунд здымае стэкі праз sys._current_frames()
+    і лічыць аднолькавыя стэкі. Вынік - "згорнутыя стэкі" (root;...;leaf count), фармат flamegraph.pl і speedscope.
+    thread_id - адзін паток запыту; None - усе патокі працэсу, стэк пачынаецца з імя патоку.
+    Рэальная частата абмежаваная GIL: паток запыту аддае яго прыкладна раз у sys.getswitchinterval().
+    """
+
+    def __init__(self, interval=0.001, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                self._sample(frames.get(self.thread_id))
+            else:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident != own and not frame.f_code.co_filename.endswith(IDLE_MODULES):
+                        self._sample(frame, names.get(ident, str(ident)))
+            self.samples += 1
+
+    def _sample(self, frame, thread_name=None):
+        stack = []
+        while frame is not None:
+            stack.append(_frame_name(frame.f_code))
+            frame = frame.f_back
+        if thread_name is not None:
+            stack.append(f'thread {thread_name}'.replace(';', ':'))
+        if stack:
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def summarize_collapsed(text, limit=40):
+    """ Для прагляду без flamegraph: самыя частыя стэкі і функцыі па ўласным і поўным часе (у сэмплах). """
+    stacks, own, inclusive, total = [], Counter(), Counter(), 0
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(' ')
+        if not stack:
+            continue
+        count = int(count)
+        frames = stack.split(';')
+        total += count
+        stacks.append((count, frames))
+        own[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+    stacks.sort(key=lambda item: -item[0])
+    return {
+        'total': total,
+        'stacks': [(count, ' → '.join(frames[-6:])) for count, frames in stacks[:limit]],
+        'own': own.most_common(limit),
+        'inclusive': inclusive.most_common(limit),
+    }
+
+
+def cprofile_report(path, limit=60):
+    stream = io.StringIO()
+    stats = pstats.Stats(path, stream=stream)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+
+class ProfileStore:
+    """
+    Профілі на дыску: <id>.json з метаданымі запыту і побач файл даных (.prof - pstats/snakeviz,
+    .collapsed - flamegraph.pl/speedscope). id пачынаецца з часу, старэйшыя за апошнія keep выдаляюцца.
+    """
+
+    def __init__(self, directory, keep=100):
+        self.directory = directory
+        self.keep = keep
+
+    def new_id(self):
+        return f'{timezone.now():%Y%m%d-%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+
+    def data_path(self, meta):
+        return os.path.join(self.directory, meta['id'] + EXTENSIONS[meta['mode']])
+
+    def save(self, meta, write_data):
+        os.makedirs(self.directory, exist_ok=True)
+        write_data(self.data_path(meta))
+        with open(os.path.join(self.directory, meta['id'] + '.json'), 'w', encoding='utf-8') as file:
+            json.dump(meta, file, ensure_ascii=False, indent=2)
+        self._prune()
+
+    def get(self, profile_id):
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, profile_id + '.json'), encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        return [meta for meta in map(self.get, self._ids()[::-1]) if meta is not None]
+
+    def _ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith('.json') and PROFILE_ID_RE.match(name[:-5]))
+
+    def _prune(self):
+        ids = self._ids()
+        for profile_id in ids[:max(0, len(ids) - self.keep)]:
+            for extension in ('.json', *EXTENSIONS.values()):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + extension))
+                except FileNotFoundError:
+                    pass
+
+
+def get_store():
+    config = profiling_settings()
+    return ProfileStore(config['DIR'], config['KEEP'])
+
+
+class ProfilingMiddleware:
+    """
+    Прафіляванне аднаго запыту па запыце персаналу: ?_profile=1 або загаловак X-Profile: 1
+    (значэнне cprofile або sample выбірае прафайлер). Права правяраюцца праз звычайны ўваход - is_staff,
+    таму middleware стаіць пасля AuthenticationMiddleware.
+
+    Sync-запыт: cProfile (дэтэрмінаваны) або сэмплы патоку запыту. Async-запыт (ASGI): сэмплы ўсіх
+    патокаў воркера, бо код запыту выконваецца і ў цыкле падзей, і ў патоках sync_to_async.
+    Профіль і метаданыя захоўваюцца ў PROFILING['DIR'], id вяртаецца ў загалоўку X-Profile-Id;
+    спіс - /admin/profiles/. Без перамыкача запыт праходзіць далей без прафайлера.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = profiling_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = self.config['HEADER']
+        self.param = self.config['QUERY_PARAM']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def requested_mode(self, request):
+        """ Рэжым з загалоўка або параметра; None - прафіляванне не запытана (QueryDict не ствараецца). """
+        value = request.headers.get(self.header)
+        if value is None and self.param in request.META.get('QUERY_STRING', ''):
+            value = request.GET.get(self.param)
+        if not value or value in ('0', 'false'):
+            return None
+        return value if value in EXTENSIONS else CPROFILE
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = self.requested_mode(request)
+        if mode is None or not request.user.is_staff:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        if mode == CPROFILE:
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+            write, extra = profiler.dump_stats, {}
+        else:
+            profiler = SamplingProfiler(self.config['SAMPLE_INTERVAL'], thread_id=threading.get_ident())
+            response = self._sampled(profiler, self.get_response, request)
+            write, extra = self._collapsed_writer(profiler), {'samples': profiler.samples, 'threads': 'request'}
+        self._save(request, response, mode, started, request.user, write, extra)
+        return response
+
+    async def __acall__(self, request):
+        mode = self.requested_mode(request)
+        if mode is None:
+            return await self.get_response(request)
+        user = await request.auser()
+        if not user.is_staff:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        profiler = SamplingProfiler(self.config['SAMPLE_INTERVAL'])
+        profiler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+        extra = {'samples': profiler.samples, 'threads': 'all', 'requested_mode': mode}
+        self._save(request, response, SAMPLE, started, user, self._collapsed_writer(profiler), extra)
+        return response
+
+    @staticmethod
+    def _sampled(profiler, get_response, request):
+        profiler.start()
+        try:
+            return get_response(request)
+        finally:
+            profiler.stop()
+
+    @staticmethod
+    def _collapsed_writer(profiler):
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(profiler.collapsed())
+        return write
+
+    def _save(self, request, response, mode, started, user, write, extra):
+        store = ProfileStore(self.config['DIR'], self.config['KEEP'])
+        match = getattr(request, 'resolver_match', None)
+        request_metrics = current_request_metrics()
+        meta = {
+            'id': store.new_id(),
+            'mode': mode,
+            'created': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            'user': user.get_username(),
+            'db_queries': request_metrics.db_queries if request_metrics else None,
+            'db_ms': round(request_metrics.db_time * 1000, 1) if request_metrics else None,
+            **extra,
+        }
+        try:
+            store.save(meta, write)
+        except OSError:
+            logger.exception('Cannot save request profile to %s', store.directory)
+            return
+        response['X-Profile-Id'] = meta['id']
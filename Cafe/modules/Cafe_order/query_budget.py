@@ -0,0 +1,30 @@
+def query_budget(default=None, **actions):
+    """
+    Декоратор класса представления: максимальное число SQL-запросов на один GET.
+    Обычное представление - query_budget(4), ViewSet - по действиям: query_budget(list=4, retrieve=3).
+    Бюджет наследуется (async-варианты представлений проверяются по бюджету базового класса).
+
+    Бюджеты проверяет tests/test_query_budgets.py на 10, 100 и 1000 строках: превышение бюджета
+    или рост числа запросов вместе с данными (N+1) валит тесты.
+    """
+    def decorator(view_class):
+        budgets = dict(getattr(view_class, 'query_budgets', {}))
+        if default is not None:
+            budgets[None] = default
+        budgets.update(actions)
+        view_class.query_budgets = budgets
+        return view_class
+    return decorator
+
+
+def view_query_budget(callback, method='get'):
+    """
+    Бюджет представления по функции из URLconf (resolve(...).func или pattern.callback) или None.
+    Для ViewSet действие берётся из привязки метода роутером (get -> list / retrieve).
+    """
+    view_class = getattr(callback, 'view_class', None) or getattr(callback, 'cls', None)
+    budgets = getattr(view_class, 'query_budgets', None)
+    if not budgets:
+        return None
+    action = (getattr(callback, 'actions', None) or {}).get(method)
+    return budgets.get(action, budgets.get(None))
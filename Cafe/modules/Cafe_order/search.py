@@ -0,0 +1,123 @@
+import datetime
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from modules.Cafe_order.models import Order, local_day_bounds
+
+# Сумма: "сумма:100", ">100", "<=50.5", "100-200", "12.50"
+TOTAL_RE = re.compile(r'^(?:(?:total|сумма):)?(?P<op>>=|<=|>|<)?(?P<value>\d+(?:[.,]\d{1,2})?)$', re.IGNORECASE)
+TOTAL_RANGE_RE = re.compile(r'^(?:(?:total|сумма):)?(?P<low>\d+(?:[.,]\d{1,2})?)-(?P<high>\d+(?:[.,]\d{1,2})?)$',
+                            re.IGNORECASE)
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+TOTAL_LOOKUPS = {'>': 'gt', '>=': 'gte', '<': 'lt', '<=': 'lte', None: 'exact'}
+
+
+class OrderSearchQuery:
+    """
+    Разбор поисковой строки в точные и диапазонные условия по индексированным столбцам:
+        5, стол:5          - номер столика
+        #12                - номер заказа
+        оплачено, status:2 - статус (по началу названия или коду)
+        29.01.2025, 2025-01-01..2025-01-31 - день или период оплаты (у неоплаченных - последнего изменения)
+        >100, 10.50, 100-200, сумма:45 - общая стоимость
+    Все условия объединяются через AND, нераспознанные слова попадают в unparsed.
+    """
+
+    def __init__(self, query):
+        self.query = query or ''
+        self.conditions = []
+        self.unparsed = []
+        for token in self.query.split():
+            condition = self._parse_token(token)
+            if condition is None:
+                self.unparsed.append(token)
+            else:
+                self.conditions.append(condition)
+
+    def __bool__(self):
+        return bool(self.conditions)
+
+    def filter(self, queryset):
+        for condition in self.conditions:
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def _parse_token(self, token):
+        lowered = token.lower()
+        for parser in (self._parse_order_id, self._parse_table, self._parse_status, self._parse_date,
+                       self._parse_total):
+            condition = parser(lowered)
+            if condition is not None:
+                return condition
+        return None
+
+    @staticmethod
+    def _parse_order_id(token):
+        if token.startswith('#') and token[1:].isdigit():
+            return Q(pk=int(token[1:]))
+        return None
+
+    @staticmethod
+    def _parse_table(token):
+        for prefix in ('стол:', 'table:'):
+            if token.startswith(prefix):
+                token = token[len(prefix):]
+                break
+        if token.isdigit():
+            return Q(table_number__number=int(token))
+        return None
+
+    @staticmethod
+    def _parse_status(token):
+        if token.startswith('status:') or token.startswith('статус:'):
+            code = token.split(':', 1)[1]
+            if code.isdigit() and int(code) in dict(Order.STATUS_CHOICES):
+                return Q(status=int(code))
+            token = code
+        if len(token) < 3:
+            return None
+        for value, label in Order.STATUS_CHOICES:
+            if any(word.startswith(token) for word in label.lower().split()):
+                return Q(status=value)
+        return None
+
+    @staticmethod
+    def _to_date(value):
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        return None
+
+    def _parse_date(self, token):
+        first, _, last = token.partition('..')
+        start_day = self._to_date(first)
+        end_day = self._to_date(last) if last else start_day
+        if start_day is None or end_day is None or start_day > end_day:
+            return None
+        start, end = local_day_bounds(start_day, end_day)
+        # time_update меняется при каждой правке, поэтому оплаченные (и архивные) ищутся по paid_at;
+        # у активного заказа даты оплаты нет - остаётся время последнего изменения
+        return (Q(paid_at__gte=start, paid_at__lt=end)
+                | Q(paid_at__isnull=True, time_update__gte=start, time_update__lt=end))
+
+    @staticmethod
+    def _to_decimal(value):
+        try:
+            return Decimal(value.replace(',', '.'))
+        except InvalidOperation:
+            return None
+
+    def _parse_total(self, token):
+        match = TOTAL_RANGE_RE.match(token)
+        if match:
+            low, high = self._to_decimal(match['low']), self._to_decimal(match['high'])
+            return Q(total_price__gte=low, total_price__lte=high) if low <= high else None
+        match = TOTAL_RE.match(token)
+        if match and (match['op'] or not match['value'].isdigit() or ':' in token):
+            # голое целое число - это номер столика, сумма - только с оператором, копейками или префиксом
+            return Q(**{f"total_price__{TOTAL_LOOKUPS[match['op']]}": self._to_decimal(match['value'])})
+        return None
@@ -0,0 +1,253 @@
+import datetime
+import io
+import random
+from contextlib import contextmanager
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from modules.Cafe_order.menu_cache import bump_menu_version
+from modules.Cafe_order.models import CategoryDish, Dish, Order, OrderItem, Table
+
+CATEGORY_NAMES = ('Первые блюда', 'Вторые блюда', 'Салаты', 'Закуски', 'Гарниры', 'Десерты', 'Выпечка', 'Напитки')
+DISH_BASES = ('Суп', 'Борщ', 'Драники', 'Котлета', 'Салат', 'Пирог', 'Компот', 'Блины', 'Плов', 'Рыба',
+              'Мачанка', 'Калдуны', 'Сырники', 'Запеканка', 'Жаркое', 'Морс')
+DISH_STYLES = ('по-домашнему', 'фирменный', 'с грибами', 'с сыром', 'острый', 'сезонный', 'лёгкий', 'с зеленью')
+
+# Загрузка по часам (0-23): кафе открыто с 7 до 23, пики - обед и ужин
+HOURLY_WEIGHTS = (0, 0, 0, 0, 0, 0, 0, 1, 3, 4, 4, 6, 12, 14, 9, 5, 5, 7, 12, 14, 11, 6, 3, 1)
+# Понедельник - воскресенье: к выходным заказов больше
+WEEKDAY_WEIGHTS = (0.9, 0.9, 1.0, 1.0, 1.3, 1.6, 1.4)
+# Строк в заказе: 1-6, чаще две
+ITEMS_WEIGHTS = (25, 30, 20, 12, 8, 5)
+QUANTITY_WEIGHTS = (80, 15, 5)
+
+ORDER_FIELDS = ('id', 'table_number', 'status', 'updater', 'time_update', 'total_price', 'paid_at')
+ORDER_ITEM_FIELDS = ('id', 'order', 'dish', 'quantity', 'price')
+
+
+@contextmanager
+def keep_auto_now(model, field_name):
+    """ Часова адключае auto_now, каб bulk_create захаваў зададзены час. """
+    field = model._meta.get_field(field_name)
+    field.auto_now = False
+    try:
+        yield
+    finally:
+        field.auto_now = True
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def _copy_value(value):
+    if value is None:
+        return r'\N'
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _reset_sequences(models):
+    """ Id задаются генератором: последовательности (PostgreSQL) выравниваются по MAX(id), иначе следующий INSERT упадёт. """
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+class BulkCreateWriter:
+    """ Запись пачки через bulk_create (любая БД). time_update задаётся генератором, а не auto_now. """
+
+    def write(self, model, fields, rows):
+        attnames = [model._meta.get_field(name).attname for name in fields]
+        objects = [model(**dict(zip(attnames, row))) for row in rows]
+        if any(field.name == 'time_update' for field in model._meta.concrete_fields):
+            with keep_auto_now(model, 'time_update'):
+                model.objects.bulk_create(objects, batch_size=len(objects))
+        else:
+            model.objects.bulk_create(objects, batch_size=len(objects))
+
+    def finish(self, models):
+        _reset_sequences(models)
+
+
+class CopyWriter:
+    """
+    Запись пачки через COPY FROM STDIN (PostgreSQL, psycopg 3 или psycopg2) - в разы быстрее INSERT.
+    Id задаются генератором, поэтому после загрузки последовательности выравниваются (как и в BulkCreateWriter).
+    """
+
+    def write(self, model, fields, rows):
+        columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields)
+        sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN'
+        data = ''.join('\t'.join(_copy_value(value) for value in row) + '\n' for row in rows)
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy'):
+                with raw.copy(sql) as copy:
+                    copy.write(data)
+            else:
+                raw.copy_expert(sql, io.StringIO(data))
+
+    def finish(self, models):
+        _reset_sequences(models)
+
+
+def get_writer(use_copy=None):
+    """ COPY по умолчанию на PostgreSQL, bulk_create на остальных БД. """
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+    if use_copy and connection.vendor != 'postgresql':
+        raise ValueError('COPY is supported only on PostgreSQL')
+    return CopyWriter() if use_copy else BulkCreateWriter()
+
+
+class DatasetGenerator:
+    """
+    Воспроизводимый набор данных для нагрузочных замеров: категории, блюда, столики и заказы со строками
+    за days дней до end (включительно), с пиками в обед и ужин и ростом к выходным.
+    Один seed и один end - одни и те же данные. Все заказы оплачены, кроме active последних заказов
+    на разных свободных столиках (столики помечаются занятыми, как после Order.save()).
+
+    Заказы создаются по дням в хронологическом порядке (id растут вместе со временем, как в жизни)
+    и пишутся пачками по batch_size заказов: bulk_create или COPY, одна транзакция на пачку.
+    Свёртки выручки не трогаются - после генерации их пересобирает backfill_revenue_rollups.
+    """
+
+    def __init__(self, orders, categories=8, dishes=120, tables=40, days=180, active=None, end=None, seed=42,
+                 batch_size=20000, writer=None, progress=None):
+        self.orders = orders
+        self.categories = categories
+        self.dishes = dishes
+        self.tables = tables
+        self.days = days
+        self.active = min(tables, tables // 4 if active is None else active)
+        self.end = end or timezone.localdate()
+        self.batch_size = batch_size
+        self.writer = writer or get_writer()
+        self.progress = progress or (lambda created, total: None)
+        self.rng = random.Random(seed)
+        self.created_orders = 0
+        self.created_items = 0
+
+    def run(self):
+        catalog = self._catalog()
+        table_ids = self._tables()
+        users = list(get_user_model().objects.order_by('pk').values_list('pk', flat=True)[:20])
+        self._dish_ids = [dish_id for dish_id, _ in catalog]
+        self._dish_prices = dict(catalog)
+        # популярность блюд по закону Ципфа: немного хитов и длинный хвост
+        self._dish_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(catalog))))
+        self._users = users or [None]
+
+        period_end = min(timezone.now(), self._local(self.end + datetime.timedelta(days=1)))
+        free_tables = list(Table.objects.filter(pk__in=table_ids, is_occupied=False).order_by('number')
+                           .values_list('pk', flat=True))
+        active = min(self.active, len(free_tables), self.orders)
+        paid = self.orders - active
+
+        self._order_id, self._item_id = _next_id(Order), _next_id(OrderItem)
+        self._orders, self._items = [], []
+        for moment in self._paid_moments(paid, period_end):
+            self._add_order(self.rng.choice(table_ids), 2, moment, paid=True)
+
+        occupied = self.rng.sample(free_tables, active)
+        moments = sorted(period_end - datetime.timedelta(seconds=self.rng.randint(60, 3600)) for _ in occupied)
+        for table_id, moment in zip(occupied, moments):
+            self._add_order(table_id, self.rng.choice((0, 1)), moment, paid=False)
+        self._flush()
+        Table.objects.filter(pk__in=occupied).update(is_occupied=True)
+        self.writer.finish([Order, OrderItem])
+        return self
+
+    def _local(self, day):
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+    def _catalog(self):
+        """ Категории и блюда по именам: уже существующие переиспользуются. Возвращает [(id блюда, цена)]. """
+        names = [CATEGORY_NAMES[number] if number < len(CATEGORY_NAMES) else f'Категория {number + 1}'
+                 for number in range(self.categories)]
+        existing = set(CategoryDish.objects.filter(name__in=names).values_list('name', flat=True))
+        CategoryDish.objects.bulk_create(CategoryDish(name=name) for name in names if name not in existing)
+        categories = list(CategoryDish.objects.filter(name__in=names).order_by('pk'))
+        base_prices = {category.pk: self.rng.randint(3, 25) for category in categories}
+
+        dishes = []
+        for number in range(self.dishes):
+            category = categories[number % len(categories)]
+            base, style = DISH_BASES[number % len(DISH_BASES)], DISH_STYLES[number // len(DISH_BASES) % len(DISH_STYLES)]
+            price = Decimal(base_prices[category.pk] * 100 + self.rng.randint(-150, 400)).max(Decimal(50)) / 100
+            dishes.append(Dish(name=f'{base} {style} №{number + 1}', category=category, price=price,
+                               description=f'{base} {style}.'))
+        existing = set(Dish.objects.filter(name__in=[dish.name for dish in dishes]).values_list('name', flat=True))
+        created = Dish.objects.bulk_create(dish for dish in dishes if dish.name not in existing)
+        if created:
+            bump_menu_version()  # bulk_create не дасылае сігналы
+        catalog = list(Dish.objects.filter(name__in=[dish.name for dish in dishes]).order_by('pk')
+                       .values_list('pk', 'price'))
+        self.rng.shuffle(catalog)
+        return catalog
+
+    def _tables(self):
+        existing = set(Table.objects.filter(number__lte=self.tables).values_list('number', flat=True))
+        Table.objects.bulk_create(Table(number=number) for number in range(1, self.tables + 1)
+                                  if number not in existing)
+        return list(Table.objects.filter(number__lte=self.tables).order_by('number').values_list('pk', flat=True))
+
+    def _paid_moments(self, count, period_end):
+        """
+        Время оплаченных заказов по возрастанию. Количество на день - по весам дня недели
+        (накопленное округление, сумма ровно count), внутри дня - по весам часов.
+        """
+        days = [self.end - datetime.timedelta(days=offset) for offset in range(self.days - 1, -1, -1)]
+        cumulative = list(accumulate(WEEKDAY_WEIGHTS[day.weekday()] for day in days))
+        previous = 0
+        for day, weight in zip(days, cumulative):
+            planned = round(count * weight / cumulative[-1])
+            day_count, previous = planned - previous, planned
+            start = self._local(day)
+            hours = [hour for hour in range(24) if start + datetime.timedelta(hours=hour) < period_end]
+            if not hours:
+                # сегодняшний день ещё не начался - заказы переносятся на последний прошедший час
+                hours = [0]
+            weights = [HOURLY_WEIGHTS[hour] for hour in hours]
+            moments = [
+                start + datetime.timedelta(hours=hour, seconds=self.rng.randrange(3600))
+                for hour in self.rng.choices(hours, weights=weights if any(weights) else None, k=day_count)
+            ]
+            for moment in sorted(moments):
+                yield min(moment, period_end - datetime.timedelta(seconds=1))
+
+    def _add_order(self, table_id, status, moment, paid):
+        order_id = self._order_id
+        self._order_id += 1
+        lines = {}
+        for dish_id in self.rng.choices(self._dish_ids, cum_weights=self._dish_weights,
+                                        k=self.rng.choices(range(1, 7), weights=ITEMS_WEIGHTS)[0]):
+            lines[dish_id] = lines.get(dish_id, 0) + self.rng.choices((1, 2, 3), weights=QUANTITY_WEIGHTS)[0]
+        total = Decimal(0)
+        for dish_id, quantity in lines.items():
+            self._items.append((self._item_id, order_id, dish_id, quantity, self._dish_prices[dish_id]))
+            self._item_id += 1
+            total += self._dish_prices[dish_id] * quantity
+        self._orders.append((order_id, table_id, status, self.rng.choice(self._users), moment, total,
+                             moment if paid else None))
+        if len(self._orders) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._orders:
+            return
+        with transaction.atomic():
+            self.writer.write(Order, ORDER_FIELDS, self._orders)
+            self.writer.write(OrderItem, ORDER_ITEM_FIELDS, self._items)
+        self.created_orders += len(self._orders)
+        self.created_items += len(self._items)
+        self._orders, self._items = [], []
+        self.progress(self.created_orders, self.orders)
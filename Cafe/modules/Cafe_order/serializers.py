@@ -1,19 +1,29 @@
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
-from modules.Cafe_order.models import Dish, OrderItem, CategoryDish
+from modules.Cafe_order.models import Dish, OrderItem, CategoryDish, Order, RevenueRollup, Table, TableOccupiedError
 
 
 class DishSerializer(ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(
         queryset=CategoryDish.objects.all()
     )
+    image_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = Dish
-        fields = '__all__'
+        exclude = ('image_variants',)
         read_only_fields = ('time_update',)
 
+    def get_image_urls(self, obj):
+        """Спасылкі на арыгінал, мініяцюру, дэталёвы памер і WebP (абсалютныя, як у полі image)"""
+        request = self.context.get('request')
+        return {
+            name: request.build_absolute_uri(url) if request is not None and url else url
+            for name, url in obj.image_urls.items()
+        }
+
     def validate_price(self, value):
         """Правяраем, каб цана не была адмоўнай"""
         if value < 0:
@@ -24,4 +34,98 @@ class DishSerializer(ModelSerializer):
 class OrderItemSerializer(ModelSerializer):
     class Meta:
         model = OrderItem
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class OrderLineSerializer(ModelSerializer):
+    """
+    Радок заказу ўнутры OrderSerializer. Стравы правяраюцца адным запытам у бацькоўскім серыялізатары.
+    """
+    dish = serializers.IntegerField(source='dish_id')
+    dish_name = serializers.CharField(source='dish.name', read_only=True)
+    price = serializers.DecimalField(max_digits=7, decimal_places=2, read_only=True)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ('id', 'dish', 'dish_name', 'price', 'quantity', 'total_price')
+
+    def validate_quantity(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Quantity must be at least 1.")
+        return value
+
+
+class OrderSerializer(ModelSerializer):
+    table_number = serializers.PrimaryKeyRelatedField(queryset=Table.objects.all())
+    table = serializers.IntegerField(source='table_number.number', read_only=True)
+    order_items = OrderLineSerializer(many=True, required=False)
+
+    class Meta:
+        model = Order
+        fields = ('id', 'table_number', 'table', 'status', 'order_items', 'total_price', 'updater', 'time_update',
+                  'paid_at')
+        read_only_fields = ('total_price', 'updater', 'time_update', 'paid_at')
+
+    def validate_order_items(self, value):
+        """ Правяраем усе стравы заказу адным запытам і падстаўляем аб'екты Dish. """
+        dishes = Dish.objects.in_bulk({item['dish_id'] for item in value})
+        missing = sorted({item['dish_id'] for item in value} - set(dishes))
+        if missing:
+            raise serializers.ValidationError(f"Dishes not found: {missing}.")
+        for item in value:
+            item['dish'] = dishes[item.pop('dish_id')]
+        return value
+
+    @staticmethod
+    def _build_items(order, items):
+        return [OrderItem(order=order, dish=item['dish'], quantity=item['quantity'], price=item['dish'].price)
+                for item in items]
+
+    def create(self, validated_data):
+        """
+        Заказ з усімі радкамі ў адной транзакцыі: столік займаецца ўмоўным UPDATE,
+        радкі ўстаўляюцца bulk_create, агульны кошт лічыцца адзін раз.
+        Заказ, створаны адразу аплачаным, трапляе ў згорткі выручкі разам з радкамі.
+        """
+        items = validated_data.pop('order_items', [])
+        validated_data['total_price'] = sum(item['dish'].price * item['quantity'] for item in items)
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(**validated_data)
+                with RevenueRollup.objects.reapplying([order.pk]):
+                    OrderItem.objects.bulk_create(self._build_items(order, items))
+        except TableOccupiedError as error:
+            raise serializers.ValidationError({'table_number': error.messages})
+        return order
+
+    def update(self, instance, validated_data):
+        """
+        Пры перадачы order_items радкі заказу цалкам замяняюцца - да захавання статусу,
+        каб аплата або вяртанне ў працу ўлічвалі ў згортках выручкі ўжо новыя радкі.
+        """
+        items = validated_data.pop('order_items', None)
+        try:
+            with transaction.atomic():
+                if items is not None:
+                    with RevenueRollup.objects.reapplying([instance.pk]):
+                        instance.order_items.all().delete()
+                        OrderItem.objects.bulk_create(self._build_items(instance, items))
+                        instance.calculate_total_price()
+                for attr, value in validated_data.items():
+                    setattr(instance, attr, value)
+                instance.save()
+        except TableOccupiedError as error:
+            raise serializers.ValidationError({'table_number': error.messages})
+        return instance
+
+
+class OrderBulkSerializer(serializers.Serializer):
+    """
+    Масавыя аперацыі API: спіс id заказаў (неіснуючыя ігнаруюцца).
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+
+
+class OrderBulkStatusSerializer(OrderBulkSerializer):
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from modules.Cafe_order.images import DEFAULT_IMAGE, schedule_dish_variants
+from modules.Cafe_order.menu_cache import bump_menu_version
+from modules.Cafe_order.models import CategoryDish, Dish
+
+
+@receiver([post_save, post_delete], sender=Dish)
+@receiver([post_save, post_delete], sender=CategoryDish)
+def invalidate_menu_snapshot(sender, **kwargs):
+    """ Меню змянілася - пасля каміта транзакцыі падымаем версію здымка. """
+    transaction.on_commit(bump_menu_version)
+
+
+@receiver(post_save, sender=Dish)
+def schedule_image_variants(sender, instance, raw=False, **kwargs):
+    """
+    Новая выява - варыянты будуюцца ў фоне пасля каміта, калі файл ужо захаваны.
+    Агульная выява па змаўчанні апрацоўваецца адзін раз пры разгортванні (build_dish_images).
+    """
+    if raw or not instance.image or instance.image.name == DEFAULT_IMAGE:
+        return
+    if instance.image_variants.get('source') != instance.image.name:
+        dish_id = instance.pk
+        transaction.on_commit(lambda: schedule_dish_variants(dish_id))
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django import template
 from django.utils import timezone
 
@@ -13,5 +15,10 @@ def format_localtime(value):
 
 @register.filter
 def sum_total_price(order_items):
-    """ Складае ўсе total_price у OrderItem """
-    return sum(item.total_price for item in order_items)
\ No newline at end of file
+    """
+    Складае ўсе total_price у OrderItem. Прымае спіс, queryset або order.order_items;
+    з радкамі з Order.objects.for_display() кошт радка ўжо пасчытаны ў SQL.
+    """
+    if hasattr(order_items, 'all'):
+        order_items = order_items.all()
+    return sum((item.total_price for item in order_items), Decimal('0'))
\ No newline at end of file
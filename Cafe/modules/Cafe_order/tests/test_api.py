@@ -1,11 +1,15 @@
+import time
 from decimal import Decimal
 from time import timezone
 
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Sum
 from django.urls import reverse
+from django.utils.http import http_date
 from rest_framework import status
 
-from modules.Cafe_order.models import Dish, CategoryDish
+from modules.Cafe_order.models import Dish, CategoryDish, Order, OrderItem, RevenueRollup, Table
 from rest_framework.test import APITestCase
 
 
@@ -58,7 +62,72 @@ class DishAPITestCase(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), Dish.objects.count())
+        self.assertEqual(len(response.data['results']), Dish.objects.count())
+
+    def test_dish_list_keyset_pages(self):
+        self.client.force_authenticate(user=self.regular_user)
+        for index in range(5):
+            Dish.objects.create(name=f'Dish {index}', description='Soup', category=self.category_main, price=1)
+
+        url = reverse('dish_api_view-list')
+        response = self.client.get(url, {'page_size': 4})
+        first_page = [dish['name'] for dish in response.data['results']]
+        self.assertEqual(first_page, ['Dish 0', 'Dish 1', 'Dish 2', 'Dish 3'])
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNone(response.data['count'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([dish['name'] for dish in response.data['results']], ['Dish 4', 'Test Dish'])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([dish['name'] for dish in response.data['results']], first_page)
+
+    def test_dish_list_conditional_get(self):
+        self.client.force_authenticate(user=self.regular_user)
+        url = reverse('dish_api_view-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        Dish.objects.create(name='Another Dish', description='New', category=self.category_main, price=1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_dish_list_sees_deletions(self):
+        self.client.force_authenticate(user=self.regular_user)
+        url = reverse('dish_api_view-list')
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+
+        Dish.objects.filter(pk=self.dish.pk).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_dish_detail_conditional_get(self):
+        self.client.force_authenticate(user=self.regular_user)
+        response = self.client.get(self.dish_url)
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(self.dish_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.dish_url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Test Dish')
+
+    def test_dish_list_invalid_cursor(self):
+        self.client.force_authenticate(user=self.regular_user)
+        response = self.client.get(reverse('dish_api_view-list'), {'cursor': 'broken'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     # Исправленный тест создания блюда
     def test_create_dish(self):
@@ -140,6 +209,16 @@ class DishAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Dish.objects.filter(pk=self.dish.pk).exists())
 
+    def test_dish_in_order_is_not_deleted(self):
+        """Блюдо из заказа не удаляется: строки заказа и его сумма остаются"""
+        order = Order.objects.create(table_number=Table.objects.create(number=1))
+        OrderItem.objects.create(order=order, dish=self.dish, quantity=1)
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.delete(self.dish_url)
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertTrue(Dish.objects.filter(pk=self.dish.pk).exists())
+
     def test_non_admin_cannot_delete_dish(self):
         """Обычный пользователь не может удалить блюдо"""
         self.client.force_authenticate(user=self.regular_user)
@@ -161,4 +240,156 @@ class DishAPITestCase(APITestCase):
 
         # DELETE
         response = self.client.delete(self.dish_url)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)  # Было 401
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)  # Было 401
+
+    def test_admin_can_import_dishes(self):
+        """Масавы імпарт: новыя стравы ствараюцца, існуючыя абнаўляюцца, памылкі - па радках"""
+        self.client.force_authenticate(user=self.admin_user)
+        upload = SimpleUploadedFile('menu.csv', (
+            'name,category,price,description\n'
+            'Test Dish,Dessert,12.50,New description\n'
+            'Borsch,Main,7.00,Red soup\n'
+            'Bad,Main,-1,Negative price\n'
+        ).encode(), content_type='text/csv')
+
+        response = self.client.post(reverse('dish_api_view-import-dishes'), {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual([error['row'] for error in response.data['errors']], [4])
+        self.dish.refresh_from_db()
+        self.assertEqual((self.dish.category, self.dish.price), (self.category_dessert, Decimal('12.50')))
+
+    def test_non_admin_cannot_import_dishes(self):
+        self.client.force_authenticate(user=self.regular_user)
+        upload = SimpleUploadedFile('menu.csv', b'name,category,price,description\n')
+        response = self.client.post(reverse('dish_api_view-import-dishes'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OrderAPITestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='waiter', password='waiterpass')
+        self.client.force_authenticate(user=self.user)
+        category = CategoryDish.objects.create(name="Main")
+        self.soup = Dish.objects.create(name='Soup', description='Hot', category=category, price=Decimal('5.50'))
+        self.fish = Dish.objects.create(name='Fish', description='Fried', category=category, price=Decimal('12.00'))
+        self.table = Table.objects.create(number=1)
+        self.list_url = reverse('order_api_view-list')
+
+    def _order_data(self, table):
+        return {
+            'table_number': table.id,
+            'order_items': [
+                {'dish': self.soup.id, 'quantity': 2},
+                {'dish': self.fish.id, 'quantity': 1},
+            ],
+        }
+
+    def test_create_order_with_items(self):
+        response = self.client.post(self.list_url, self._order_data(self.table), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual(order.total_price, Decimal('23.00'))
+        self.assertEqual(order.order_items.count(), 2)
+        self.assertEqual(order.updater, self.user)
+        self.assertEqual(len(response.data['order_items']), 2)
+        self.table.refresh_from_db()
+        self.assertTrue(self.table.is_occupied)
+
+    def test_create_order_for_occupied_table(self):
+        Order.objects.create(table_number=self.table)
+        response = self.client.post(self.list_url, self._order_data(self.table), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('table_number', response.data)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_create_order_with_unknown_dish(self):
+        data = self._order_data(self.table)
+        data['order_items'].append({'dish': 9999, 'quantity': 1})
+        response = self.client.post(self.list_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_list_orders_uses_constant_queries(self):
+        for number in range(2, 7):
+            self.client.post(self.list_url, self._order_data(Table.objects.create(number=number)), format='json')
+
+        # Заказы + столікі (JOIN), радкі заказаў разам са стравамі і line_total - незалежна ад колькасці заказаў
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_replace_order_items(self):
+        response = self.client.post(self.list_url, self._order_data(self.table), format='json')
+        url = reverse('order_api_view-detail', kwargs={'pk': response.data['id']})
+
+        response = self.client.patch(url, {'order_items': [{'dish': self.fish.id, 'quantity': 3}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('36.00'))
+
+    @staticmethod
+    def _revenue():
+        return RevenueRollup.objects.aggregate(total=Sum('revenue'))['total']
+
+    def test_create_paid_order_reaches_rollups(self):
+        data = {**self._order_data(self.table), 'status': 2}
+        response = self.client.post(self.list_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(self._revenue(), Decimal('23.00'))
+        self.table.refresh_from_db()
+        self.assertFalse(self.table.is_occupied)
+
+    def test_pay_and_replace_items_in_one_patch(self):
+        response = self.client.post(self.list_url, self._order_data(self.table), format='json')
+        url = reverse('order_api_view-detail', kwargs={'pk': response.data['id']})
+
+        response = self.client.patch(url, {'status': 2, 'order_items': [{'dish': self.fish.id, 'quantity': 3}]},
+                                     format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(self._revenue(), Decimal('36.00'))
+
+    def test_replace_items_of_paid_order(self):
+        response = self.client.post(self.list_url, {**self._order_data(self.table), 'status': 2}, format='json')
+        url = reverse('order_api_view-detail', kwargs={'pk': response.data['id']})
+
+        response = self.client.patch(url, {'order_items': [{'dish': self.soup.id, 'quantity': 1}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('5.50'))
+        self.assertEqual(self._revenue(), Decimal('5.50'))
+
+    def test_delete_active_order_frees_table(self):
+        response = self.client.post(self.list_url, self._order_data(self.table), format='json')
+        url = reverse('order_api_view-detail', kwargs={'pk': response.data['id']})
+
+        response = self.client.delete(url)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.table.refresh_from_db()
+        self.assertFalse(self.table.is_occupied)
+
+    def test_bulk_status_and_delete(self):
+        second = Order.objects.create(table_number=Table.objects.create(number=2))
+        first = Order.objects.create(table_number=self.table)
+
+        response = self.client.post(reverse('order_api_view-bulk-status'),
+                                    {'ids': [first.pk, second.pk], 'status': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertFalse(Table.objects.filter(is_occupied=True).exists())
+
+        response = self.client.post(reverse('order_api_view-bulk-status'), {'ids': [first.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.delete(reverse('order_api_view-bulk-delete'), {'ids': [first.pk, second.pk]},
+                                      format='json')
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertFalse(Order.objects.exists())
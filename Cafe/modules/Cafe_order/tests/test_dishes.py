@@ -0,0 +1,236 @@
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from modules.Cafe_order import dish_import
+from modules.Cafe_order.dish_import import DishImportError, import_dishes
+from modules.Cafe_order.menu_cache import get_menu_snapshot
+from modules.Cafe_order.models import CategoryDish, Dish, Order, OrderItem, Table
+
+
+class MenuSnapshotTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.second = CategoryDish.objects.create(name="Вторые блюда")
+        self.desserts = CategoryDish.objects.create(name="Десерты")
+        self.first = CategoryDish.objects.create(name="Первые блюда")
+        self.soup = Dish.objects.create(name='Soup', description='Hot', category=self.first, price=Decimal('5.00'))
+        Dish.objects.create(name='Cake', description='Sweet', category=self.desserts, price=Decimal('3.00'))
+        Dish.objects.create(name='Fish', description='Fried', category=self.second, price=Decimal('9.00'))
+
+    def test_priority_categories_go_first(self):
+        categories = [category for category, dishes in get_menu_snapshot()]
+        self.assertEqual(categories, [self.first, self.second, self.desserts])
+
+    def test_snapshot_is_served_from_cache(self):
+        get_menu_snapshot()
+        with self.assertNumQueries(0):
+            get_menu_snapshot()
+
+    def test_dish_change_rebuilds_snapshot(self):
+        get_menu_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup.name = 'Borsch'
+            self.soup.save()
+
+        dishes = dict(get_menu_snapshot())[self.first]
+        self.assertEqual([dish.name for dish in dishes], ['Borsch'])
+
+    def test_menu_page_steady_state_has_no_menu_queries(self):
+        self.client.force_login(User.objects.create_user(username='waiter', password='waiterpass'))
+        url = reverse('dishes')
+        self.client.get(url)
+        # Засталіся толькі запыты сесіі і карыстальніка
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(response, 'Soup')
+
+
+class DishBulkDeleteTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='waiter', password='waiterpass'))
+        self.url = reverse('dish_delete_something')
+        category = CategoryDish.objects.create(name="Первые блюда")
+        self.soup, self.cake, self.fish = [
+            Dish.objects.create(name=name, description='Test', category=category, price=Decimal('5.00'))
+            for name in ('Soup', 'Cake', 'Fish')
+        ]
+
+    def test_bulk_delete_removes_selected_dishes(self):
+        self.assertContains(self.client.get(self.url), 'name="dishes"', count=3)
+
+        response = self.client.post(self.url, {'dishes': [self.soup.pk, self.cake.pk]})
+
+        self.assertRedirects(response, reverse('dishes'), fetch_redirect_response=False)
+        self.assertEqual(list(Dish.objects.values_list('name', flat=True)), ['Fish'])
+
+    def test_dishes_in_orders_are_kept_and_reported(self):
+        order = Order.objects.create(table_number=Table.objects.create(number=1))
+        OrderItem.objects.create(order=order, dish=self.soup, quantity=2)
+
+        response = self.client.post(self.url, {'dishes': [self.soup.pk, self.cake.pk]}, follow=True)
+
+        self.assertEqual(list(Dish.objects.values_list('name', flat=True)), ['Fish', 'Soup'])
+        self.assertEqual([str(message) for message in response.context['messages']],
+                         ['Удалено блюд: 1', 'Есть в заказах, не удалены: Soup'])
+        order.refresh_from_db()
+        self.assertEqual((order.order_items.count(), order.total_price), (1, Decimal('10.00')))
+
+
+class DishImageVariantsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, DISH_IMAGE_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.category = CategoryDish.objects.create(name="Первые блюда")
+
+    @staticmethod
+    def _upload(name='soup.png', size=(2000, 1500)):
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 80, 40)).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def _create_dish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            dish = Dish.objects.create(name='Soup', description='Hot', category=self.category,
+                                       price=Decimal('5.00'), image=self._upload())
+        dish.refresh_from_db()
+        return dish
+
+    def test_variants_are_built_after_upload(self):
+        dish = self._create_dish()
+
+        self.assertEqual(dish.image_variants['source'], dish.image.name)
+        storage = dish.image.storage
+        with storage.open(dish.image_variants['thumb']) as file, Image.open(file) as thumb:
+            self.assertEqual(thumb.size, (400, 300))
+        with storage.open(dish.image_variants['detail_webp']) as file, Image.open(file) as detail:
+            self.assertEqual((detail.format, detail.size), ('WEBP', (1200, 900)))
+
+    def test_default_image_is_not_scheduled(self):
+        with mock.patch('modules.Cafe_order.signals.schedule_dish_variants') as schedule, \
+                self.captureOnCommitCallbacks(execute=True):
+            Dish.objects.create(name='Soup', description='Hot', category=self.category, price=Decimal('5.00'))
+
+        schedule.assert_not_called()
+
+    def test_stale_variants_fall_back_to_original(self):
+        dish = self._create_dish()
+        dish.image = 'images/other.png'
+
+        urls = dish.image_urls
+        self.assertEqual(urls['thumb'], urls['original'])
+        self.assertIsNone(urls['thumb_webp'])
+
+    def test_menu_page_and_api_use_variants(self):
+        dish = self._create_dish()
+        self.client.force_login(User.objects.create_user(username='waiter', password='waiterpass'))
+
+        response = self.client.get(reverse('dishes'))
+        self.assertContains(response, dish.image_urls['thumb_webp'])
+        self.assertNotContains(response, f'src="{dish.image.url}"')
+
+        response = self.client.get(reverse('dish_api_view-detail', kwargs={'pk': dish.pk}))
+        self.assertTrue(response.data['image_urls']['detail_webp'].endswith('_detail.webp'))
+        self.assertNotIn('image_variants', response.data)
+
+
+class DishImportTestCase(TestCase):
+    def setUp(self):
+        self.soups = CategoryDish.objects.create(name="Первые блюда")
+        self.soup = Dish.objects.create(name='Borsch', description='Red', category=self.soups, price=Decimal('5.00'))
+
+    def test_csv_rows_are_created_updated_and_reported(self):
+        data = (
+            'name,category,price,description\n'
+            'Borsch,первые блюда,6.50,Red soup\n'
+            'Solyanka,Первые блюда,7.00,Meat soup\n'
+            'lower case,Первые блюда,1.00,Bad name\n'
+            'Cake,Десерты,3.00,Unknown category\n'
+            'Solyanka,Первые блюда,7.00,Duplicate\n'
+        ).encode()
+
+        result = import_dishes(BytesIO(data), 'csv')
+
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual([(error['row'], list(error['errors'])) for error in result.errors],
+                         [(4, ['name']), (5, ['category']), (6, ['name'])])
+        self.soup.refresh_from_db()
+        self.assertEqual(self.soup.price, Decimal('6.50'))
+        self.assertTrue(Dish.objects.filter(name='Solyanka', category=self.soups).exists())
+
+    def test_batches_use_constant_queries(self):
+        rows = [{'name': f'Soup {chr(97 + i // 26)}{chr(97 + i % 26)}', 'category': 'Десерты',
+                 'price': '1.00', 'description': 'Generated'} for i in range(60)]
+        data = json.dumps(rows).encode()
+
+        # катэгорыі + ствараемая катэгорыя + па пачцы: пошук існуючых, SAVEPOINT, INSERT, RELEASE
+        with self.assertNumQueries(2 + 3 * 4):
+            result = import_dishes(BytesIO(data), 'json', batch_size=20, create_categories=True)
+
+        self.assertEqual((result.created, result.errors), (60, []))
+
+    def test_json_array_is_read_in_chunks(self):
+        data = json.dumps([
+            {'name': 'Solyanka', 'category': 'Первые блюда', 'price': 7, 'description': 'Meat soup'},
+            'not an object',
+        ], ensure_ascii=False).encode()
+
+        with mock.patch.object(dish_import, 'JSON_CHUNK_SIZE', 7):
+            result = import_dishes(BytesIO(data), 'json')
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([error['row'] for error in result.errors], [2])
+
+    def test_dry_run_saves_nothing(self):
+        data = b'{"name": "Solyanka", "category": "Soups", "price": "7", "description": "Meat soup"}\n'
+        result = import_dishes(BytesIO(data), 'jsonl', dry_run=True, create_categories=True)
+
+        self.assertEqual(result.created, 1)
+        self.assertFalse(Dish.objects.filter(name='Solyanka').exists())
+        self.assertFalse(CategoryDish.objects.filter(name='Soups').exists())
+
+    def test_rejected_row_does_not_create_category(self):
+        data = b'{"name": "lower case", "category": "Soups", "price": "7", "description": "Bad name"}\n'
+        result = import_dishes(BytesIO(data), 'jsonl', create_categories=True)
+
+        self.assertEqual([error['row'] for error in result.errors], [1])
+        self.assertFalse(CategoryDish.objects.filter(name='Soups').exists())
+
+    def test_new_category_is_saved_with_accepted_row(self):
+        data = b'{"name": "Solyanka", "category": "Soups", "price": "7", "description": "Meat soup"}\n'
+        result = import_dishes(BytesIO(data), 'jsonl', create_categories=True)
+
+        self.assertEqual((result.created, result.errors), (1, []))
+        self.assertTrue(Dish.objects.filter(name='Solyanka', category__name='Soups').exists())
+
+    def test_ambiguous_existing_name_is_reported(self):
+        Dish.objects.create(name='Borsch', description='Green', category=self.soups, price=Decimal('4.00'))
+        data = (
+            'name,category,price,description\n'
+            'Borsch,Первые блюда,6.50,Red soup\n'
+            'Solyanka,Первые блюда,7.00,Meat soup\n'
+        ).encode()
+
+        result = import_dishes(BytesIO(data), 'csv')
+
+        self.assertEqual((result.created, result.updated), (1, 0))
+        self.assertEqual([(error['row'], list(error['errors'])) for error in result.errors], [(2, ['name'])])
+        self.assertFalse(Dish.objects.filter(name='Borsch', price=Decimal('6.50')).exists())
+
+    def test_missing_columns_reject_file(self):
+        with self.assertRaises(DishImportError):
+            import_dishes(BytesIO(b'name,price\nBorsch,1\n'), 'csv')
@@ -0,0 +1,1062 @@
+import asyncio
+import datetime
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+from unittest import SkipTest, mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Max, ProtectedError, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from modules.Cafe_order import events, metrics
+from modules.Cafe_order.profiling import get_store
+from modules.Cafe_order.management.commands.benchmark_endpoints import compare_results
+from modules.Cafe_order.forms import OrderItemFormSet
+from modules.Cafe_order.templatetags.custom_tags import sum_total_price
+from modules.Cafe_order.models import (ArchivedOrder, ArchivedOrderItem, CategoryDish, Dish, Order, OrderHistory,
+                                       OrderItem, OrderItemHistory, RevenueRollup, Table, TableOccupiedError)
+
+
+class OrderTotalTestCase(TestCase):
+    def setUp(self):
+        self.category = CategoryDish.objects.create(name="Main")
+        self.soup = Dish.objects.create(name='Soup', description='Hot', category=self.category, price=Decimal('5.50'))
+        self.fish = Dish.objects.create(name='Fish', description='Fried', category=self.category, price=Decimal('12.00'))
+        self.table = Table.objects.create(number=1)
+        self.order = Order.objects.create(table_number=self.table)
+
+    def test_item_save_applies_delta(self):
+        item = OrderItem.objects.create(order=self.order, dish=self.soup, quantity=2)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('11.00'))
+
+        item = OrderItem.objects.get(pk=item.pk)
+        item.quantity = 3
+        with self.assertNumQueries(3):  # заказ не оплачен? + UPDATE радка + UPDATE total_price
+            item.save()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('16.50'))
+
+        item.dish = self.fish
+        item.save()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('36.00'))
+
+    def test_item_delete_subtracts_line(self):
+        OrderItem.objects.create(order=self.order, dish=self.soup, quantity=1)
+        item = OrderItem.objects.create(order=self.order, dish=self.fish, quantity=2)
+        OrderItem.objects.get(pk=item.pk).delete()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('5.50'))
+
+    def test_formset_recalculates_once(self):
+        data = {
+            'order_items-TOTAL_FORMS': '2',
+            'order_items-INITIAL_FORMS': '0',
+            'order_items-0-dish': self.soup.pk,
+            'order_items-0-quantity': '2',
+            'order_items-1-dish': self.fish.pk,
+            'order_items-1-quantity': '1',
+        }
+        formset = OrderItemFormSet(data, instance=self.order)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        # заказ не оплачен? + 2 INSERT + агрэгат + UPDATE total_price
+        with self.assertNumQueries(5):
+            formset.save()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('23.00'))
+
+    def test_recalculate_command_repairs_totals(self):
+        OrderItem.objects.create(order=self.order, dish=self.fish, quantity=2)
+        Order.objects.filter(pk=self.order.pk).update(total_price=0)
+        empty_order = Order.objects.create(table_number=Table.objects.create(number=2))
+        Order.objects.filter(pk=empty_order.pk).update(total_price=99)
+
+        call_command('recalculate_order_totals', stdout=StringIO())
+
+        self.order.refresh_from_db()
+        empty_order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('24.00'))
+        self.assertEqual(empty_order.total_price, Decimal('0'))
+
+
+class OrderChangeTrackingTestCase(TestCase):
+    def setUp(self):
+        self.table = Table.objects.create(number=7)
+        self.order = Order.objects.create(table_number=self.table)
+
+    def test_new_order_occupies_table(self):
+        self.table.refresh_from_db()
+        self.assertTrue(self.table.is_occupied)
+
+    def test_status_change_writes_only_dirty_fields(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = 1
+        with self.assertNumQueries(1):
+            order.save()
+        self.assertEqual(order.get_dirty_fields(), {})
+
+        with self.assertNumQueries(0):
+            order.save()  # нічога не змянілася - запыту няма
+
+    def test_paid_status_frees_table_and_sets_paid_at(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = 2
+        order.save()
+        self.table.refresh_from_db()
+        self.assertFalse(self.table.is_occupied)
+        self.assertIsNotNone(Order.objects.get(pk=order.pk).paid_at)
+
+    def test_stale_total_is_not_written_back(self):
+        dish = Dish.objects.create(name='Soup', description='Hot', price=Decimal('3.00'))
+        order = Order.objects.get(pk=self.order.pk)
+        OrderItem.objects.create(order=order, dish=dish, quantity=2)
+        order.status = 1
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal('6.00'))
+
+
+class TableOccupancyTestCase(TestCase):
+    def setUp(self):
+        self.table = Table.objects.create(number=3)
+
+    def test_occupied_table_cannot_be_claimed(self):
+        Order.objects.create(table_number=self.table)
+        with self.assertRaises(TableOccupiedError):
+            Order.objects.create(table_number=self.table)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_moving_order_claims_new_table_and_frees_old(self):
+        order = Order.objects.create(table_number=self.table)
+        other = Table.objects.create(number=4)
+        order.table_number = other
+        order.save()
+        self.table.refresh_from_db()
+        other.refresh_from_db()
+        self.assertFalse(self.table.is_occupied)
+        self.assertTrue(other.is_occupied)
+
+    def test_delete_view_keeps_table_of_newer_active_order(self):
+        self.client.force_login(User.objects.create_user(username='waiter', password='waiterpass'))
+        paid = Order.objects.create(table_number=self.table)
+        paid.status = 2
+        paid.save()
+        active = Order.objects.create(table_number=self.table)
+
+        self.client.post(reverse('order_delete', args=[paid.pk]))
+        self.table.refresh_from_db()
+        self.assertTrue(self.table.is_occupied)
+
+        self.client.post(reverse('order_delete', args=[active.pk]))
+        self.table.refresh_from_db()
+        self.assertFalse(self.table.is_occupied)
+        self.assertFalse(Order.objects.exists())
+
+    def test_reconcile_command_fixes_drift(self):
+        free_table = Table.objects.create(number=5, is_occupied=True)
+        Order.objects.create(table_number=self.table)
+        Table.objects.filter(pk=self.table.pk).update(is_occupied=False)
+
+        call_command('reconcile_tables', stdout=StringIO())
+
+        self.table.refresh_from_db()
+        free_table.refresh_from_db()
+        self.assertTrue(self.table.is_occupied)
+        self.assertFalse(free_table.is_occupied)
+
+
+class ConcurrentOrderCreationTestCase(TransactionTestCase):
+    workers = 8
+
+    @classmethod
+    def setUpClass(cls):
+        # правяраецца тэставая БД, а не NAME з налад: для SQLite яна па змаўчанні in-memory
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise SkipTest("in-memory SQLite з shared cache не чакае блакіровак, патрэбна файлавая БД або PostgreSQL")
+        super().setUpClass()
+
+    def _create_order(self, table_id):
+        try:
+            Order.objects.create(table_number_id=table_id)
+            return True
+        except TableOccupiedError:
+            return False
+        finally:
+            connection.close()
+
+    def _hammer(self, table_ids):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(self._create_order, table_ids))
+
+    def test_only_one_order_wins_the_table(self):
+        table = Table.objects.create(number=1)
+
+        results = self._hammer([table.pk] * self.workers * 2)
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Order.objects.filter(table_number=table).count(), 1)
+        table.refresh_from_db()
+        self.assertTrue(table.is_occupied)
+
+    def test_each_table_is_claimed_once(self):
+        tables = [Table.objects.create(number=number) for number in range(1, 5)]
+
+        results = self._hammer([table.pk for table in tables] * self.workers)
+
+        self.assertEqual(results.count(True), len(tables))
+        for table in tables:
+            self.assertEqual(Order.objects.filter(table_number=table).count(), 1)
+
+
+class OrdersListPaginationTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='waiter', password='waiterpass'))
+        self.orders = [Order.objects.create(table_number=Table.objects.create(number=number)) for number in range(1, 9)]
+
+    def test_pages_follow_cursor(self):
+        url = reverse('orders_list')
+        response = self.client.get(url)
+        first_page = [order.pk for order in response.context['orders']]
+        self.assertEqual(first_page, [order.pk for order in reversed(self.orders)][:6])
+        self.assertIsNone(response.context['total_count'])
+
+        response = self.client.get(url, {'cursor': response.context['page_obj'].next_cursor, 'count': 'exact'})
+        self.assertEqual([order.pk for order in response.context['orders']], [self.orders[1].pk, self.orders[0].pk])
+        self.assertEqual(response.context['total_count'], 8)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+
+class OrderDisplayQueriesTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='waiter', password='waiterpass'))
+        category = CategoryDish.objects.create(name="Main")
+        self.dishes = [Dish.objects.create(name=f'Dish {name}', description='-', category=category,
+                                           price=Decimal('2.50')) for name in 'abcdef']
+
+    def _order(self, number, lines):
+        order = Order.objects.create(table_number=Table.objects.create(number=number))
+        OrderItem.objects.bulk_create(OrderItem(order=order, dish=dish, quantity=2, price=dish.price)
+                                      for dish in self.dishes[:lines])
+        return order
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_queries_do_not_depend_on_lines(self):
+        self._order(1, 1)
+        few = self._count_queries(reverse('orders_list'))
+        for number in range(2, 6):
+            self._order(number, 6)
+        self.assertEqual(self._count_queries(reverse('orders_list')), few)
+
+    def test_detail_queries_do_not_depend_on_lines(self):
+        small, large = self._order(1, 1), self._order(2, 6)
+        self.assertEqual(self._count_queries(reverse('order_detail', args=[large.pk])),
+                         self._count_queries(reverse('order_detail', args=[small.pk])))
+
+    def test_line_totals_come_from_sql(self):
+        order = Order.objects.for_display().with_items_total().get(pk=self._order(1, 3).pk)
+        with self.assertNumQueries(0):
+            self.assertEqual([item.total_price for item in order.order_items.all()], [Decimal('5.00')] * 3)
+            self.assertEqual(sum_total_price(order.order_items), Decimal('15.00'))
+        self.assertEqual(order.items_total, Decimal('15.00'))
+
+        item = order.order_items.all()[0]
+        item.quantity = 3
+        self.assertEqual(item.total_price, Decimal('7.50'))
+
+
+class AsyncReadViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='waiter', password='waiterpass')
+        category = CategoryDish.objects.create(name="Main")
+        self.soup = Dish.objects.create(name='Soup', description='Hot', category=category, price=Decimal('5.00'))
+        self.orders = []
+        for number in range(1, 9):
+            order = Order.objects.create(table_number=Table.objects.create(number=number))
+            OrderItem.objects.create(order=order, dish=self.soup, quantity=number)
+            self.orders.append(order)
+        self.orders[0].status = 2
+        self.orders[0].save()
+
+    async def test_login_required(self):
+        response = await self.async_client.get(reverse('orders_list_async'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith('/login/'))
+
+    async def test_orders_list_matches_sync_view(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('orders_list_async'), {'count': 'exact'})
+        self.assertEqual([order.pk for order in response.context['orders']],
+                         [order.pk for order in reversed(self.orders[1:])][:6])
+        self.assertEqual(response.context['total_count'], 7)
+
+        next_page = await self.async_client.get(reverse('orders_list_async'),
+                                                {'cursor': response.context['page_obj'].next_cursor})
+        self.assertEqual([order.pk for order in next_page.context['orders']], [self.orders[1].pk])
+
+    async def test_detail_menu_and_revenue(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('order_detail_async', args=[self.orders[2].pk]))
+        self.assertEqual(response.context['order'].pk, self.orders[2].pk)
+        self.assertContains(response, 'Soup')
+        response = await self.async_client.get(reverse('order_detail_async', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.get(reverse('dishes_async'))
+        self.assertEqual([dish.name for dishes in response.context['dishes_by_category'].values()
+                          for dish in dishes], ['Soup'])
+
+        response = await self.async_client.get(reverse('daily_revenue_async'))
+        self.assertEqual(response.context['total_revenue'], Decimal('5.00'))
+        self.assertEqual([order.pk for order in response.context['orders']], [self.orders[0].pk])
+
+
+class RevenueRollupTestCase(TestCase):
+    def setUp(self):
+        self.category = CategoryDish.objects.create(name="Main")
+        self.soup = Dish.objects.create(name='Soup', description='Hot', category=self.category, price=Decimal('5.00'))
+        self.fish = Dish.objects.create(name='Fish', description='Fried', category=self.category, price=Decimal('10.00'))
+
+    def _paid_order(self, number, items):
+        order = Order.objects.create(table_number=Table.objects.create(number=number))
+        for dish, quantity in items:
+            OrderItem.objects.create(order=order, dish=dish, quantity=quantity)
+        order = Order.objects.get(pk=order.pk)
+        order.status = 2
+        order.save()
+        return order
+
+    def test_payment_updates_rollups(self):
+        self._paid_order(1, [(self.soup, 2), (self.fish, 1)])
+        self._paid_order(2, [(self.soup, 1)])
+
+        soup = RevenueRollup.objects.get(dish=self.soup)
+        self.assertEqual(soup.quantity, 3)
+        self.assertEqual(soup.revenue, Decimal('15.00'))
+        self.assertEqual(soup.category, self.category)
+        self.assertEqual(soup.day, timezone.localdate())
+        self.assertEqual(RevenueRollup.objects.get(dish=self.fish).revenue, Decimal('10.00'))
+
+    def test_unpaying_subtracts_revenue(self):
+        order = self._paid_order(1, [(self.soup, 2)])
+        order.status = 1
+        order.save()
+
+        self.assertEqual(RevenueRollup.objects.get(dish=self.soup).revenue, Decimal('0'))
+        self.assertIsNone(Order.objects.get(pk=order.pk).paid_at)
+
+    def test_backfill_command_rebuilds_history(self):
+        self._paid_order(1, [(self.soup, 2), (self.fish, 1)])
+        expected = sorted(RevenueRollup.objects.values_list('dish', 'quantity', 'revenue'))
+        RevenueRollup.objects.all().delete()
+
+        call_command('backfill_revenue_rollups', stdout=StringIO())
+
+        self.assertEqual(sorted(RevenueRollup.objects.values_list('dish', 'quantity', 'revenue')), expected)
+
+    def _revenue(self):
+        return RevenueRollup.objects.aggregate(total=Sum('revenue'))['total']
+
+    def test_order_created_paid_reaches_rollups(self):
+        order = Order.objects.create(table_number=Table.objects.create(number=1), status=2)
+        OrderItem.objects.create(order=order, dish=self.fish, quantity=1)
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal('10.00'))
+        self.assertEqual(self._revenue(), Decimal('10.00'))
+
+    def test_editing_lines_of_paid_order_updates_rollups(self):
+        order = self._paid_order(1, [(self.soup, 1)])
+        OrderItem.objects.create(order=order, dish=self.fish, quantity=1)
+        item = OrderItem.objects.get(order=order, dish=self.soup)
+        item.quantity = 3
+        item.save()
+        self.assertEqual(self._revenue(), Decimal('25.00'))
+        OrderItem.objects.get(order=order, dish=self.fish).delete()
+        order.refresh_from_db()
+        self.assertEqual((order.total_price, self._revenue()), (Decimal('15.00'), Decimal('15.00')))
+
+    def test_deleting_paid_orders_subtracts_revenue(self):
+        self._paid_order(1, [(self.soup, 2)]).delete()
+        self.assertEqual(self._revenue(), Decimal('0'))
+        self._paid_order(2, [(self.fish, 1)])
+        Order.objects.all().delete_orders()
+        self.assertEqual(self._revenue(), Decimal('0'))
+
+    def test_backfill_keeps_price_at_order_time(self):
+        self._paid_order(1, [(self.soup, 2)])
+        Dish.objects.filter(pk=self.soup.pk).update(price=Decimal('100.00'))
+        RevenueRollup.objects.all().delete()
+
+        call_command('backfill_revenue_rollups', stdout=StringIO())
+
+        self.assertEqual(self._revenue(), Decimal('10.00'))
+        self.assertEqual(Order.objects.get().total_price, Decimal('10.00'))
+
+    def test_daily_revenue_view_uses_aggregates(self):
+        self._paid_order(1, [(self.soup, 2), (self.fish, 1)])
+        response = self.client.get(reverse('daily_revenue'))
+        self.assertEqual(response.context['total_revenue'], Decimal('20.00'))
+        self.assertEqual(list(response.context['revenue_by_category']),
+                         [{'category__name': 'Main', 'revenue': Decimal('20.00'), 'quantity': 3}])
+
+
+class BulkOrderOperationsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='waiter', password='waiterpass')
+        category = CategoryDish.objects.create(name="Main")
+        self.soup = Dish.objects.create(name='Soup', description='Hot', category=category, price=Decimal('5.00'))
+        self.orders = []
+        for number in range(1, 4):
+            order = Order.objects.create(table_number=Table.objects.create(number=number))
+            OrderItem.objects.create(order=order, dish=self.soup, quantity=number)
+            self.orders.append(order)
+        self.ids = [order.pk for order in self.orders]
+
+    def test_paying_many_orders_frees_tables(self):
+        with self.assertNumQueries(10):
+            changed = Order.objects.filter(pk__in=self.ids).set_status(2, updater=self.user)
+
+        self.assertEqual(changed, 3)
+        self.assertFalse(Table.objects.filter(is_occupied=True).exists())
+        self.assertFalse(Order.objects.filter(pk__in=self.ids).exclude(status=2).exists())
+        self.assertFalse(Order.objects.filter(pk__in=self.ids, paid_at__isnull=True).exists())
+        rollup = RevenueRollup.objects.get(dish=self.soup)
+        self.assertEqual((rollup.quantity, rollup.revenue), (6, Decimal('30.00')))
+
+    def test_query_count_does_not_grow_with_orders(self):
+        with self.assertNumQueries(10):
+            Order.objects.filter(pk__in=self.ids[:1]).set_status(2)
+
+    def test_reopening_on_occupied_table_changes_nothing(self):
+        Order.objects.filter(pk__in=self.ids).set_status(2)
+        Order.objects.create(table_number=self.orders[1].table_number)
+
+        with self.assertRaises(TableOccupiedError) as raised:
+            Order.objects.filter(pk__in=self.ids).set_status(0)
+
+        self.assertEqual(raised.exception.table_id, self.orders[1].table_number_id)
+        self.assertEqual(Order.objects.filter(pk__in=self.ids, status=2).count(), 3)
+        self.assertEqual(Table.objects.filter(is_occupied=True).count(), 1)
+        self.assertEqual(RevenueRollup.objects.get(dish=self.soup).quantity, 6)
+
+    def test_reopening_claims_tables_and_subtracts_revenue(self):
+        Order.objects.filter(pk__in=self.ids).set_status(2)
+
+        Order.objects.filter(pk__in=self.ids[:2]).set_status(1)
+
+        self.assertEqual(Table.objects.filter(is_occupied=True).count(), 2)
+        self.assertEqual(Order.objects.filter(paid_at__isnull=True).count(), 2)
+        self.assertEqual(RevenueRollup.objects.get(dish=self.soup).quantity, 3)
+
+    def test_delete_orders_frees_active_tables(self):
+        Order.objects.filter(pk=self.ids[0]).set_status(2)
+        deleted = Order.objects.filter(pk__in=self.ids).delete_orders()
+
+        self.assertEqual(deleted, 3)
+        self.assertFalse(Table.objects.filter(is_occupied=True).exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_bulk_action_view(self):
+        self.client.force_login(self.user)
+        url = reverse('delete_multiple_orders')
+
+        response = self.client.post(url, {'orders': self.ids[:2], 'action': 'status', 'status': 2,
+                                          'next': reverse('orders_list_all')})
+        self.assertRedirects(response, reverse('orders_list_all'), fetch_redirect_response=False)
+        self.assertEqual(Order.objects.filter(status=2).count(), 2)
+
+        response = self.client.post(url, {'orders': self.ids, 'action': 'delete', 'next': 'https://example.com/'})
+        self.assertRedirects(response, reverse('orders_list'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+
+
+class SeedDataTestCase(TestCase):
+    def _seed(self):
+        call_command('seed_data', '--end=2025-01-31', orders=300, dishes=20, tables=8, days=14, active=3,
+                     batch_size=100, stdout=StringIO())
+        return list(Order.objects.order_by('pk').values_list('table_number__number', 'status', 'time_update',
+                                                              'total_price'))
+
+    def test_generates_consistent_reproducible_data(self):
+        first = self._seed()
+
+        self.assertEqual(len(first), 300)
+        self.assertEqual(Order.objects.exclude(status=2).count(), 3)
+        self.assertEqual(set(Table.objects.filter(is_occupied=True).values_list('pk', flat=True)),
+                         set(Order.objects.exclude(status=2).values_list('table_number', flat=True)))
+        for total_price, items_total in Order.objects.with_items_total().values_list('total_price', 'items_total'):
+            self.assertEqual(total_price, items_total)
+        self.assertEqual(Order.objects.filter(status=2).aggregate(total=Sum('total_price'))['total'],
+                         RevenueRollup.objects.aggregate(total=Sum('revenue'))['total'])
+        paid_moments = [moment for _, status, moment, _ in first if status == 2]
+        self.assertTrue({timezone.localtime(moment).hour for moment in paid_moments} <= set(range(7, 24)))
+        self.assertEqual(paid_moments, sorted(paid_moments))
+
+        Order.objects.all().delete()
+        Table.objects.update(is_occupied=False)
+        self.assertEqual(self._seed(), first)
+        self.assertEqual(Dish.objects.count(), 20)
+
+    def test_bulk_create_writer_resets_sequences(self):
+        with mock.patch.object(connection.ops, 'sequence_reset_sql', return_value=[]) as reset:
+            call_command('seed_data', orders=20, dishes=5, tables=4, days=2, no_copy=True, stdout=StringIO())
+
+        reset.assert_called_once()
+        self.assertEqual(reset.call_args.args[1], [Order, OrderItem])
+        order = Order.objects.create(table_number=Table.objects.filter(is_occupied=False).first())
+        self.assertGreater(order.pk, Order.objects.exclude(pk=order.pk).aggregate(last=Max('pk'))['last'])
+
+
+class BenchmarkEndpointsTestCase(TestCase):
+    def test_in_place_run_covers_routes(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'adminpass')
+        call_command('seed_data', orders=20, dishes=5, tables=4, days=2, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/bench.json'
+            call_command('benchmark_endpoints', in_place=True, repeat=2, json_path=path, stdout=StringIO())
+            with open(path, encoding='utf-8') as file:
+                results = json.load(file)['results']['20']
+
+        self.assertEqual(results['orders_list']['status'], 200)
+        self.assertGreater(results['orders_list']['queries'], 0)
+        self.assertIn('p99_ms', results['order_api_view-detail'])
+        self.assertIsNone(results['order_events'])
+        self.assertIsNone(results['delete_multiple_orders'])
+
+    def test_compare_results_reports_regressions(self):
+        baseline = {'1000': {'orders_list': {'queries': 4, 'p50_ms': 10.0}, 'home': {'queries': 2, 'p50_ms': 1.0}}}
+        current = {'1000': {'orders_list': {'queries': 5, 'p50_ms': 13.0}, 'home': {'queries': 2, 'p50_ms': 1.5},
+                            'order_events': None}}
+
+        self.assertEqual(compare_results(current, baseline), [
+            '1000/orders_list: запытаў 4 -> 5',
+            '1000/orders_list: p50_ms 10.0 -> 13.0',
+        ])
+        self.assertEqual(compare_results(current, baseline, max_slowdown=0.5, max_extra_queries=1), [])
+
+
+class OrderAdminTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='adminpass'))
+        category = CategoryDish.objects.create(name="Main")
+        self.soup = Dish.objects.create(name='Soup', description='Hot', category=category, price=Decimal('5.00'))
+        self.fish = Dish.objects.create(name='Fish', description='Fried', category=category, price=Decimal('9.00'))
+
+    def _create_orders(self, count):
+        start = Table.objects.count() + 1
+        for number in range(start, start + count):
+            order = Order.objects.create(table_number=Table.objects.create(number=number))
+            OrderItem.objects.create(order=order, dish=self.soup, quantity=1)
+            OrderItem.objects.create(order=order, dish=self.fish, quantity=2)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_changelists_do_not_grow_with_rows(self):
+        for model in ('order', 'orderitem'):
+            url = reverse(f'admin:Cafe_order_{model}_changelist')
+            self._create_orders(2)
+            few, _ = self._count_queries(url)
+            self._create_orders(10)
+            many, _ = self._count_queries(url)
+            self.assertEqual(few, many, model)
+
+    def test_order_changelist_shows_aggregated_dish_names(self):
+        self._create_orders(1)
+        _, response = self._count_queries(reverse('admin:Cafe_order_order_changelist'))
+        names = response.context['cl'].result_list[0].dish_names
+        self.assertEqual(sorted(names.split(', ')), ['Fish', 'Soup'])
+
+    def test_order_autocomplete_search(self):
+        self._create_orders(3)
+        url = reverse('admin:autocomplete')
+        params = {'app_label': 'Cafe_order', 'model_name': 'orderitem', 'field_name': 'order'}
+        response = self.client.get(url, {**params, 'term': '2'})
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.client.get(url, {**params, 'term': 'abc'})
+        self.assertEqual(response.status_code, 200)
+
+
+class RevenueReportTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='manager', password='managerpass'))
+        dish = Dish.objects.create(name='Soup', description='Hot', price=Decimal('4.00'))
+        for number in range(1, 4):
+            order = Order.objects.create(table_number=Table.objects.create(number=number))
+            OrderItem.objects.create(order=order, dish=dish, quantity=number)
+            order = Order.objects.get(pk=order.pk)
+            order.status = 2
+            order.save()
+        self.today = timezone.localdate().isoformat()
+
+    def test_report_aggregates_period(self):
+        response = self.client.get(reverse('revenue_report'), {'date_from': self.today, 'date_to': self.today})
+        self.assertEqual(response.context['summary']['revenue'], Decimal('24.00'))
+        self.assertEqual(response.context['orders_count'], 3)
+
+    def test_export_streams_csv(self):
+        response = self.client.get(reverse('revenue_export'), {'date_from': self.today, 'date_to': self.today})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'order_id,paid_at,table,status,total_price')
+        self.assertEqual([line.split(',')[-1] for line in lines[1:]], ['4.00', '8.00', '12.00'])
+
+    def test_export_rejects_bad_period(self):
+        response = self.client.get(reverse('revenue_export'), {'date_from': self.today, 'date_to': '2000-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderSearchTestCase(TestCase):
+    def setUp(self):
+        dish = Dish.objects.create(name='Soup', description='Hot', price=Decimal('10.00'))
+        self.orders = []
+        for number in range(1, 4):
+            order = Order.objects.create(table_number=Table.objects.create(number=number))
+            OrderItem.objects.create(order=order, dish=dish, quantity=number)
+            self.orders.append(order)
+        paid = Order.objects.get(pk=self.orders[2].pk)
+        paid.status = 2
+        paid.save()
+
+    def _search(self, query):
+        response = self.client.get(reverse('order_search'), {'query': query})
+        return sorted(order.pk for order in response.context['orders']), response
+
+    def test_table_number_is_exact(self):
+        self.assertEqual(self._search('1')[0], [self.orders[0].pk])
+        self.assertEqual(self._search('стол:2')[0], [self.orders[1].pk])
+
+    def test_status_by_label(self):
+        self.assertEqual(self._search('оплач')[0], [self.orders[2].pk])
+
+    def test_total_range_and_comparison(self):
+        self.assertEqual(self._search('15-25')[0], [self.orders[1].pk])
+        self.assertEqual(self._search('>15')[0], [self.orders[1].pk, self.orders[2].pk])
+
+    def test_date_and_combined_conditions(self):
+        today = timezone.localdate().strftime('%d.%m.%Y')
+        self.assertEqual(self._search(f'{today} <15')[0], [self.orders[0].pk])
+
+    def test_paid_orders_are_found_by_payment_day(self):
+        paid_day = timezone.localdate() - datetime.timedelta(days=10)
+        Order.objects.filter(pk=self.orders[2].pk).update(paid_at=timezone.now() - datetime.timedelta(days=10))
+
+        self.assertEqual(self._search(timezone.localdate().isoformat())[0], [self.orders[0].pk, self.orders[1].pk])
+        self.assertEqual(self._search(paid_day.isoformat())[0], [self.orders[2].pk])
+
+    def test_unparsed_tokens_are_reported(self):
+        found, response = self._search('borsch')
+        self.assertEqual(response.context['unparsed'], ['borsch'])
+        self.assertEqual(len(found), 3)
+
+    def test_search_form_without_status(self):
+        response = self.client.get(reverse('order_search'), {'table_number': '3', 'status': ''})
+        self.assertEqual([order.pk for order in response.context['orders']], [self.orders[2].pk])
+
+
+class OrderArchiveTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='manager', password='managerpass'))
+        self.dish = Dish.objects.create(name='Soup', description='Hot', price=Decimal('4.00'))
+        self.old_day = timezone.localdate() - datetime.timedelta(days=100)
+        self.old = [self._order(number, quantity=number, paid_days_ago=100) for number in range(1, 4)]
+        self.recent = self._order(4, quantity=1, paid_days_ago=1)
+        self.active = self._order(5, quantity=1)
+
+    def _order(self, number, quantity, paid_days_ago=None):
+        order = Order.objects.create(table_number=Table.objects.create(number=number))
+        OrderItem.objects.create(order=order, dish=self.dish, quantity=quantity)
+        if paid_days_ago is not None:
+            order = Order.objects.get(pk=order.pk)
+            order.status = 2
+            order.save()
+            Order.objects.filter(pk=order.pk).update(
+                paid_at=timezone.now() - datetime.timedelta(days=paid_days_ago))
+        return order
+
+    def test_command_moves_old_paid_orders_in_batches(self):
+        out = StringIO()
+        call_command('archive_orders', days=30, batch_size=2, stdout=out)
+
+        old_ids = sorted(order.pk for order in self.old)
+        self.assertEqual(sorted(ArchivedOrder.objects.values_list('pk', flat=True)), old_ids)
+        self.assertEqual(sorted(ArchivedOrderItem.objects.values_list('order_id', 'quantity')),
+                         [(pk, quantity) for pk, quantity in zip(old_ids, (1, 2, 3))])
+        self.assertEqual(sorted(Order.objects.values_list('pk', flat=True)), [self.recent.pk, self.active.pk])
+        self.assertFalse(OrderItem.objects.filter(order_id__in=old_ids).exists())
+        self.assertEqual(ArchivedOrder.objects.get(pk=old_ids[2]).total_price, Decimal('12.00'))
+        self.assertEqual(out.getvalue().count('Заказаў:'), 2)  # пачкі па 2 і 1 заказу
+
+    def test_dry_run_and_minimum_age(self):
+        out = StringIO()
+        call_command('archive_orders', days=30, dry_run=True, stdout=out)
+        self.assertIn(': 3', out.getvalue())
+        self.assertFalse(ArchivedOrder.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('archive_orders', days=0, stdout=StringIO())
+
+    def test_history_reads_live_and_archived_orders(self):
+        call_command('archive_orders', days=30, stdout=StringIO())
+
+        self.assertEqual(OrderHistory.objects.count(), 5)
+        self.assertEqual(OrderHistory.objects.filter(archived_at__isnull=False).count(), 3)
+        self.assertEqual(OrderItemHistory.objects.filter(order__status=2).aggregate(total=Sum('quantity'))['total'], 7)
+
+        response = self.client.get(reverse('orders_list_all'))
+        self.assertEqual(len(response.context['orders']), 5)
+        archived = self.old[0]
+        found = [order.pk for order in self.client.get(reverse('order_search'),
+                                                       {'query': f'#{archived.pk}'}).context['orders']]
+        self.assertEqual(found, [archived.pk])
+
+        response = self.client.get(reverse('order_detail', args=[archived.pk]))
+        self.assertTrue(response.context['order'].archived)
+        self.assertNotContains(response, reverse('order_update', args=[archived.pk]))
+        self.assertEqual(self.client.get(reverse('order_detail', args=[self.active.pk])).context['order'].pk,
+                         self.active.pk)
+
+    def test_deleted_dish_stays_in_archived_order_and_rollups(self):
+        tea = Dish.objects.create(name='Tea', description='Green', price=Decimal('6.00'))
+        OrderItem.objects.create(order=self.old[0], dish=tea, quantity=1)
+        call_command('archive_orders', days=30, stdout=StringIO())
+        tea.delete()
+
+        response = self.client.get(reverse('order_detail', args=[self.old[0].pk]))
+        order = response.context['order']
+        self.assertEqual(order.total_price, Decimal('10.00'))
+        self.assertEqual(sum(item.total_price for item in order.order_items.all()), Decimal('10.00'))
+        self.assertContains(response, 'Блюдо удалено')
+
+        RevenueRollup.objects.all().delete()
+        call_command('backfill_revenue_rollups', stdout=StringIO())
+        self.assertEqual(RevenueRollup.objects.filter(day=self.old_day).aggregate(total=Sum('revenue'))['total'],
+                         Decimal('30.00'))
+        self.assertEqual(RevenueRollup.objects.get(day=self.old_day, dish__isnull=True).revenue, Decimal('6.00'))
+
+    def test_dish_in_live_order_is_protected(self):
+        with self.assertRaises(ProtectedError):
+            self.dish.delete()
+
+    def test_revenue_history_includes_archive(self):
+        call_command('archive_orders', days=30, stdout=StringIO())
+        period = {'date_from': self.old_day.isoformat(), 'date_to': timezone.localdate().isoformat()}
+
+        self.assertEqual(self.client.get(reverse('revenue_report'), period).context['orders_count'], 4)
+        lines = b''.join(self.client.get(reverse('revenue_export'), period).streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[-1] for line in lines[1:]], ['4.00', '8.00', '12.00', '4.00'])
+
+        RevenueRollup.objects.all().delete()
+        call_command('backfill_revenue_rollups', stdout=StringIO())
+        self.assertEqual(RevenueRollup.objects.filter(day=self.old_day).aggregate(total=Sum('revenue'))['total'],
+                         Decimal('24.00'))
+
+
+class RecordingBroker(events.LocalBroker):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.published = []
+
+    def publish(self, event):
+        self.published.append(event)
+        super().publish(event)
+
+
+@override_settings(ORDER_EVENTS={'BACKEND': 'modules.Cafe_order.tests.test_orders.RecordingBroker'})
+class OrderEventsTestCase(TestCase):
+    def setUp(self):
+        self.table = Table.objects.create(number=1)
+        events.get_broker().published.clear()
+
+    def _published(self):
+        return [(event['type'], event['order_id'], event['status']) for event in events.get_broker().published]
+
+    def test_created_and_status_changed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            order = Order.objects.create(table_number=self.table)
+        self.assertEqual(len(callbacks), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 1
+            order.save()
+            order.save()  # статус не изменился - события нет
+            Order.objects.filter(pk=order.pk).set_status(2)
+
+        self.assertEqual(self._published(), [
+            (events.ORDER_CREATED, order.pk, 0),
+            (events.ORDER_STATUS_CHANGED, order.pk, 1),
+            (events.ORDER_STATUS_CHANGED, order.pk, 2),
+        ])
+        self.assertEqual(events.get_broker().published[-1]['previous_status'], 1)
+
+    def test_nothing_is_published_before_commit(self):
+        Order.objects.create(table_number=self.table)
+        self.assertEqual(events.get_broker().published, [])
+
+    def test_local_broker_delivers_to_every_subscriber(self):
+        broker = events.LocalBroker()
+
+        async def receive():
+            first, second = broker.subscribe(heartbeat=0.05), broker.subscribe(heartbeat=0.05)
+            self.assertIsNone(await anext(first))  # heartbeat, подписка активна
+            self.assertIsNone(await anext(second))
+            broker.publish({'id': '1', 'type': events.ORDER_CREATED})
+            received = [await anext(first), await anext(second)]
+            await first.aclose()
+            await second.aclose()
+            return received
+
+        received = asyncio.run(receive())
+        self.assertEqual([event['id'] for event in received], ['1', '1'])
+        self.assertEqual(broker._subscribers, set())
+
+    def test_file_broker_shares_events_between_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/events.jsonl'
+            worker, other_worker = (events.FileBroker(path, poll_interval=0.01) for _ in range(2))
+
+            async def receive():
+                subscription = worker.subscribe(heartbeat=0.05)
+                self.assertIsNone(await anext(subscription))
+                other_worker.publish({'id': '7', 'type': events.ORDER_STATUS_CHANGED, 'order_id': 7})
+                event = await anext(subscription)
+                while event is None:
+                    event = await anext(subscription)
+                await subscription.aclose()
+                return event
+
+            self.assertEqual(asyncio.run(receive())['order_id'], 7)
+
+    def test_format_sse(self):
+        event = {'id': 'abc', 'type': events.ORDER_CREATED, 'order_id': 5}
+        self.assertEqual(events.format_sse(event),
+                         'id: abc\nevent: order.created\ndata: {"id":"abc","type":"order.created","order_id":5}\n\n')
+        self.assertEqual(events.format_sse(None), ': ping\n\n')
+
+    async def test_events_view_streams_published_events(self):
+        user = await User.objects.acreate_user(username='cook', password='cookpass')
+        response = await self.async_client.get(reverse('order_events'))
+        self.assertEqual(response.status_code, 403)
+
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('order_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        reading = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)  # генератор подписался на брокер
+        events.publish(events.ORDER_CREATED, order_id=42, status=0)
+        chunk = await asyncio.wait_for(reading, 1)
+        self.assertIn(b'event: order.created', chunk)
+        self.assertIn(b'"order_id":42', chunk)
+        await stream.aclose()
+
+    def test_events_view_is_disabled_under_wsgi(self):
+        self.client.force_login(User.objects.create_user(username='cook', password='cookpass'))
+        response = self.client.get(reverse('order_events'))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+        self.assertNotContains(self.client.get(reverse('orders_list')), 'EventSource(')
+
+    async def test_orders_page_subscribes_under_asgi(self):
+        await self.async_client.aforce_login(await User.objects.acreate_user(username='cook', password='cookpass'))
+        response = await self.async_client.get(reverse('orders_list_async'))
+        self.assertContains(response, 'EventSource(')
+
+
+class RequestTimingMiddlewareTestCase(TestCase):
+    logger_name = 'modules.Cafe_order.instrumentation'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='waiter', password='waiterpass')
+        category = CategoryDish.objects.create(name="Main")
+        soup = Dish.objects.create(name='Soup', description='Hot', category=category, price=Decimal('5.00'))
+        for number in range(1, 4):
+            order = Order.objects.create(table_number=Table.objects.create(number=number))
+            OrderItem.objects.create(order=order, dish=soup, quantity=number)
+
+    def test_header_and_log_line(self):
+        self.client.force_login(self.user)
+        with self.assertLogs(self.logger_name, 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('orders_list'))
+        query_count = len(queries)
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn(f'desc="{query_count} queries"', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        record = logs.records[-1].request_timing
+        self.assertEqual(logs.records[-1].levelname, 'INFO')
+        self.assertEqual(json.loads(logs.records[-1].getMessage()), record)
+        self.assertEqual(record['view'], 'orders_list')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['db_queries'], query_count)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertNotIn('slowest_queries', record)
+
+    @override_settings(REQUEST_TIMING={'SLOW_REQUEST_MS': 0, 'SLOW_QUERIES': 2})
+    def test_slow_request_dumps_slowest_queries(self):
+        self.client.force_login(self.user)
+        with self.assertLogs(self.logger_name, 'WARNING') as logs:
+            self.client.get(reverse('orders_list'))
+
+        record = logs.records[-1].request_timing
+        self.assertTrue(record['slow'])
+        self.assertEqual(len(record['slowest_queries']), 2)
+        self.assertGreaterEqual(record['slowest_queries'][0]['ms'], record['slowest_queries'][1]['ms'])
+        self.assertIn('SELECT', record['slowest_queries'][0]['sql'])
+        self.assertNotIn('params', record['slowest_queries'][0])
+        self.assertNotIn(self.client.session.session_key, logs.output[-1])
+
+    @override_settings(REQUEST_TIMING={'ENABLED': False})
+    def test_disabled(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('orders_list'))
+        self.assertNotIn('Server-Timing', response)
+
+    async def test_async_view_queries_are_counted(self):
+        await self.async_client.aforce_login(self.user)
+        with self.assertLogs(self.logger_name, 'INFO') as logs:
+            response = await self.async_client.get(reverse('orders_list_async'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(logs.records[-1].request_timing['db_queries'], 0)
+        self.assertIn('Server-Timing', response)
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.table = Table.objects.create(number=1)
+
+    def test_counters_are_summed_across_threads(self):
+        registry = metrics.Registry()
+        counter = registry.counter('test_total', 'Test', ('kind',))
+        histogram = registry.histogram('test_seconds', 'Test', buckets=(0.1, 1))
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda _: (counter.inc('a'), histogram.observe(0.5)), range(100)))
+        counter.inc('b', amount=2)
+        histogram.observe(5)
+
+        self.assertEqual(counter.collect(), {('a',): 100, ('b',): 2})
+        text = registry.render()
+        self.assertIn('test_total{kind="a"} 100', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('test_seconds_bucket{le="1"} 100', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 101', text)
+        self.assertIn('test_seconds_sum 55', text)
+        self.assertIn('# TYPE test_seconds histogram', text)
+
+    def test_multiprocess_directory_sums_workers(self):
+        workers = [metrics.Registry(), metrics.Registry()]
+        counters = [worker.counter('test_total', 'Test') for worker in workers]
+        counters[0].inc(amount=3)
+        counters[1].inc(amount=4)
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS={'MULTIPROCESS_DIR': directory}):
+            workers[1].flush(directory)
+            self.assertIn('test_total 7', workers[0].render())
+
+    def test_endpoint_requires_staff_or_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with override_settings(METRICS={'TOKEN': 'secret'}):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code,
+                             403)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    def test_request_and_business_metrics(self):
+        created = metrics.ORDERS_CREATED.collect().get((), 0)
+        paid = metrics.ORDERS_PAID.collect().get((), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(table_number=self.table)
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.filter(pk=order.pk).set_status(2)
+        Order.objects.create(table_number=Table.objects.create(number=2))
+
+        self.assertEqual(metrics.ORDERS_CREATED.collect()[()], created + 1)
+        self.assertEqual(metrics.ORDERS_PAID.collect()[()], paid + 1)
+
+        self.client.force_login(User.objects.create_user(username='manager', password='pass', is_staff=True))
+        self.client.get(reverse('orders_list'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('cafe_http_request_duration_seconds_count{view="orders_list",method="GET"}', text)
+        self.assertIn('cafe_db_queries_per_request_bucket{view="orders_list",le="+Inf"}', text)
+        self.assertIn('cafe_http_responses_total{view="orders_list",status="200"}', text)
+        self.assertIn('cafe_tables_occupied 1\n', text)
+
+
+class RequestProfilingTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(PROFILING={'DIR': self.directory.name, 'KEEP': 3})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staff = User.objects.create_user(username='manager', password='pass', is_staff=True)
+        Order.objects.create(table_number=Table.objects.create(number=1))
+
+    def test_only_staff_can_profile(self):
+        self.client.force_login(User.objects.create_user(username='waiter', password='pass'))
+        response = self.client.get(reverse('orders_list'), {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(get_store().list(), [])
+        self.assertEqual(self.client.get(reverse('admin_profiles')).status_code, 302)
+
+    def test_cprofile_saved_with_metadata_and_listed(self):
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('orders_list')))
+        response = self.client.get(reverse('orders_list'), {'_profile': '1'})
+
+        profile = get_store().get(response['X-Profile-Id'])
+        self.assertEqual(profile['mode'], 'cprofile')
+        self.assertEqual(profile['view'], 'orders_list')
+        self.assertEqual(profile['path'], reverse('orders_list') + '?_profile=1')
+        self.assertEqual(profile['user'], 'manager')
+        self.assertGreater(profile['db_queries'], 0)
+
+        self.assertContains(self.client.get(reverse('admin_profiles')), profile['id'])
+        self.assertContains(self.client.get(reverse('admin_profile_detail', args=[profile['id']])),
+                            'Ordered by: cumulative time')
+        download = self.client.get(reverse('admin_profile_download', args=[profile['id']]))
+        self.assertIn(f"{profile['id']}.prof", download['Content-Disposition'])
+        self.assertTrue(b''.join(download.streaming_content))
+        self.assertEqual(self.client.get(reverse('admin_profile_detail', args=['secret'])).status_code, 404)
+
+    def test_sampling_profile_and_retention(self):
+        self.client.force_login(self.staff)
+        ids = [self.client.get(reverse('dishes'), HTTP_X_PROFILE='sample')['X-Profile-Id'] for _ in range(4)]
+
+        profiles = get_store().list()
+        self.assertEqual([profile['id'] for profile in profiles], sorted(ids[1:], reverse=True))
+        self.assertEqual(profiles[0]['mode'], 'sample')
+        self.assertEqual(profiles[0]['threads'], 'request')
+        self.assertEqual(self.client.get(reverse('admin_profile_detail', args=[ids[-1]])).status_code, 200)
+
+    async def test_async_request_is_sampled(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('orders_list_async'), headers={'X-Profile': '1'})
+
+        profile = get_store().get(response['X-Profile-Id'])
+        self.assertEqual(profile['mode'], 'sample')
+        self.assertEqual(profile['threads'], 'all')
+        self.assertEqual(profile['requested_mode'], 'cprofile')
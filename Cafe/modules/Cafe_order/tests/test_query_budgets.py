@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from modules.Cafe_order.management.commands.benchmark_endpoints import (SKIPPED_ROUTES, _fetch, endpoint_routes,
+                                                                       route_query, route_url)
+from modules.Cafe_order.models import Dish, Order, OrderItem, Table
+from modules.Cafe_order.query_budget import view_query_budget
+from modules.Cafe_order.seeding import DatasetGenerator
+
+SIZES = (10, 100, 1000)
+# Строк в последнем заказе: форма редактирования рисует select всех блюд на каждую строку
+MAX_ORDER_ITEMS = 20
+
+
+def budgeted_routes():
+    """ Маршруты modules/Cafe_order/urls.py с объявленным бюджетом: [(name, pattern, budget)]. """
+    routes = []
+    for name, pattern in endpoint_routes():
+        budget = view_query_budget(pattern.callback)
+        if budget is not None and name not in SKIPPED_ROUTES:
+            routes.append((name, pattern, budget))
+    return routes
+
+
+def format_queries(queries):
+    return '\n'.join(f"{number:>3}. {query['sql']}" for number, query in enumerate(queries, 1))
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Каждый маршрут с @query_budget на 10, 100 и 1000 заказах и блюдах (последний заказ - на столько же строк,
+    но не больше MAX_ORDER_ITEMS): запросов не больше бюджета и столько же на любом объёме. При провале печатается весь SQL запроса.
+    """
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'adminpass'))
+
+    def _grow_to(self, size):
+        """ Догенерировать заказы и блюда до size; новый последний заказ - на size строк (не больше MAX_ORDER_ITEMS). """
+        missing = size - Order.objects.count()
+        DatasetGenerator(orders=missing, dishes=size, tables=20, days=30, seed=size).run()
+        order = Order.objects.create(table_number=Table.objects.create(number=100000 + size))
+        dishes = Dish.objects.values_list('pk', 'price')[:min(size, MAX_ORDER_ITEMS)]
+        OrderItem.objects.bulk_create(OrderItem(order=order, dish_id=dish_id, quantity=1, price=price)
+                                      for dish_id, price in dishes)
+
+    def _count_queries(self, url, query):
+        _fetch(self.client, url, query)  # прогрев: ContentType и прочие кэши процесса
+        cache.clear()  # меню и свёртки из кэша скрыли бы запросы
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = _fetch(self.client, url, query)
+        return response, list(queries)
+
+    def test_declared_budgets_hold_at_every_size(self):
+        routes = budgeted_routes()
+        self.assertTrue(routes)
+        counts = {}
+        for size in SIZES:
+            self._grow_to(size)
+            for name, pattern, budget in routes:
+                url = route_url(name, pattern)
+                response, queries = self._count_queries(url, route_query(name))
+                with self.subTest(route=name, rows=size):
+                    self.assertEqual(response.status_code, 200)
+                    first = counts.setdefault(name, len(queries))
+                    self.assertLessEqual(
+                        len(queries), budget,
+                        f'{name}: {len(queries)} запросов при бюджете {budget} на {size} строках\n'
+                        f'{format_queries(queries)}')
+                    self.assertEqual(
+                        len(queries), first,
+                        f'{name}: число запросов растёт с данными ({first} на {SIZES[0]}, '
+                        f'{len(queries)} на {size} строках)\n{format_queries(queries)}')
@@ -2,17 +2,20 @@ from django.db import router
 from django.urls import path
 from rest_framework.routers import SimpleRouter
 
-from .views import HomeView, UserAppLogout  # from .views import UserAppLogout, HomeView
+from .views import HomeView, MetricsView, UserAppLogout  # from .views import UserAppLogout, HomeView
 
 from modules.Cafe_order.Views.views_dishes import (DishesList, DishesCreate, DishesDetail, DishesUpdate, DishesDelete,
-                                                   DishessBulkDelete, DishViewSet)
+                                                   DishessBulkDelete, DishesUpload, DishViewSet, AsyncDishesList)
 from modules.Cafe_order.Views.views_orders import OrdersList, OrderCreateView, OrderDetailView, OrdersListAll, \
-    OrderUpdateView, OrderDeleteView, DailyRevenueView, OrderSearchView
+    OrderUpdateView, OrderDeleteView, DailyRevenueView, OrderSearchView, OrderViewSet, RevenueReportView, \
+    RevenueExportView, OrdersBulkActionView, OrderEventsView, AsyncOrdersList, AsyncOrderDetailView, \
+    AsyncDailyRevenueView
 
 
 router = SimpleRouter()
 
 router.register(r'dish_api_view', DishViewSet, basename='dish_api_view')
+router.register(r'order_api_view', OrderViewSet, basename='order_api_view')
 
 urlpatterns = [
     # dishes
@@ -22,7 +25,7 @@ urlpatterns = [
     path('dishes/<int:pk>/update/', DishesUpdate.as_view(), name='dishes_update'),
     path('dish/delete/<int:pk>/', DishesDelete.as_view(), name='delete_dishes'),
     path('dish_delete_something/', DishessBulkDelete.as_view(), name='dish_delete_something'),
-    # path('dishes/upload/', DishesUploadas_view(), name='Dishes_upload'),
+    path('dishes/upload/', DishesUpload.as_view(), name='dishes_upload'),
 
     # orders
     path('orders/', OrdersList.as_view(), name='orders_list'),
@@ -31,12 +34,23 @@ urlpatterns = [
     path('order/<int:pk>/', OrderDetailView.as_view(), name='order_detail'),
     path('order/<int:pk>/update/', OrderUpdateView.as_view(), name='order_update'),
     path('order_delete/<int:pk>/', OrderDeleteView.as_view(), name='order_delete'),
+    path('orders/bulk/', OrdersBulkActionView.as_view(), name='delete_multiple_orders'),
+    path('orders/events/', OrderEventsView.as_view(), name='order_events'),
     path('daily_revenue/', DailyRevenueView.as_view(), name='daily_revenue'),
+    path('revenue_report/', RevenueReportView.as_view(), name='revenue_report'),
+    path('revenue_report/export/', RevenueExportView.as_view(), name='revenue_export'),
     path('order_search/', OrderSearchView.as_view(), name='order_search'),
+    # async-варыянты гарачых старонак для ASGI
+    path('async/dishes/', AsyncDishesList.as_view(), name='dishes_async'),
+    path('async/orders/', AsyncOrdersList.as_view(), name='orders_list_async'),
+    path('async/order/<int:pk>/', AsyncOrderDetailView.as_view(), name='order_detail_async'),
+    path('async/daily_revenue/', AsyncDailyRevenueView.as_view(), name='daily_revenue_async'),
     # home
     path('home/', HomeView.as_view(), name='home'),
     path('', HomeView.as_view(), name='directory_list'),
     path('page_logout/', UserAppLogout.as_view(), name='page_logout'),
+    # метрыкі для Prometheus
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 
 urlpatterns += router.urls
\ No newline at end of file
@@ -1,8 +1,27 @@
+from inspect import isawaitable
+
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LogoutView
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
 from django.views import View
 
+from modules.Cafe_order.metrics import REGISTRY, metrics_settings
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """
+    LoginRequiredMixin для async-представлений: пользователь загружается асинхронно (request.auser())
+    и подставляется в request.user, чтобы ни проверка, ни шаблон не обращались к БД синхронно.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        response = super().dispatch(request, *args, **kwargs)
+        # без входа LoginRequiredMixin сразу возвращает редирект, а не корутину обработчика
+        return await response if isawaitable(response) else response
+
 
 class UserAppLogout(LogoutView):
     """
@@ -12,4 +31,17 @@ class UserAppLogout(LogoutView):
 
 class HomeView(LoginRequiredMixin, View):
     def get(self, request):
-        return render(request, 'list.html')
\ No newline at end of file
+        return render(request, 'list.html')
+
+class MetricsView(View):
+    """
+    Метрыкі ў тэкставым фармаце Prometheus для скрэйпера.
+    Доступ - персанал (сесія) або загаловак Authorization: Bearer <settings.METRICS['TOKEN']>.
+    """
+
+    def get(self, request):
+        token = metrics_settings()['TOKEN']
+        authorization = request.headers.get('Authorization', '')
+        if not (request.user.is_staff or token and constant_time_compare(authorization, f'Bearer {token}')):
+            return HttpResponseForbidden()
+        return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')